@@ -0,0 +1,20 @@
+"""Background delivery of queued verification and reset codes."""
+import hmac
+import os
+
+from utils.outbox import run_worker
+from utils.http import response, error
+
+
+def handle(event: dict, origin: str = '*') -> dict:
+    """Run the outbox worker. Called by a timer trigger with X-Delivery-Token."""
+    expected_token = os.environ.get('EMAIL_DELIVERY_TOKEN', '')
+    headers = event.get('headers') or {}
+    provided_token = headers.get('X-Delivery-Token') or headers.get('x-delivery-token') or ''
+
+    if not expected_token or not hmac.compare_digest(provided_token, expected_token):
+        return error(403, 'Forbidden', origin)
+
+    result = run_worker()
+    print(f"Email outbox: sent={result['sent']} failed={result['failed']} wakeups={result['wakeups']}")
+    return response(200, result, origin)
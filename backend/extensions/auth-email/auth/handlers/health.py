@@ -3,13 +3,15 @@ from utils.db import query_one, get_schema
 from utils.http import response, error
 
 
-REQUIRED_TABLES = ['users', 'refresh_tokens', 'password_reset_tokens', 'email_verification_tokens']
+REQUIRED_TABLES = ['users', 'refresh_tokens', 'password_reset_tokens', 'email_verification_tokens', 'email_outbox', 'refresh_token_revocations']
 
 REQUIRED_COLUMNS = {
     'users': ['id', 'email', 'password_hash', 'name', 'email_verified', 'failed_login_attempts', 'last_failed_login_at', 'last_login_at', 'created_at', 'updated_at'],
     'refresh_tokens': ['id', 'user_id', 'token_hash', 'expires_at', 'created_at'],
     'password_reset_tokens': ['id', 'user_id', 'token_hash', 'expires_at', 'created_at'],
     'email_verification_tokens': ['id', 'user_id', 'token_hash', 'expires_at', 'created_at'],
+    'email_outbox': ['id', 'user_id', 'email', 'kind', 'code', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'created_at'],
+    'refresh_token_revocations': ['id', 'token_hash', 'user_id', 'created_at'],
 }
 
 
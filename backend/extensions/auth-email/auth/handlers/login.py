@@ -8,10 +8,12 @@ from utils.password import verify_password
 from utils.jwt_utils import create_access_token, create_refresh_token, hash_token, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
 from utils.email import is_email_enabled
 from utils.http import response, error
+from utils import queries
 
 
 MAX_LOGIN_ATTEMPTS = int(os.environ.get('MAX_LOGIN_ATTEMPTS', '5'))
 LOCKOUT_MINUTES = int(os.environ.get('LOCKOUT_MINUTES', '15'))
+MAX_REFRESH_TOKENS_PER_USER = int(os.environ.get('MAX_REFRESH_TOKENS_PER_USER', '10'))
 
 
 def handle(event: dict, origin: str = '*') -> dict:
@@ -31,10 +33,7 @@ def handle(event: dict, origin: str = '*') -> dict:
 
     S = get_schema()
 
-    rate_check = query_one(f"""
-        SELECT failed_login_attempts, last_failed_login_at
-        FROM {S}users WHERE email = {escape(email)}
-    """)
+    rate_check = query_one(queries.LOGIN_RATE_CHECK_SQL.format(S=S, email=escape(email)))
 
     if rate_check:
         attempts, last_failed = rate_check
@@ -44,10 +43,7 @@ def handle(event: dict, origin: str = '*') -> dict:
                 remaining = int((lockout_until - datetime.utcnow()).total_seconds())
                 return error(429, f'Слишком много попыток. Повторите через {remaining // 60 + 1} мин.', origin)
 
-    user = query_one(f"""
-        SELECT id, email, name, password_hash, email_verified
-        FROM {S}users WHERE email = {escape(email)}
-    """)
+    user = query_one(queries.LOGIN_USER_SQL.format(S=S, email=escape(email)))
 
     auth_error_msg = 'Неверный email или пароль'
 
@@ -90,6 +86,10 @@ def handle(event: dict, origin: str = '*') -> dict:
         VALUES ({escape(user_id)}, {escape(refresh_hash)}, {escape(expires_at)}, {escape(now)})
     """)
 
+    execute(queries.PRUNE_REFRESH_TOKENS_SQL.format(
+        S=S, user_id=escape(user_id), now=escape(now), limit=escape(MAX_REFRESH_TOKENS_PER_USER)
+    ))
+
     return response(200, {
         'access_token': access_token,
         'refresh_token': refresh_token,
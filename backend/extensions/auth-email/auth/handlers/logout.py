@@ -1,9 +1,11 @@
 """Logout handler."""
 import json
+from datetime import datetime
 
-from utils.db import execute, escape, get_schema
+from utils.db import execute_returning, escape, get_schema
 from utils.jwt_utils import hash_token
 from utils.http import response
+from utils import token_cache
 
 
 def handle(event: dict, origin: str = '*') -> dict:
@@ -15,6 +17,19 @@ def handle(event: dict, origin: str = '*') -> dict:
     if refresh_token:
         token_hash = hash_token(refresh_token)
         S = get_schema()
-        execute(f"DELETE FROM {S}refresh_tokens WHERE token_hash = {escape(token_hash)}")
+        now = datetime.utcnow().isoformat()
+        # Revocation is logged so that other warm instances drop the cached token;
+        # an unknown or already revoked token writes nothing
+        log_id = execute_returning(f"""
+            WITH revoked AS (
+                DELETE FROM {S}refresh_tokens WHERE token_hash = {escape(token_hash)}
+                RETURNING token_hash
+            )
+            INSERT INTO {S}refresh_token_revocations (token_hash, created_at)
+            SELECT token_hash, {escape(now)} FROM revoked
+            RETURNING id
+        """)
+        if log_id is not None:
+            token_cache.add_revocation(log_id, token_hash=token_hash)
 
     return response(200, {'message': 'Logged out successfully'}, origin)
@@ -6,6 +6,7 @@ from datetime import datetime
 from utils.db import query_one, escape, get_schema
 from utils.jwt_utils import create_access_token, decode_refresh_token, hash_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from utils.http import response, error
+from utils import queries, token_cache
 
 
 def handle(event: dict, origin: str = '*') -> dict:
@@ -31,19 +32,21 @@ def handle(event: dict, origin: str = '*') -> dict:
 
     S = get_schema()
 
-    result = query_one(f"""
-        SELECT rt.id, u.email, u.name
-        FROM {S}refresh_tokens rt
-        JOIN {S}users u ON u.id = rt.user_id
-        WHERE rt.token_hash = {escape(token_hash)}
-          AND rt.user_id = {escape(user_id)}
-          AND rt.expires_at > {escape(now)}
-    """)
+    # Warm instances answer repeated refreshes from memory; revocations come via the log
+    cached, seen_id = token_cache.get(token_hash, user_id)
+    if cached:
+        user_email, user_name = cached
+    else:
+        result = query_one(queries.REFRESH_TOKEN_SQL.format(
+            S=S, token_hash=escape(token_hash), user_id=escape(user_id), now=escape(now)
+        ))
 
-    if not result:
-        return error(401, 'Refresh token revoked or expired', origin)
+        if not result:
+            return error(401, 'Refresh token revoked or expired', origin)
+
+        _, user_email, user_name = result
+        token_cache.put(token_hash, user_id, user_email, user_name, seen_id)
 
-    _, user_email, user_name = result
     access_token = create_access_token(user_id, user_email)
 
     return response(200, {
@@ -4,15 +4,18 @@ from datetime import datetime, timedelta
 
 from utils.db import query_one, execute_returning, execute, escape, get_schema
 from utils.password import hash_password, verify_password, validate_password, validate_email
-from utils.email import is_email_enabled, generate_code, send_verification_code
+from utils.email import is_email_enabled, generate_code
+from utils.outbox import enqueue, KIND_VERIFICATION
 from utils.http import response, error
+from utils import queries
 
 
 VERIFICATION_CODE_HOURS = 24
+RESEND_COOLDOWN_SECONDS = 60
 
 
 def _send_verification_code(user_id: int, email: str, S: str) -> dict:
-    """Generate and send verification code, return result dict."""
+    """Generate a verification code and queue it for delivery, return result dict."""
     now = datetime.utcnow().isoformat()
     code = generate_code()
     expires_at = (datetime.utcnow() + timedelta(hours=VERIFICATION_CODE_HOURS)).isoformat()
@@ -26,9 +29,20 @@ def _send_verification_code(user_id: int, email: str, S: str) -> dict:
         VALUES ({escape(user_id)}, {escape(code)}, {escape(expires_at)}, {escape(now)})
     """)
 
-    if send_verification_code(email, code):
-        return {'message': 'Код подтверждения отправлен на email', 'sent': True}
-    return {'message': 'Не удалось отправить код', 'sent': False}
+    enqueue(user_id, email, KIND_VERIFICATION, code)
+    return {'message': 'Код подтверждения отправлен на email', 'sent': True}
+
+
+def _resend_retry_after(user_id: int, S: str) -> int:
+    """Seconds until a new code may be issued, 0 if the last one is old enough."""
+    cooldown_start = (datetime.utcnow() - timedelta(seconds=RESEND_COOLDOWN_SECONDS)).isoformat()
+    last_code = query_one(queries.VERIFICATION_COOLDOWN_SQL.format(
+        S=S, user_id=escape(user_id), cooldown_start=escape(cooldown_start)
+    ))
+    if not last_code or not last_code[0]:
+        return 0
+    elapsed = (datetime.utcnow() - last_code[0]).total_seconds()
+    return max(1, int(RESEND_COOLDOWN_SECONDS - elapsed))
 
 
 def handle(event: dict, origin: str = '*') -> dict:
@@ -51,7 +65,7 @@ def handle(event: dict, origin: str = '*') -> dict:
     email_enabled = is_email_enabled()
 
     # Check if user exists
-    existing = query_one(f"SELECT id, email_verified, password_hash FROM {S}users WHERE email = {escape(email)}")
+    existing = query_one(queries.REGISTER_EXISTING_USER_SQL.format(S=S, email=escape(email)))
 
     if existing:
         user_id, email_verified, stored_hash = existing
@@ -66,6 +80,17 @@ def handle(event: dict, origin: str = '*') -> dict:
 
         # Password correct - resend code
         if email_enabled:
+            # Rapid retries keep the code that is already on its way
+            retry_after = _resend_retry_after(user_id, S)
+            if retry_after:
+                return response(200, {
+                    'user_id': user_id,
+                    'message': 'Код уже отправлен. Повторная отправка будет доступна позже',
+                    'email_verification_required': True,
+                    'resent': False,
+                    'retry_after': retry_after
+                }, origin)
+
             send_result = _send_verification_code(user_id, email, S)
             return response(200, {
                 'user_id': user_id,
@@ -2,10 +2,12 @@
 import json
 from datetime import datetime, timedelta
 
-from utils.db import query_one, execute, escape, get_schema
+from utils.db import query_one, execute, execute_returning, escape, get_schema
 from utils.password import hash_password, validate_password
-from utils.email import is_email_enabled, generate_code, send_password_reset_code
+from utils.email import is_email_enabled, generate_code
+from utils.outbox import enqueue, KIND_PASSWORD_RESET
 from utils.http import response, error
+from utils import queries, token_cache
 
 
 RESET_CODE_LIFETIME_HOURS = 1
@@ -31,7 +33,7 @@ def handle(event: dict, origin: str = '*') -> dict:
 
     # Step 1: Request reset code
     if email and not code and not new_password:
-        user = query_one(f"SELECT id FROM {S}users WHERE email = {escape(email)}")
+        user = query_one(queries.RESET_USER_SQL.format(S=S, email=escape(email)))
         response_msg = 'Если пользователь существует, код сброса будет отправлен на email'
 
         if user:
@@ -50,12 +52,10 @@ def handle(event: dict, origin: str = '*') -> dict:
                 VALUES ({escape(user_id)}, {escape(reset_code)}, {escape(expires_at)}, {escape(now)})
             """)
 
-            # Send code via email if SMTP configured
+            # Queue code for delivery if SMTP configured
             if is_email_enabled():
-                if send_password_reset_code(email, reset_code):
-                    return response(200, {'message': response_msg}, origin)
-                else:
-                    return response(200, {'message': 'Не удалось отправить код'}, origin)
+                enqueue(user_id, email, KIND_PASSWORD_RESET, reset_code)
+                return response(200, {'message': response_msg}, origin)
             else:
                 # Return code in response for development
                 return response(200, {
@@ -75,19 +75,16 @@ def handle(event: dict, origin: str = '*') -> dict:
         now = datetime.utcnow().isoformat()
 
         # Find user
-        user = query_one(f"SELECT id FROM {S}users WHERE email = {escape(email)}")
+        user = query_one(queries.RESET_USER_SQL.format(S=S, email=escape(email)))
         if not user:
             return error(400, 'Неверный код', origin)
 
         user_id = user[0]
 
         # Verify code
-        token_record = query_one(f"""
-            SELECT id FROM {S}password_reset_tokens
-            WHERE user_id = {escape(user_id)}
-              AND token_hash = {escape(code)}
-              AND expires_at > {escape(now)}
-        """)
+        token_record = query_one(queries.RESET_TOKEN_SQL.format(
+            S=S, user_id=escape(user_id), code=escape(code), now=escape(now)
+        ))
 
         if not token_record:
             return error(400, 'Неверный или истёкший код', origin)
@@ -101,7 +98,17 @@ def handle(event: dict, origin: str = '*') -> dict:
 
         # Cleanup tokens
         execute(f"DELETE FROM {S}password_reset_tokens WHERE user_id = {escape(user_id)}")
-        execute(f"DELETE FROM {S}refresh_tokens WHERE user_id = {escape(user_id)}")
+        log_id = execute_returning(f"""
+            WITH revoked AS (
+                DELETE FROM {S}refresh_tokens WHERE user_id = {escape(user_id)}
+                RETURNING id
+            )
+            INSERT INTO {S}refresh_token_revocations (user_id, created_at)
+            SELECT {escape(user_id)}, {escape(now)} WHERE EXISTS (SELECT 1 FROM revoked)
+            RETURNING id
+        """)
+        if log_id is not None:
+            token_cache.add_revocation(log_id, user_id=user_id)
 
         return response(200, {'message': 'Пароль успешно изменён'}, origin)
 
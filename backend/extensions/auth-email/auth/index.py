@@ -9,9 +9,11 @@ Routes (via ?action= query parameter):
   POST /auth?action=logout         - Logout and revoke tokens
   POST /auth?action=reset-password - Request/complete password reset
   GET  /auth?action=health         - Check DB schema
+  POST /auth?action=deliver-emails - Send queued codes (timer trigger)
 """
-from handlers import register, login, logout, refresh, reset_password, health, verify_email
+from handlers import register, login, logout, refresh, reset_password, health, verify_email, deliver_emails
 from utils.http import options_response, error, get_origin_from_event
+from utils import db_metrics
 
 
 ROUTES = {
@@ -22,6 +24,7 @@ ROUTES = {
     'reset-password': reset_password.handle,
     'health': health.handle,
     'verify-email': verify_email.handle,
+    'deliver-emails': deliver_emails.handle,
 }
 
 # Actions that allow GET method
@@ -30,6 +33,19 @@ GET_ACTIONS = {'health'}
 
 def handler(event: dict, context) -> dict:
     """Main router for auth endpoints."""
+    db_metrics.reset()
+    result = route(event)
+
+    params = event.get('queryStringParameters') or {}
+    db_metrics.log_summary(f"{event.get('httpMethod', 'GET').upper()} {params.get('action', '')}".strip())
+    headers = result.setdefault('headers', {})
+    headers['Server-Timing'] = db_metrics.server_timing()
+    headers['Timing-Allow-Origin'] = '*'
+    return result
+
+
+def route(event: dict) -> dict:
+    """Dispatch the request to the action handler."""
     method = event.get('httpMethod', 'GET').upper()
     origin = get_origin_from_event(event)
 
@@ -48,6 +64,6 @@ def handler(event: dict, context) -> dict:
         return error(405, 'Method not allowed', origin)
 
     if not action or action not in ROUTES:
-        return error(404, f'Unknown action: {action}. Use ?action=health|login|register|refresh|logout|reset-password|verify-email', origin)
+        return error(404, f'Unknown action: {action}. Use ?action=health|login|register|refresh|logout|reset-password|verify-email|deliver-emails', origin)
 
     return ROUTES[action](event, origin)
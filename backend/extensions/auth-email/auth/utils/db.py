@@ -1,15 +1,16 @@
 """Database utilities for Simple Query Protocol."""
 import os
-import psycopg2
 from typing import Any
 
+from utils import db_metrics
+
 
 def get_connection():
     """Get database connection."""
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise ValueError('DATABASE_URL not configured')
-    return psycopg2.connect(dsn)
+    return db_metrics.connect(dsn, cursor_factory=db_metrics.InstrumentedCursor)
 
 
 def get_schema() -> str:
@@ -0,0 +1,146 @@
+"""psycopg2 instrumentation: connect and query timings, slow-query log, per-invocation summary."""
+import json
+import os
+import re
+import time
+import psycopg2
+from psycopg2.extensions import cursor as base_cursor
+from psycopg2.extras import RealDictCursor
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+FINGERPRINT_MAX_LENGTH = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+# Current invocation summary, reset at the start of every handler call
+_invocation = {}
+# Totals for the warm instance: fingerprint -> {calls, totalMs, maxMs, rows}
+_totals = {}
+
+
+def reset():
+    """Start a new function invocation."""
+    _invocation.clear()
+    _invocation.update({
+        'started': time.monotonic(),
+        'queries': 0,
+        'dbMs': 0.0,
+        'connectMs': 0.0,
+        'connections': 0,
+        'slowQueries': 0,
+        'slowest': None,
+    })
+
+
+def fingerprint(query) -> str:
+    """Normalized statement text: literals replaced with ?, whitespace collapsed."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    text = _STRING_LITERAL.sub('?', str(query))
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    return text[:FINGERPRINT_MAX_LENGTH]
+
+
+def record_query(query, duration_ms: float, rows: int):
+    """Account an executed statement and log it if slow."""
+    if not _invocation:
+        reset()
+    key = fingerprint(query)
+
+    _invocation['queries'] += 1
+    _invocation['dbMs'] += duration_ms
+    slowest = _invocation['slowest']
+    if slowest is None or duration_ms > slowest['ms']:
+        _invocation['slowest'] = {'fingerprint': key, 'ms': round(duration_ms, 2), 'rows': rows}
+
+    total = _totals.setdefault(key, {'calls': 0, 'totalMs': 0.0, 'maxMs': 0.0, 'rows': 0})
+    total['calls'] += 1
+    total['totalMs'] += duration_ms
+    total['maxMs'] = max(total['maxMs'], duration_ms)
+    total['rows'] += max(rows, 0)
+
+    if duration_ms >= SLOW_QUERY_MS:
+        _invocation['slowQueries'] += 1
+        print(json.dumps({'slowQuery': key, 'ms': round(duration_ms, 2), 'rows': rows}, ensure_ascii=False))
+
+
+class InstrumentedCursorMixin:
+    """Times execute/executemany and records the row count."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(query, (time.perf_counter() - started) * 1000, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(query, (time.perf_counter() - started) * 1000, self.rowcount)
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, base_cursor):
+    pass
+
+
+class InstrumentedDictCursor(InstrumentedCursorMixin, RealDictCursor):
+    pass
+
+
+def connect(dsn: str, **kwargs):
+    """psycopg2.connect that records connect time."""
+    if not _invocation:
+        reset()
+    started = time.perf_counter()
+    conn = psycopg2.connect(dsn, **kwargs)
+    _invocation['connectMs'] += (time.perf_counter() - started) * 1000
+    _invocation['connections'] += 1
+    return conn
+
+
+def summary() -> dict:
+    """Summary of the current invocation."""
+    if not _invocation:
+        reset()
+    return {
+        'queries': _invocation['queries'],
+        'dbMs': round(_invocation['dbMs'], 2),
+        'connectMs': round(_invocation['connectMs'], 2),
+        'connections': _invocation['connections'],
+        'slowQueries': _invocation['slowQueries'],
+        'slowest': _invocation['slowest'],
+        'totalMs': round((time.monotonic() - _invocation['started']) * 1000, 2),
+    }
+
+
+def server_timing() -> str:
+    """Server-Timing header value for the current invocation."""
+    current = summary()
+    return f"db;dur={current['dbMs']}, connect;dur={current['connectMs']}, total;dur={current['totalMs']}"
+
+
+def log_summary(label: str):
+    """Log the invocation summary as a single line."""
+    print(json.dumps({'dbSummary': label, **summary()}, ensure_ascii=False))
+
+
+def top_queries(limit: int = 10) -> list:
+    """Most expensive statements of the warm instance by total time."""
+    ranked = sorted(_totals.items(), key=lambda item: item[1]['totalMs'], reverse=True)[:limit]
+    return [
+        {
+            'fingerprint': key,
+            'calls': value['calls'],
+            'totalMs': round(value['totalMs'], 2),
+            'avgMs': round(value['totalMs'] / value['calls'], 2),
+            'maxMs': round(value['maxMs'], 2),
+            'rows': value['rows'],
+        }
+        for key, value in ranked
+    ]
@@ -5,6 +5,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from utils import smtp_client
+
 
 def is_email_enabled() -> bool:
     """Check if email sending is configured."""
@@ -36,15 +38,7 @@ def send_email(to_email: str, subject: str, html_body: str, text_body: str) -> b
     msg.attach(MIMEText(html_body, 'html', 'utf-8'))
 
     try:
-        if smtp_port == 465:
-            with smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=10) as server:
-                server.login(smtp_user, smtp_password)
-                server.sendmail(smtp_from, to_email, msg.as_string())
-        else:
-            with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
-                server.starttls()
-                server.login(smtp_user, smtp_password)
-                server.sendmail(smtp_from, to_email, msg.as_string())
+        smtp_client.send_message(msg, smtp_host, smtp_port, smtp_user, smtp_password)
         return True
     except (smtplib.SMTPException, OSError):
         return False
@@ -0,0 +1,123 @@
+"""Deferred delivery of verification and password reset codes.
+
+Handlers only store the code in email_outbox and return; the deliver-emails
+worker sends pending rows in the background and retries failed sends.
+"""
+import os
+import select
+import time
+from datetime import datetime, timedelta
+
+from utils.db import execute, escape, get_connection, get_schema
+from utils.email import send_verification_code, send_password_reset_code
+
+
+KIND_VERIFICATION = 'verification'
+KIND_PASSWORD_RESET = 'password_reset'
+
+SENDERS = {
+    KIND_VERIFICATION: send_verification_code,
+    KIND_PASSWORD_RESET: send_password_reset_code,
+}
+
+NOTIFY_CHANNEL = 'email_outbox'
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+# Rows are claimed one at a time, so the lease only has to outlive a single SMTP send
+CLAIM_LEASE_SECONDS = 120
+
+# The worker is started by a timer trigger and keeps listening almost until the next start
+DELIVERY_WINDOW_SECONDS = int(os.environ.get('EMAIL_DELIVERY_WINDOW_SECONDS', '55'))
+
+
+def enqueue(user_id: int, email: str, kind: str, code: str) -> None:
+    """Queue a code for delivery. A newer code replaces a pending one for the same user and kind."""
+    S = get_schema()
+    now = datetime.utcnow().isoformat()
+    execute(f"""
+        INSERT INTO {S}email_outbox (user_id, email, kind, code, attempts, next_attempt_at, created_at)
+        VALUES ({escape(user_id)}, {escape(email)}, {escape(kind)}, {escape(code)}, 0, {escape(now)}, {escape(now)})
+        ON CONFLICT (user_id, kind) WHERE sent_at IS NULL
+        DO UPDATE SET email = EXCLUDED.email, code = EXCLUDED.code, attempts = 0,
+                      last_error = NULL, next_attempt_at = EXCLUDED.next_attempt_at;
+        NOTIFY {NOTIFY_CHANNEL}
+    """)
+
+
+def _claim(cur, S: str):
+    """Lease the next due row so that parallel workers never send the same code twice."""
+    now = datetime.utcnow()
+    cur.execute(f"""
+        UPDATE {S}email_outbox
+        SET next_attempt_at = {escape((now + timedelta(seconds=CLAIM_LEASE_SECONDS)).isoformat())},
+            attempts = attempts + 1
+        WHERE id IN (
+            SELECT id FROM {S}email_outbox
+            WHERE sent_at IS NULL
+              AND attempts < {MAX_ATTEMPTS}
+              AND next_attempt_at <= {escape(now.isoformat())}
+            ORDER BY id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, email, kind, code, attempts
+    """)
+    return cur.fetchone()
+
+
+def deliver_pending(cur, S: str, deadline: float = None) -> dict:
+    """Send due rows until none are left or the deadline passes; failed sends are retried with exponential backoff."""
+    result = {'sent': 0, 'failed': 0}
+    while deadline is None or time.monotonic() < deadline:
+        row = _claim(cur, S)
+        if not row:
+            break
+
+        row_id, email, kind, code, attempts = row
+        if SENDERS[kind](email, code):
+            cur.execute(f"""
+                UPDATE {S}email_outbox
+                SET sent_at = {escape(datetime.utcnow().isoformat())}, code = NULL, last_error = NULL
+                WHERE id = {escape(row_id)}
+            """)
+            result['sent'] += 1
+        else:
+            retry_at = datetime.utcnow() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            cur.execute(f"""
+                UPDATE {S}email_outbox
+                SET next_attempt_at = {escape(retry_at.isoformat())}, last_error = 'SMTP send failed'
+                WHERE id = {escape(row_id)}
+            """)
+            result['failed'] += 1
+    return result
+
+
+def run_worker(window_seconds: int = DELIVERY_WINDOW_SECONDS) -> dict:
+    """Deliver the backlog, then LISTEN for new codes until the window closes."""
+    S = get_schema()
+    deadline = time.monotonic() + window_seconds
+    totals = {'sent': 0, 'failed': 0, 'wakeups': 0}
+
+    conn = get_connection()
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        while True:
+            delivered = deliver_pending(cur, S, deadline)
+            totals['sent'] += delivered['sent']
+            totals['failed'] += delivered['failed']
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Wake up on NOTIFY from enqueue() or periodically for scheduled retries
+            if select.select([conn], [], [], min(remaining, RETRY_BASE_SECONDS)) != ([], [], []):
+                conn.poll()
+                conn.notifies.clear()
+                totals['wakeups'] += 1
+        cur.close()
+    finally:
+        conn.close()
+
+    return totals
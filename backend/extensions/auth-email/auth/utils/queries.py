@@ -0,0 +1,63 @@
+"""SQL of the hot auth statements.
+
+Templates take the schema prefix as {S} and values already passed through
+escape(). Handlers format and run exactly these strings; tests/query_plans
+formats the same templates to check their plans.
+"""
+
+LOGIN_RATE_CHECK_SQL = """
+    SELECT failed_login_attempts, last_failed_login_at
+    FROM {S}users WHERE email = {email}
+"""
+
+LOGIN_USER_SQL = """
+    SELECT id, email, name, password_hash, email_verified
+    FROM {S}users WHERE email = {email}
+"""
+
+# Keep only the newest live sessions; expired ones go too. Evicted live
+# sessions are logged as revocations for the refresh cache of other instances
+PRUNE_REFRESH_TOKENS_SQL = """
+    WITH pruned AS (
+        DELETE FROM {S}refresh_tokens
+        WHERE user_id = {user_id}
+          AND id NOT IN (
+              SELECT id FROM {S}refresh_tokens
+              WHERE user_id = {user_id} AND expires_at > {now}
+              ORDER BY created_at DESC, id DESC
+              LIMIT {limit}
+          )
+        RETURNING token_hash, expires_at
+    )
+    INSERT INTO {S}refresh_token_revocations (token_hash, created_at)
+    SELECT token_hash, {now} FROM pruned WHERE expires_at > {now}
+"""
+
+REFRESH_TOKEN_SQL = """
+    SELECT rt.id, u.email, u.name
+    FROM {S}refresh_tokens rt
+    JOIN {S}users u ON u.id = rt.user_id
+    WHERE rt.token_hash = {token_hash}
+      AND rt.user_id = {user_id}
+      AND rt.expires_at > {now}
+"""
+
+REGISTER_EXISTING_USER_SQL = """
+    SELECT id, email_verified, password_hash FROM {S}users WHERE email = {email}
+"""
+
+VERIFICATION_COOLDOWN_SQL = """
+    SELECT MAX(created_at) FROM {S}email_verification_tokens
+    WHERE user_id = {user_id} AND created_at > {cooldown_start}
+"""
+
+RESET_USER_SQL = """
+    SELECT id FROM {S}users WHERE email = {email}
+"""
+
+RESET_TOKEN_SQL = """
+    SELECT id FROM {S}password_reset_tokens
+    WHERE user_id = {user_id}
+      AND token_hash = {code}
+      AND expires_at > {now}
+"""
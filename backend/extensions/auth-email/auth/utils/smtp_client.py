@@ -0,0 +1,87 @@
+"""SMTP client that keeps an authenticated connection across warm invocations.
+
+Connection caching matches smtp_client.py in the backend functions that send
+email; keep that part in sync. Their rate throttling and 421/454 retries are
+not copied here: this client sends one code per outbox row, and the outbox
+worker already retries failed sends with its own backoff.
+"""
+import os
+import smtplib
+import time
+
+SMTP_TIMEOUT_SECONDS = 10
+SMTP_MAX_CONNECTION_AGE_SECONDS = int(os.environ.get('SMTP_MAX_CONNECTION_AGE_SECONDS', '240'))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+
+_state = {
+    'server': None,
+    'key': None,
+    'opened_at': 0.0,
+    'messages': 0,
+}
+
+
+def _open(smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str):
+    if smtp_port == 465:
+        server = smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+    else:
+        server = smtplib.SMTP(smtp_host, smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+        server.starttls()
+    server.login(smtp_user, smtp_password)
+    return server
+
+
+def close():
+    """Close the cached connection."""
+    server = _state['server']
+    _state['server'] = None
+    _state['key'] = None
+    _state['messages'] = 0
+    if server is not None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+def _is_alive(server) -> bool:
+    try:
+        return server.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def get_connection(smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str):
+    """Return the cached connection if it is alive and not worn out, otherwise open a new one."""
+    key = (smtp_host, smtp_port, smtp_user)
+    server = _state['server']
+    
+    if server is not None:
+        expired = (
+            _state['key'] != key
+            or time.monotonic() - _state['opened_at'] > SMTP_MAX_CONNECTION_AGE_SECONDS
+            or _state['messages'] >= SMTP_MAX_MESSAGES_PER_CONNECTION
+        )
+        if not expired and _is_alive(server):
+            return server
+        close()
+    
+    _state['server'] = _open(smtp_host, smtp_port, smtp_user, smtp_password)
+    _state['key'] = key
+    _state['opened_at'] = time.monotonic()
+    _state['messages'] = 0
+    return _state['server']
+
+
+def send_message(msg, smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str) -> None:
+    """Send message over the cached connection, reconnecting once if the server dropped it."""
+    for attempt in range(2):
+        server = get_connection(smtp_host, smtp_port, smtp_user, smtp_password)
+        try:
+            server.send_message(msg)
+            _state['messages'] += 1
+            return
+        except smtplib.SMTPServerDisconnected:
+            close()
+            if attempt:
+                raise
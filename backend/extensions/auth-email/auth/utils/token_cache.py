@@ -0,0 +1,106 @@
+"""Warm-instance cache of validated refresh tokens with a revocation filter.
+
+A refresh token whose row was found in refresh_tokens is remembered by hash, so
+the next refresh skips the database. Every revocation (logout, password reset,
+session limit on login) is written to refresh_token_revocations; instances pull
+new log rows at most every REVOCATION_SYNC_SECONDS into a compact filter keyed
+by hash prefix and user id. A filter hit newer than the cache entry sends the
+request back to the database, which stays the source of truth.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from utils.db import query, query_one, escape, get_schema
+
+
+CACHE_MAX_ENTRIES = int(os.environ.get('REFRESH_CACHE_MAX_ENTRIES', '10000'))
+CACHE_TTL_SECONDS = int(os.environ.get('REFRESH_CACHE_TTL_SECONDS', '300'))
+REVOCATION_SYNC_SECONDS = float(os.environ.get('REVOCATION_SYNC_SECONDS', '5'))
+REVOCATION_OVERLAP_SECONDS = 30
+FILTER_MAX_ENTRIES = 50000
+# Prefix of the sha256 hex digest: false positives only cost a database query
+FILTER_PREFIX_LENGTH = 16
+
+_cache = OrderedDict()
+_filter = {'tokens': {}, 'users': {}}
+_sync = {'last_id': None, 'synced_at': 0.0}
+
+
+def _reset():
+    _cache.clear()
+    _filter['tokens'].clear()
+    _filter['users'].clear()
+
+
+def sync_revocations() -> int:
+    """Pull new revocation log rows into the filter; returns the last seen log id."""
+    now = time.monotonic()
+    if _sync['last_id'] is not None and now - _sync['synced_at'] < REVOCATION_SYNC_SECONDS:
+        return _sync['last_id']
+
+    S = get_schema()
+    if _sync['last_id'] is None:
+        # Cold instance: the cache is empty, older revocations cannot affect it
+        row = query_one(f"SELECT COALESCE(MAX(id), 0) FROM {S}refresh_token_revocations")
+        _sync['last_id'] = row[0]
+    else:
+        # Recent rows are re-read so that a late-committing lower id is not skipped
+        recent = (datetime.utcnow() - timedelta(seconds=REVOCATION_OVERLAP_SECONDS)).isoformat()
+        for log_id, token_hash, user_id in query(f"""
+            SELECT id, token_hash, user_id FROM {S}refresh_token_revocations
+            WHERE id > {int(_sync['last_id'])} OR created_at > {escape(recent)}
+            ORDER BY id
+        """):
+            add_revocation(log_id, token_hash, user_id)
+            _sync['last_id'] = max(_sync['last_id'], log_id)
+    _sync['synced_at'] = now
+    return _sync['last_id']
+
+
+def add_revocation(log_id: int, token_hash: str = None, user_id: int = None) -> None:
+    """Record a revocation in the local filter (from the log or from this instance)."""
+    if token_hash:
+        _filter['tokens'][token_hash[:FILTER_PREFIX_LENGTH]] = log_id
+        _cache.pop(token_hash, None)
+    if user_id is not None:
+        _filter['users'][int(user_id)] = log_id
+    if len(_filter['tokens']) + len(_filter['users']) > FILTER_MAX_ENTRIES:
+        # Dropping the cache together with the filter keeps both consistent
+        _reset()
+
+
+def get(token_hash: str, user_id: int):
+    """(email, name) of a validated token or None if the database must be asked, and the synced log id."""
+    last_id = sync_revocations()
+    entry = _cache.get(token_hash)
+    if entry is None:
+        return None, last_id
+
+    if time.monotonic() - entry['cached_at'] > CACHE_TTL_SECONDS or entry['user_id'] != user_id:
+        del _cache[token_hash]
+        return None, last_id
+
+    seen_id = entry['seen_id']
+    if (_filter['tokens'].get(token_hash[:FILTER_PREFIX_LENGTH], 0) > seen_id
+            or _filter['users'].get(user_id, 0) > seen_id):
+        del _cache[token_hash]
+        return None, last_id
+
+    _cache.move_to_end(token_hash)
+    return (entry['email'], entry['name']), last_id
+
+
+def put(token_hash: str, user_id: int, email: str, name: str, seen_id: int) -> None:
+    """Remember a token validated against the database after log id seen_id."""
+    _cache[token_hash] = {
+        'user_id': user_id,
+        'email': email,
+        'name': name,
+        'seen_id': seen_id,
+        'cached_at': time.monotonic(),
+    }
+    _cache.move_to_end(token_hash)
+    while len(_cache) > CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
@@ -0,0 +1,203 @@
+import hmac
+import json
+import os
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+
+CHAT_HOT_MONTHS = int(os.environ.get('CHAT_HOT_MONTHS', '3'))
+CHAT_PARTITIONS_AHEAD_MONTHS = int(os.environ.get('CHAT_PARTITIONS_AHEAD_MONTHS', '2'))
+USERS_PURGE_RETENTION_DAYS = int(os.environ.get('USERS_PURGE_RETENTION_DAYS', '180'))
+USERS_PURGE_BATCH_SIZE = 500
+USERS_PURGE_MAX_BATCHES = 20
+# Токены users-api (V0004: email/token/used) лежат в схеме по умолчанию
+USERS_API_TOKEN_TABLES = {
+    'password_reset_tokens': 'expires_at < CURRENT_TIMESTAMP OR used = TRUE',
+}
+# Таблицы расширения auth-email (user_id/token_hash) — в схеме MAIN_DB_SCHEMA. Очередь писем:
+# отправленные храним сутки, неотправленные после 5 попыток — неделю. Журнал отзывов экземпляры
+# читают за последние секунды — хватит суток.
+# Обработчики расширения пишут время как UTC без часового пояса, поэтому сравниваем с UTC,
+# а не с CURRENT_TIMESTAMP в часовом поясе сессии
+AUTH_NOW_UTC_SQL = "(now() AT TIME ZONE 'UTC')"
+AUTH_TOKEN_TABLES = {
+    'password_reset_tokens': f'expires_at < {AUTH_NOW_UTC_SQL}',
+    'email_verification_tokens': f'expires_at < {AUTH_NOW_UTC_SQL}',
+    'refresh_tokens': f'expires_at < {AUTH_NOW_UTC_SQL}',
+    'email_outbox': f"sent_at < {AUTH_NOW_UTC_SQL} - INTERVAL '1 day' OR (attempts >= 5 AND next_attempt_at < {AUTH_NOW_UTC_SQL} - INTERVAL '7 days')",
+    'refresh_token_revocations': f"created_at < {AUTH_NOW_UTC_SQL} - INTERVAL '1 day'",
+}
+TOKEN_REAPER_BATCH_SIZE = int(os.environ.get('TOKEN_REAPER_BATCH_SIZE', '1000'))
+TOKEN_REAPER_MAX_BATCHES = 50
+
+def run_chat_partitions(cur) -> dict:
+    '''Создание будущих секций chat_messages и перенос старых секций в архив'''
+    cur.execute(
+        'SELECT maintain_chat_messages_partitions(%s, %s) AS partition_name',
+        (CHAT_HOT_MONTHS, CHAT_PARTITIONS_AHEAD_MONTHS)
+    )
+    archived = [row['partition_name'] for row in cur.fetchall()]
+    return {'archived': archived, 'hotMonths': CHAT_HOT_MONTHS}
+
+def run_purge_deleted_users(cur) -> dict:
+    '''Перенос давно удалённых пользователей в users_archive пачками'''
+    moved = 0
+    for _ in range(USERS_PURGE_MAX_BATCHES):
+        cur.execute(
+            'SELECT purge_deleted_users(%s, %s) AS moved',
+            (USERS_PURGE_RETENTION_DAYS, USERS_PURGE_BATCH_SIZE)
+        )
+        batch = cur.fetchone()['moved']
+        moved += batch
+        cur.connection.commit()
+        if batch < USERS_PURGE_BATCH_SIZE:
+            break
+    return {'archived': moved, 'retentionDays': USERS_PURGE_RETENTION_DAYS}
+
+def token_tables() -> list:
+    '''Пары (таблица со схемой, условие удаления) для таблиц токенов users-api и auth-email'''
+    schema = os.environ.get('MAIN_DB_SCHEMA', '')
+    tables = dict(USERS_API_TOKEN_TABLES)
+    for table, condition in AUTH_TOKEN_TABLES.items():
+        # Без MAIN_DB_SCHEMA имя совпадает с таблицей users-api — её условие уже задано
+        tables.setdefault(f'{schema}.{table}' if schema else table, condition)
+    return list(tables.items())
+
+def run_token_reaper(cur) -> dict:
+    '''Удаление истёкших и использованных токенов ограниченными пачками + размеры таблиц'''
+    report = {}
+    for name, condition in token_tables():
+        cur.execute('SELECT to_regclass(%s) AS oid', (name,))
+        if cur.fetchone()['oid'] is None:
+            continue
+        
+        table = sql.Identifier(*name.split('.'))
+        condition = sql.SQL(condition)
+        delete_batch = sql.SQL('''
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM {table} WHERE {condition}
+                LIMIT %s FOR UPDATE SKIP LOCKED
+            )
+        ''').format(table=table, condition=condition)
+        
+        deleted = 0
+        for _ in range(TOKEN_REAPER_MAX_BATCHES):
+            cur.execute(delete_batch, (TOKEN_REAPER_BATCH_SIZE,))
+            batch = cur.rowcount
+            deleted += batch
+            cur.connection.commit()
+            if batch < TOKEN_REAPER_BATCH_SIZE:
+                break
+        
+        cur.execute(sql.SQL('''
+            SELECT COUNT(*) AS live_rows, pg_total_relation_size(%s::regclass) AS total_bytes
+            FROM {table}
+        ''').format(table=table), (name,))
+        size = cur.fetchone()
+        report[name] = {
+            'deleted': deleted,
+            'liveRows': size['live_rows'],
+            'totalBytes': size['total_bytes']
+        }
+    return report
+
+TASKS = {
+    'chat_partitions': run_chat_partitions,
+    'purge_deleted_users': run_purge_deleted_users,
+    'token_reaper': run_token_reaper,
+}
+
+def handler(event: dict, context) -> dict:
+    '''Плановое обслуживание БД (вызывается по расписанию): секции чата и очистка устаревших данных'''
+    method = event.get('httpMethod', 'POST')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Maintenance-Token'
+            },
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    if method != 'POST':
+        return {
+            'statusCode': 405,
+            'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+    
+    # Без MAINTENANCE_TOKEN обслуживание недоступно: архивирование и очистку нельзя запускать анонимно
+    expected_token = os.environ.get('MAINTENANCE_TOKEN', '')
+    headers = event.get('headers') or {}
+    provided_token = headers.get('X-Maintenance-Token') or headers.get('x-maintenance-token') or ''
+    if not expected_token or not hmac.compare_digest(provided_token, expected_token):
+        return {
+            'statusCode': 403,
+            'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Forbidden'}),
+            'isBase64Encoded': False
+        }
+    
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        return {
+            'statusCode': 500,
+            'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Database configuration missing'}),
+            'isBase64Encoded': False
+        }
+    
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except json.JSONDecodeError:
+        body = None
+    requested = body.get('tasks') if isinstance(body, dict) else None
+    if not isinstance(body, dict) or (requested is not None and not isinstance(requested, list)):
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Invalid JSON body'}),
+            'isBase64Encoded': False
+        }
+    requested = requested or list(TASKS.keys())
+    unknown = [name for name in requested if name not in TASKS]
+    if unknown:
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+            'body': json.dumps({'error': f'Unknown tasks: {", ".join(unknown)}'}),
+            'isBase64Encoded': False
+        }
+    
+    conn = psycopg2.connect(dsn, connect_timeout=5)
+    results = {}
+    errors = {}
+    
+    try:
+        for name in requested:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                results[name] = TASKS[name](cur)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                errors[name] = str(e)
+                print(f'Maintenance task {name} failed: {e}')
+            finally:
+                cur.close()
+    finally:
+        conn.close()
+    
+    print(f'Maintenance results: {json.dumps(results)}')
+    
+    return {
+        'statusCode': 500 if errors else 200,
+        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+        'body': json.dumps({'success': not errors, 'results': results, 'errors': errors}),
+        'isBase64Encoded': False
+    }
@@ -1,9 +1,193 @@
 import json
 import os
-import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import chain
+import psycopg2
+import requests
+from psycopg2.extras import RealDictCursor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+import smtp_client
+
+AUDIENCE_BATCH_SIZE = 200
+MAX_SHARDS = 16
+# Куда координатор отправляет шарды: URL этой же функции; FANOUT_MODE=local — пул процессов (тесты)
+NOTIFICATIONS_SELF_URL = os.environ.get('NOTIFICATIONS_SELF_URL', 'https://functions.poehali.dev/92ff7699-756a-4d4c-b3ab-dceb5c33e4f8')
+FANOUT_MODE = os.environ.get('NOTIFICATIONS_FANOUT_MODE', 'http')
+SHARD_TIMEOUT_SECONDS = int(os.environ.get('NOTIFICATIONS_SHARD_TIMEOUT_SECONDS', '840'))
+
+def as_list(value) -> list:
+    '''Значение фильтра аудитории как список (строка или массив)'''
+    if value is None or value == '':
+        return []
+    return value if isinstance(value, list) else [value]
+
+def build_audience_query(audience: dict):
+    '''SQL выборки получателей по спецификации аудитории: role, paymentStatus, plotFrom/plotTo, all (ValueError — неверный диапазон участков или шард)'''
+    conditions = ["status = 'active'"]
+    params = []
+    
+    roles = as_list(audience.get('role'))
+    if roles:
+        conditions.append('role = ANY(%s)')
+        params.append(roles)
+    
+    exclude_roles = as_list(audience.get('excludeRoles'))
+    if exclude_roles:
+        conditions.append('role <> ALL(%s)')
+        params.append(exclude_roles)
+    
+    payment_statuses = as_list(audience.get('paymentStatus'))
+    if payment_statuses:
+        conditions.append("COALESCE(payment_status, 'unpaid') = ANY(%s)")
+        params.append(payment_statuses)
+    
+    plot_from = audience.get('plotFrom')
+    plot_to = audience.get('plotTo')
+    if plot_from is not None or plot_to is not None:
+        conditions.append('''
+            CASE WHEN plot_number ~ '^[0-9]+$' THEN plot_number::int END
+            BETWEEN %s AND %s
+        ''')
+        try:
+            params.append(int(plot_from) if plot_from is not None else 0)
+            params.append(int(plot_to) if plot_to is not None else 2147483647)
+        except (TypeError, ValueError):
+            raise ValueError('plotFrom and plotTo must be integers')
+    
+    has_filters = len(conditions) > 1
+    if not has_filters and not audience.get('all'):
+        return None
+    
+    # Шард рассылки при параллельной отправке: своя доля получателей у каждого воркера
+    shard = audience.get('shard')
+    if shard is not None:
+        try:
+            shard_count = int(shard['count'])
+            shard_index = int(shard['index'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('shard must have integer count and index')
+        if not 1 <= shard_count <= MAX_SHARDS or not 0 <= shard_index < shard_count:
+            raise ValueError(f'shard must satisfy 1 <= count <= {MAX_SHARDS} and 0 <= index < count')
+        conditions.append('MOD(id, %s) = %s')
+        params.append(shard_count)
+        params.append(shard_index)
+    
+    sql = f'''
+        SELECT email, first_name AS "firstName", last_name AS "lastName", plot_number AS "plotNumber"
+        FROM users
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id
+    '''
+    return sql, params
+
+def iter_audience_batches(conn, audience_query):
+    '''Получатели из users порциями по AUDIENCE_BATCH_SIZE через серверный курсор'''
+    sql, params = audience_query
+    with conn.cursor(name='mass_notification_audience', cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        while True:
+            batch = cur.fetchmany(AUDIENCE_BATCH_SIZE)
+            if not batch:
+                break
+            yield batch
+
+def shard_payloads(body: dict, shards: int) -> list:
+    '''Тела запросов для воркеров: аудитория делится по id % shards, явный список — через один.
+
+    У каждого воркера свой token bucket, поэтому потолок скорости делится между шардами:
+    вместе они отправляют не быстрее одной функции.
+    '''
+    payloads = []
+    for index in range(shards):
+        payload = {key: value for key, value in body.items() if key != 'shards'}
+        payload['smtpRateLimit'] = smtp_client.SMTP_MAX_RATE_PER_SECOND / shards
+        if body.get('audience'):
+            payload['audience'] = {**body['audience'], 'shard': {'index': index, 'count': shards}}
+        else:
+            payload['recipients'] = body.get('recipients', [])[index::shards]
+        payloads.append(payload)
+    return payloads
+
+def invoke_shard_http(payload: dict) -> dict:
+    '''Вызов воркера — этой же функции — по HTTP'''
+    response = requests.post(NOTIFICATIONS_SELF_URL, json=payload, timeout=(5, SHARD_TIMEOUT_SECONDS))
+    try:
+        result = response.json()
+    except ValueError:
+        result = {'error': response.text[:500]}
+    result['statusCode'] = response.status_code
+    return result
+
+def invoke_shard_local(payload: dict) -> dict:
+    '''Воркер в дочернем процессе (NOTIFICATIONS_FANOUT_MODE=local)'''
+    response = handler({'httpMethod': 'POST', 'body': json.dumps(payload)}, None)
+    result = json.loads(response['body'])
+    result['statusCode'] = response['statusCode']
+    return result
+
+def handle_fanout(body: dict, shards: int):
+    '''Координатор: параллельный запуск шардов и сводный отчёт'''
+    payloads = shard_payloads(body, shards)
+    started = time.monotonic()
+    
+    if FANOUT_MODE == 'local':
+        # Дочерние процессы не должны делить с родителем открытое SMTP-соединение
+        smtp_client.close()
+        executor = ProcessPoolExecutor(max_workers=shards)
+        invoke = invoke_shard_local
+    else:
+        executor = ThreadPoolExecutor(max_workers=shards)
+        invoke = invoke_shard_http
+    
+    with executor:
+        futures = [executor.submit(invoke, payload) for payload in payloads]
+        shard_results = []
+        for index, future in enumerate(futures):
+            try:
+                shard_results.append(future.result())
+            except Exception as e:
+                shard_results.append({'statusCode': 502, 'error': str(e)})
+    
+    sent_count = 0
+    failed_count = 0
+    errors = []
+    shard_report = []
+    failed_shards = []
+    for index, result in enumerate(shard_results):
+        sent_count += result.get('sent', 0)
+        failed_count += result.get('failed', 0)
+        errors.extend(result.get('errors') or [])
+        if result['statusCode'] != 200:
+            failed_shards.append(index)
+        shard_report.append({
+            'shard': index,
+            'statusCode': result['statusCode'],
+            'sent': result.get('sent', 0),
+            'failed': result.get('failed', 0),
+            'error': result.get('error'),
+            'smtp': result.get('smtp')
+        })
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({
+            'success': not failed_shards,
+            'sent': sent_count,
+            'failed': failed_count,
+            'errors': errors if errors else None,
+            'shards': shard_report,
+            'failedShards': failed_shards,
+            'seconds': round(time.monotonic() - started, 2)
+        }),
+        'isBase64Encoded': False
+    }
 
 def handler(event: dict, context) -> dict:
     '''Универсальная функция отправки уведомлений (массовая рассылка + уведомления админа)'''
@@ -139,15 +323,7 @@ Email: {user_data.get('email', '')}
     msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
     msg.attach(MIMEText(html_content, 'html', 'utf-8'))
     
-    if smtp_port == 465:
-        with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
-    else:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
+    smtp_client.send_message(msg, smtp_host, smtp_port, smtp_user, smtp_password)
     
     return {
         'statusCode': 200,
@@ -162,31 +338,84 @@ Email: {user_data.get('email', '')}
 def handle_mass_notification(body: dict, smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str, from_email: str):
     '''Массовая отправка email уведомлений участникам СНТ'''
     recipients = body.get('recipients', [])
+    audience = body.get('audience')
     subject = body.get('subject', '')
     message = body.get('message', '')
     
-    if not recipients or not subject or not message:
+    if not (recipients or audience) or not subject or not message:
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Missing required fields: recipients or audience, subject, message'}),
+            'isBase64Encoded': False
+        }
+    
+    conn = None
+    if audience:
+        try:
+            audience_query = build_audience_query(audience)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': str(e)}),
+                'isBase64Encoded': False
+            }
+        if not audience_query:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Audience must set filters or "all": true'}),
+                'isBase64Encoded': False
+            }
+    
+    try:
+        shards = min(int(body.get('shards') or 1), MAX_SHARDS)
+    except (TypeError, ValueError):
         return {
             'statusCode': 400,
             'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Missing required fields: recipients, subject, message'}),
+            'body': json.dumps({'error': 'shards must be an integer'}),
             'isBase64Encoded': False
         }
+    if not audience:
+        # Шард без получателей ответил бы 400 — шардов не больше, чем адресов
+        shards = min(shards, len(recipients))
+    if shards > 1:
+        return handle_fanout(body, shards)
+    
+    try:
+        # Воркер шарда получает долю потолка скорости от координатора, обычный вызов — весь потолок
+        smtp_client.set_rate_limit(body.get('smtpRateLimit'))
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'smtpRateLimit must be a positive number'}),
+            'isBase64Encoded': False
+        }
+    
+    if audience:
+        dsn = os.environ.get('DATABASE_URL')
+        if not dsn:
+            return {
+                'statusCode': 500,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Database configuration missing'}),
+                'isBase64Encoded': False
+            }
+        
+        conn = psycopg2.connect(dsn, connect_timeout=5)
+        recipient_batches = iter_audience_batches(conn, audience_query)
+    else:
+        recipient_batches = [recipients]
     
     sent_count = 0
     failed_count = 0
     errors = []
     
-    if smtp_port == 465:
-        server = smtplib.SMTP_SSL(smtp_host, smtp_port)
-    else:
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
-    
-    with server:
-        server.login(smtp_user, smtp_password)
-        
-        for recipient in recipients:
+    try:
+        for recipient in chain.from_iterable(recipient_batches):
             try:
                 email = recipient.get('email')
                 first_name = recipient.get('firstName', '')
@@ -231,7 +460,7 @@ def handle_mass_notification(body: dict, smtp_host: str, smtp_port: int, smtp_us
                 html_part = MIMEText(html_message, 'html', 'utf-8')
                 msg.attach(html_part)
                 
-                server.send_message(msg)
+                smtp_client.send_message(msg, smtp_host, smtp_port, smtp_user, smtp_password)
                 sent_count += 1
                 
             except Exception as e:
@@ -240,6 +469,9 @@ def handle_mass_notification(body: dict, smtp_host: str, smtp_port: int, smtp_us
                     'email': recipient.get('email', 'unknown'),
                     'error': str(e)
                 })
+    finally:
+        if conn:
+            conn.close()
     
     return {
         'statusCode': 200,
@@ -251,7 +483,8 @@ def handle_mass_notification(body: dict, smtp_host: str, smtp_port: int, smtp_us
             'success': True,
             'sent': sent_count,
             'failed': failed_count,
-            'errors': errors if errors else None
+            'errors': errors if errors else None,
+            'smtp': smtp_client.stats()
         }),
         'isBase64Encoded': False
     }
@@ -1,11 +1,57 @@
 import json
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import smtp_client
+
+MAX_BATCH_SIZE = 100
+
+def build_message(from_email: str, to_email: str, subject: str, html_content: str, text_content: str = '') -> MIMEMultipart:
+    '''Сборка письма: текстовая часть (если есть) и HTML'''
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = from_email
+    msg['To'] = to_email
+    
+    if text_content:
+        part1 = MIMEText(text_content, 'plain', 'utf-8')
+        msg.attach(part1)
+    
+    part2 = MIMEText(html_content, 'html', 'utf-8')
+    msg.attach(part2)
+    return msg
+
+def send_batch(messages: list, smtp_config: tuple, from_email: str) -> list:
+    '''Отправка пачки писем через одно SMTP-соединение (smtp_client переподключается при разрыве)'''
+    results = []
+    
+    for index, item in enumerate(messages):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'to_email': None, 'success': False,
+                            'error': 'Message must be an object'})
+            continue
+        
+        to_email = item.get('to_email')
+        subject = item.get('subject')
+        html_content = item.get('html_content')
+        
+        if not to_email or not subject or not html_content:
+            results.append({'index': index, 'to_email': to_email, 'success': False,
+                            'error': 'Missing required fields: to_email, subject, html_content'})
+            continue
+        
+        msg = build_message(from_email, to_email, subject, html_content, item.get('text_content', ''))
+        
+        try:
+            smtp_client.send_message(msg, *smtp_config)
+            results.append({'index': index, 'to_email': to_email, 'success': True})
+        except Exception as e:
+            results.append({'index': index, 'to_email': to_email, 'success': False, 'error': str(e)})
+    
+    return results
 
 def handler(event: dict, context) -> dict:
-    '''Отправка email через SMTP сервер'''
+    '''Отправка email через SMTP сервер (одно письмо или пачка в поле messages)'''
     method = event.get('httpMethod', 'POST')
     
     if method == 'OPTIONS':
@@ -28,12 +74,26 @@ def handler(event: dict, context) -> dict:
     
     try:
         body = json.loads(event.get('body', '{}'))
+        messages = body.get('messages')
         to_email = body.get('to_email')
         subject = body.get('subject')
         html_content = body.get('html_content')
         text_content = body.get('text_content', '')
         
-        if not to_email or not subject or not html_content:
+        if messages is not None:
+            if not isinstance(messages, list) or not messages:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'messages must be a non-empty array'})
+                }
+            if len(messages) > MAX_BATCH_SIZE:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f'Too many messages, maximum is {MAX_BATCH_SIZE}'})
+                }
+        elif not to_email or not subject or not html_content:
             return {
                 'statusCode': 400,
                 'headers': {'Access-Control-Allow-Origin': '*'},
@@ -53,27 +113,28 @@ def handler(event: dict, context) -> dict:
                 'body': json.dumps({'error': 'SMTP configuration incomplete'})
             }
         
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = from_email
-        msg['To'] = to_email
+        smtp_config = (smtp_host, smtp_port, smtp_user, smtp_password)
         
-        if text_content:
-            part1 = MIMEText(text_content, 'plain', 'utf-8')
-            msg.attach(part1)
+        if messages is not None:
+            results = send_batch(messages, smtp_config, from_email)
+            sent_count = sum(1 for result in results if result['success'])
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'success': sent_count == len(results),
+                    'sent': sent_count,
+                    'failed': len(results) - sent_count,
+                    'results': results
+                })
+            }
         
-        part2 = MIMEText(html_content, 'html', 'utf-8')
-        msg.attach(part2)
+        msg = build_message(from_email, to_email, subject, html_content, text_content)
         
-        if smtp_port == 465:
-            with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-                server.login(smtp_user, smtp_password)
-                server.send_message(msg)
-        else:
-            with smtplib.SMTP(smtp_host, smtp_port) as server:
-                server.starttls()
-                server.login(smtp_user, smtp_password)
-                server.send_message(msg)
+        smtp_client.send_message(msg, *smtp_config)
         
         return {
             'statusCode': 200,
@@ -89,4 +150,4 @@ def handler(event: dict, context) -> dict:
             'statusCode': 500,
             'headers': {'Access-Control-Allow-Origin': '*'},
             'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,146 @@
+'''Инструментирование psycopg2: время подключения и запросов, журнал медленных запросов, сводка за вызов'''
+import json
+import os
+import re
+import time
+import psycopg2
+from psycopg2.extensions import cursor as base_cursor
+from psycopg2.extras import RealDictCursor
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+FINGERPRINT_MAX_LENGTH = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+# Сводка текущего вызова: сбрасывается в начале каждого handler
+_invocation = {}
+# Накопительные данные тёплого инстанса: отпечаток -> {calls, totalMs, maxMs, rows}
+_totals = {}
+
+
+def reset():
+    '''Начало нового вызова функции'''
+    _invocation.clear()
+    _invocation.update({
+        'started': time.monotonic(),
+        'queries': 0,
+        'dbMs': 0.0,
+        'connectMs': 0.0,
+        'connections': 0,
+        'slowQueries': 0,
+        'slowest': None,
+    })
+
+
+def fingerprint(query) -> str:
+    '''Нормализованный текст запроса: литералы заменены на ?, пробелы схлопнуты'''
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    text = _STRING_LITERAL.sub('?', str(query))
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    return text[:FINGERPRINT_MAX_LENGTH]
+
+
+def record_query(query, duration_ms: float, rows: int):
+    '''Учёт выполненного запроса и запись в журнал медленных'''
+    if not _invocation:
+        reset()
+    key = fingerprint(query)
+
+    _invocation['queries'] += 1
+    _invocation['dbMs'] += duration_ms
+    slowest = _invocation['slowest']
+    if slowest is None or duration_ms > slowest['ms']:
+        _invocation['slowest'] = {'fingerprint': key, 'ms': round(duration_ms, 2), 'rows': rows}
+
+    total = _totals.setdefault(key, {'calls': 0, 'totalMs': 0.0, 'maxMs': 0.0, 'rows': 0})
+    total['calls'] += 1
+    total['totalMs'] += duration_ms
+    total['maxMs'] = max(total['maxMs'], duration_ms)
+    total['rows'] += max(rows, 0)
+
+    if duration_ms >= SLOW_QUERY_MS:
+        _invocation['slowQueries'] += 1
+        print(json.dumps({'slowQuery': key, 'ms': round(duration_ms, 2), 'rows': rows}, ensure_ascii=False))
+
+
+class InstrumentedCursorMixin:
+    '''Замеряет execute/executemany и количество строк'''
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(query, (time.perf_counter() - started) * 1000, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(query, (time.perf_counter() - started) * 1000, self.rowcount)
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, base_cursor):
+    pass
+
+
+class InstrumentedDictCursor(InstrumentedCursorMixin, RealDictCursor):
+    pass
+
+
+def connect(dsn: str, **kwargs):
+    '''psycopg2.connect с замером времени подключения'''
+    if not _invocation:
+        reset()
+    started = time.perf_counter()
+    conn = psycopg2.connect(dsn, **kwargs)
+    _invocation['connectMs'] += (time.perf_counter() - started) * 1000
+    _invocation['connections'] += 1
+    return conn
+
+
+def summary() -> dict:
+    '''Сводка текущего вызова'''
+    if not _invocation:
+        reset()
+    return {
+        'queries': _invocation['queries'],
+        'dbMs': round(_invocation['dbMs'], 2),
+        'connectMs': round(_invocation['connectMs'], 2),
+        'connections': _invocation['connections'],
+        'slowQueries': _invocation['slowQueries'],
+        'slowest': _invocation['slowest'],
+        'totalMs': round((time.monotonic() - _invocation['started']) * 1000, 2),
+    }
+
+
+def server_timing() -> str:
+    '''Значение заголовка Server-Timing для текущего вызова'''
+    current = summary()
+    return f"db;dur={current['dbMs']}, connect;dur={current['connectMs']}, total;dur={current['totalMs']}"
+
+
+def log_summary(label: str):
+    '''Пишет сводку вызова одной строкой в журнал функции'''
+    print(json.dumps({'dbSummary': label, **summary()}, ensure_ascii=False))
+
+
+def top_queries(limit: int = 10) -> list:
+    '''Самые затратные запросы тёплого инстанса по суммарному времени'''
+    ranked = sorted(_totals.items(), key=lambda item: item[1]['totalMs'], reverse=True)[:limit]
+    return [
+        {
+            'fingerprint': key,
+            'calls': value['calls'],
+            'totalMs': round(value['totalMs'], 2),
+            'avgMs': round(value['totalMs'] / value['calls'], 2),
+            'maxMs': round(value['maxMs'], 2),
+            'rows': value['rows'],
+        }
+        for key, value in ranked
+    ]
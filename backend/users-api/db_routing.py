@@ -0,0 +1,133 @@
+'''Маршрутизация чтения на реплику (DATABASE_REPLICA_URL) с защитой read-your-writes.
+
+Запись и LISTEN всегда идут в основную БД. Если в основной БД был коммит,
+ответ получает заголовок X-Db-Lsn (pg_current_wal_lsn при закрытии соединения);
+клиент передаёт его в minLsn при следующем чтении, и реплика используется, только
+если уже проиграла WAL до этой позиции. Недоступная или отставшая реплика — чтение
+из основной БД.
+
+Тот же заголовок отдаёт chat_wait, когда версия чата сменилась: изменение сделал
+другой клиент, и следующий chat_messages с этим minLsn не уйдёт на реплику, которая
+его ещё не проиграла.
+'''
+import os
+import re
+import psycopg2
+import psycopg2.extensions
+
+import db_metrics
+
+REPLICA_CONNECT_TIMEOUT_SECONDS = 2
+# GET-действия только на чтение; chat_wait держит LISTEN и работает с основной БД
+REPLICA_READ_ACTIONS = {
+    None, 'chat_messages', 'chat_history', 'search_users', 'plots',
+    'stats', 'voting_results', 'export_users',
+}
+LSN_RE = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+_state = {}
+
+
+def reset():
+    '''Начало вызова: маршрут и LSN записи текущего запроса'''
+    _state.clear()
+    _state['route'] = 'primary'
+    _state['lsn'] = None
+    _state['committed'] = False
+
+
+def replica_dsn():
+    return os.environ.get('DATABASE_REPLICA_URL')
+
+
+class LsnTrackingConnection(psycopg2.extensions.connection):
+    '''Соединение с основной БД: после коммитов позиция WAL читается один раз — при закрытии перед ответом'''
+
+    def commit(self):
+        super().commit()
+        _state['committed'] = True
+
+    def close(self):
+        if _state.get('committed') and not self.closed:
+            _state['committed'] = False
+            cur = psycopg2.extensions.cursor(self)
+            try:
+                cur.execute('SELECT pg_current_wal_lsn()::text')
+                _state['lsn'] = cur.fetchone()[0]
+            except psycopg2.Error as e:
+                print(f'WAL position unavailable: {e}')
+            finally:
+                cur.close()
+        super().close()
+
+
+def remember_primary_lsn(conn):
+    '''Текущая позиция WAL основной БД в X-Db-Lsn: ответ сообщает о чужой записи, которую клиент сейчас прочитает'''
+    if not replica_dsn():
+        return
+    cur = psycopg2.extensions.cursor(conn)
+    try:
+        cur.execute('SELECT pg_current_wal_lsn()::text')
+        _state['lsn'] = cur.fetchone()[0]
+    except psycopg2.Error as e:
+        print(f'WAL position unavailable: {e}')
+    finally:
+        cur.close()
+
+
+def connect_primary(dsn: str):
+    '''Основная БД; с настроенной репликой — с отслеживанием LSN коммитов'''
+    if replica_dsn():
+        return db_metrics.connect(dsn, connect_timeout=5, connection_factory=LsnTrackingConnection)
+    return db_metrics.connect(dsn, connect_timeout=5)
+
+
+def connect_replica(min_lsn: str):
+    '''Соединение с репликой, если она доступна и догнала min_lsn, иначе None'''
+    try:
+        conn = db_metrics.connect(replica_dsn(), connect_timeout=REPLICA_CONNECT_TIMEOUT_SECONDS)
+    except psycopg2.OperationalError as e:
+        print(f'Replica unavailable, reading from primary: {e}')
+        return None
+
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            SELECT pg_is_in_recovery(),
+                   COALESCE(pg_last_wal_replay_lsn() >= %s::pg_lsn, FALSE)
+        ''', (min_lsn or '0/0',))
+        in_recovery, caught_up = cur.fetchone()
+        cur.close()
+        # Реплика, повышенная до основной, тоже годится для чтения
+        if in_recovery and not caught_up:
+            conn.close()
+            return None
+        conn.rollback()
+        return conn
+    except psycopg2.Error as e:
+        print(f'Replica check failed, reading from primary: {e}')
+        conn.close()
+        return None
+
+
+def connect(dsn: str, method: str, action, min_lsn: str = None):
+    '''Соединение для запроса: GET из REPLICA_READ_ACTIONS — реплика, остальное — основная БД'''
+    if replica_dsn() and method == 'GET' and action in REPLICA_READ_ACTIONS:
+        if min_lsn and not LSN_RE.match(min_lsn):
+            min_lsn = None
+        conn = connect_replica(min_lsn)
+        if conn is not None:
+            _state['route'] = 'replica'
+            return conn
+        _state['route'] = 'primary-fallback'
+    return connect_primary(dsn)
+
+
+def response_headers() -> dict:
+    '''Заголовки ответа: куда ушло чтение и LSN записи для read-your-writes'''
+    if not replica_dsn():
+        return {}
+    headers = {'X-Db-Route': _state.get('route', 'primary')}
+    if _state.get('lsn'):
+        headers['X-Db-Lsn'] = _state['lsn']
+    return headers
@@ -0,0 +1,138 @@
+'''Клиент функции send-email: keep-alive пул соединений, повтор неотправленных запросов и автоматический выключатель'''
+import os
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+SEND_EMAIL_URL = os.environ.get('SEND_EMAIL_URL', 'https://functions.poehali.dev/2672fb97-4151-4228-bb1c-4d0b3a502216')
+CONNECT_TIMEOUT_SECONDS = 3
+READ_TIMEOUT_SECONDS = 10
+MAX_ATTEMPTS = int(os.environ.get('SEND_EMAIL_MAX_ATTEMPTS', '3'))
+BACKOFF_BASE_SECONDS = 0.2
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('SEND_EMAIL_BREAKER_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = int(os.environ.get('SEND_EMAIL_BREAKER_RESET_SECONDS', '30'))
+
+# Сессия живёт между тёплыми вызовами функции: DNS, TCP и TLS не повторяются для каждого письма
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+
+
+class CircuitBreaker:
+    '''Выключатель: после серии ошибок перестаёт обращаться к send-email на BREAKER_RESET_SECONDS'''
+    
+    def __init__(self, failure_threshold: int, reset_seconds: int):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+    
+    def allow_request(self) -> bool:
+        if self.state == 'open':
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            # Пробный запрос: если он пройдёт, выключатель замкнётся
+            self.state = 'half_open'
+        return True
+    
+    def record_success(self):
+        self.state = 'closed'
+        self.consecutive_failures = 0
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+
+_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+_metrics = {
+    'sent': 0,
+    'failed': 0,
+    'rejectedByBreaker': 0,
+    'retries': 0,
+    'lastLatencyMs': None,
+    'maxLatencyMs': 0.0,
+    'totalLatencyMs': 0.0,
+}
+
+
+def _post(payload: dict):
+    '''Один запрос к send-email. Возвращает (успех, можно ли повторить)'''
+    try:
+        response = _session.post(
+            SEND_EMAIL_URL,
+            json=payload,
+            timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS)
+        )
+    except (requests.ConnectionError, requests.ConnectTimeout) as e:
+        # Запрос не дошёл до send-email (в т.ч. закрытое keep-alive соединение) — повтор безопасен
+        print(f'send-email request error: {e}')
+        return False, True
+    except requests.RequestException as e:
+        # Таймаут чтения и прочие ошибки: send-email мог уже отправить письмо, повтор его продублирует
+        print(f'send-email request error: {e}')
+        return False, False
+    if response.status_code == 200:
+        return True, False
+    # Отправка письма не идемпотентна: ответ 5xx не значит, что письмо не ушло
+    print(f'send-email responded with {response.status_code}')
+    return False, False
+
+
+def send_email(to_email: str, subject: str, html_content: str, text_content: str = '') -> bool:
+    '''Отправка письма через функцию send-email'''
+    if not _breaker.allow_request():
+        _metrics['rejectedByBreaker'] += 1
+        print(f'send-email circuit open, skipping email to {to_email}')
+        return False
+    
+    payload = {
+        'to_email': to_email,
+        'subject': subject,
+        'html_content': html_content,
+        'text_content': text_content
+    }
+    
+    started = time.monotonic()
+    success = False
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            _metrics['retries'] += 1
+            time.sleep(random.uniform(0, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        success, retryable = _post(payload)
+        if success or not retryable:
+            break
+    
+    latency_ms = (time.monotonic() - started) * 1000
+    _metrics['lastLatencyMs'] = round(latency_ms, 1)
+    _metrics['maxLatencyMs'] = round(max(_metrics['maxLatencyMs'], latency_ms), 1)
+    _metrics['totalLatencyMs'] += latency_ms
+    
+    if success:
+        _metrics['sent'] += 1
+        _breaker.record_success()
+    else:
+        _metrics['failed'] += 1
+        _breaker.record_failure()
+    
+    print(f'send-email: success={success} latency_ms={latency_ms:.1f} breaker={_breaker.state}')
+    return success
+
+
+def get_metrics() -> dict:
+    '''Состояние выключателя и задержки вызовов send-email в этом экземпляре функции'''
+    calls = _metrics['sent'] + _metrics['failed']
+    return {
+        'breakerState': _breaker.state,
+        'consecutiveFailures': _breaker.consecutive_failures,
+        'sent': _metrics['sent'],
+        'failed': _metrics['failed'],
+        'rejectedByBreaker': _metrics['rejectedByBreaker'],
+        'retries': _metrics['retries'],
+        'lastLatencyMs': _metrics['lastLatencyMs'],
+        'maxLatencyMs': _metrics['maxLatencyMs'],
+        'avgLatencyMs': round(_metrics['totalLatencyMs'] / calls, 1) if calls else None,
+    }
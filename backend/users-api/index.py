@@ -1,15 +1,154 @@
 import json
+import math
 import os
 import psycopg2
-from psycopg2.extras import RealDictCursor
 from psycopg2 import errors as psycopg2_errors
-import requests
 import secrets
+import select
+import time
 from datetime import datetime, timedelta
 import pytz
+from email_client import send_email, get_metrics as get_email_metrics
+import db_metrics
+import db_routing
+from users_export import export_users
+from users_import import import_users_csv
+from queries import (
+    LOGIN_SQL, USERS_LIST_SQL, CHAT_MESSAGES_SQL, CHAT_HISTORY_SQL, SEARCH_USERS_SQL,
+    PLOT_REGISTRY_ENTRY_SQL, ONLINE_NOW_SQL, STATS_COUNTERS_SQL, VOTING_RESULTS_SQL,
+    VOTE_EXISTS_SQL, RESET_TOKEN_SQL,
+)
 
 # Force redeploy - add plot_number to login response v2
 
+CHAT_HOT_MONTHS = int(os.environ.get('CHAT_HOT_MONTHS', '3'))
+CHAT_HISTORY_MAX_LIMIT = 200
+SEARCH_USERS_MAX_LIMIT = 100
+MODERATION_BULK_MAX_ITEMS = 500
+# Каждый ожидающий chat_wait держит соединение с основной БД до CHAT_WAIT_MAX_SECONDS:
+# число одновременно открытых вкладок чата расходует пул соединений Postgres
+CHAT_WAIT_DEFAULT_SECONDS = 20
+CHAT_WAIT_MAX_SECONDS = 25
+STATS_MONTHS = 12
+STATS_DAYS = 30
+MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+
+# Кэш тёплого инстанса: имя набора -> (версия из data_versions, данные), см. V0016
+_versioned_cache = {}
+
+def chat_hot_window_start() -> datetime:
+    '''Начало горячего окна чата: первое число месяца CHAT_HOT_MONTHS месяцев назад'''
+    now = datetime.utcnow()
+    month_index = now.year * 12 + now.month - 1 - CHAT_HOT_MONTHS
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+def to_moscow_iso(value) -> str:
+    '''Перевод отметки времени из UTC в московское время (ISO), пустая строка для NULL'''
+    if not value:
+        return ''
+    if value.tzinfo is None:
+        value = pytz.utc.localize(value)
+    return value.astimezone(MOSCOW_TZ).isoformat()
+
+def get_header(event: dict, name: str):
+    '''Значение заголовка запроса без учёта регистра'''
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def get_cached_by_version(cur, name: str, loader):
+    '''Данные из кэша, если версия в data_versions не менялась, иначе перечитывает их через loader'''
+    cur.execute('SELECT version FROM data_versions WHERE name = %s', (name,))
+    row = cur.fetchone()
+    version = row['version'] if row else None
+    
+    cached = _versioned_cache.get(name)
+    if cached and version is not None and cached[0] == version:
+        return cached[1]
+    
+    # Версия читается до данных: гонка даст лишнюю перезагрузку, но не устаревший кэш
+    value = loader(cur)
+    _versioned_cache[name] = (version, value)
+    return value
+
+def load_blocked_users(cur) -> list:
+    '''Список заблокированных в чате'''
+    cur.execute('SELECT email, blocked_by, blocked_at, block_reason FROM blocked_chat_users')
+    blocked = []
+    for row in cur.fetchall():
+        blocked.append({
+            'email': row['email'],
+            'blockedBy': row['blocked_by'],
+            'blockedAt': row['blocked_at'].isoformat() if row['blocked_at'] else '',
+            'reason': row['block_reason']
+        })
+    return blocked
+
+def get_user_roles(cur, emails: list) -> dict:
+    '''Роли для списка email (неизвестные пропускаются): кэш по версии user_roles, из БД — только недостающие'''
+    cur.execute("SELECT version FROM data_versions WHERE name = 'user_roles'")
+    row = cur.fetchone()
+    version = row['version'] if row else None
+    
+    cached = _versioned_cache.get('user_roles')
+    if not cached or version is None or cached[0] != version:
+        cached = (version, {})
+        _versioned_cache['user_roles'] = cached
+    roles = cached[1]
+    
+    missing = [email for email in dict.fromkeys(emails) if email not in roles]
+    if missing:
+        cur.execute('SELECT email, role FROM users WHERE email = ANY(%s)', (missing,))
+        found = {row['email']: row['role'] for row in cur.fetchall()}
+        for email in missing:
+            roles[email] = found.get(email)
+    return {email: roles[email] for email in emails if roles[email] is not None}
+
+def read_chat_version(cur) -> str:
+    '''Токен состояния чата: версии сообщений и списка блокировок (см. V0017)'''
+    cur.execute('''
+        SELECT name, version FROM data_versions
+        WHERE name IN ('chat_messages', 'chat_blocked')
+    ''')
+    versions = {row['name']: row['version'] for row in cur.fetchall()}
+    return f"{versions.get('chat_messages', 0)}.{versions.get('chat_blocked', 0)}"
+
+def serialize_chat_message(row: dict) -> dict:
+    '''Сообщение чата в формате фронтенда'''
+    return {
+        'id': row['id'],
+        'userEmail': row['user_email'],
+        'userName': row['user_name'],
+        'userRole': row['user_role'],
+        'avatar': row['avatar'],
+        'text': row['message_text'],
+        'timestamp': to_moscow_iso(row['created_at']),
+        'deleted': row['is_removed'],
+        'deletedBy': row['removed_by'],
+        'deletedAt': to_moscow_iso(row['removed_at']),
+        'edited': row.get('is_edited', False),
+        'editedAt': to_moscow_iso(row.get('edited_at')),
+        'editedBy': row.get('edited_by')
+    }
+
+def invalid_message_ids(items: list) -> list:
+    '''Элементы списка, которые не являются id сообщения (целое 1..2^31-1 или строка из цифр)'''
+    invalid = []
+    for item in items:
+        if isinstance(item, str) and item.isdigit():
+            value = int(item)
+        elif isinstance(item, int) and not isinstance(item, bool):
+            value = item
+        else:
+            invalid.append(item)
+            continue
+        if not 0 < value < 2 ** 31:
+            invalid.append(item)
+    return invalid
+
 def send_role_change_notification(email: str, full_name: str, old_role: str, new_role: str):
     '''Отправка уведомления о смене роли'''
     role_names = {
@@ -46,24 +185,43 @@ def send_role_change_notification(email: str, full_name: str, old_role: str, new
     </html>
     """
     
-    try:
-        response = requests.post(
-            'https://functions.poehali.dev/2672fb97-4151-4228-bb1c-4d0b3a502216',
-            json={
-                'to_email': email,
-                'subject': 'Изменение роли в СНТ Факел',
-                'html_content': html_content,
-                'text_content': f'Ваша роль изменена с "{old_role_name}" на "{new_role_name}"'
-            },
-            timeout=10
-        )
-        return response.status_code == 200
-    except Exception as e:
-        print(f'Error sending role change notification: {e}')
-        return False
+    return send_email(
+        email,
+        'Изменение роли в СНТ Факел',
+        html_content,
+        f'Ваша роль изменена с "{old_role_name}" на "{new_role_name}"'
+    )
 
 def handler(event: dict, context) -> dict:
     '''API для управления пользователями'''
+    db_metrics.reset()
+    db_routing.reset()
+    result = handle_request(event, context)
+    
+    method = event.get('httpMethod', 'GET')
+    action = (event.get('queryStringParameters') or {}).get('action')
+    if not action and method in ('POST', 'PUT'):
+        try:
+            action = json.loads(event.get('body') or '{}').get('action')
+        except (ValueError, AttributeError):
+            action = None
+    db_metrics.log_summary(f"{method} {action or ''}".strip())
+    headers = result.setdefault('headers', {})
+    headers['Server-Timing'] = db_metrics.server_timing()
+    headers['Timing-Allow-Origin'] = '*'
+    routing_headers = db_routing.response_headers()
+    if routing_headers:
+        headers.update(routing_headers)
+        # Дополняем, а не заменяем: ETag и Content-Disposition тоже должны остаться доступны
+        exposed = [name.strip() for name in headers.get('Access-Control-Expose-Headers', '').split(',') if name.strip()]
+        for name in ('X-Db-Lsn', 'X-Db-Route'):
+            if name not in exposed:
+                exposed.append(name)
+        headers['Access-Control-Expose-Headers'] = ', '.join(exposed)
+    return result
+
+def handle_request(event: dict, context) -> dict:
+    '''Маршрутизация по методу и action'''
     method = event.get('httpMethod', 'GET')
     
     if method == 'OPTIONS':
@@ -72,7 +230,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization',
+                'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization, If-None-Match',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -89,91 +247,334 @@ def handler(event: dict, context) -> dict:
                 'isBase64Encoded': False
             }
         
-        # Подключение к БД с таймаутом
-        conn = psycopg2.connect(dsn, connect_timeout=5)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        # Подключение к БД с таймаутом; GET на чтение — к реплике, если она настроена
+        route_params = event.get('queryStringParameters') or {}
+        conn = db_routing.connect(dsn, method, route_params.get('action'), route_params.get('minLsn'))
+        cur = conn.cursor(cursor_factory=db_metrics.InstrumentedDictCursor)
         
         if method == 'GET':
             query_params = event.get('queryStringParameters') or {}
             action = query_params.get('action') if query_params else None
             
             if action == 'chat_messages':
+                # Горячее окно: только последние секции chat_messages, старое — через chat_history
+                cur.execute(CHAT_MESSAGES_SQL, (chat_hot_window_start(),))
+                rows = cur.fetchall()
+                
+                messages = [serialize_chat_message(row) for row in rows]
+                
+                # Список заблокированных (перечитывается только после block/unblock)
+                blocked = get_cached_by_version(cur, 'chat_blocked', load_blocked_users)
+                
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'messages': messages, 'blocked': blocked}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'chat_wait':
+                # Long-poll: ждём NOTIFY в канале chat_events, пока токен клиента не устареет
+                since = query_params.get('since', '')
+                try:
+                    timeout = float(query_params.get('timeout', CHAT_WAIT_DEFAULT_SECONDS))
+                    if not math.isfinite(timeout):
+                        raise ValueError(timeout)
+                except ValueError:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'timeout must be a number of seconds'}),
+                        'isBase64Encoded': False
+                    }
+                timeout = min(timeout, CHAT_WAIT_MAX_SECONDS)
+                
+                # Уведомления доставляются только вне транзакции
+                conn.autocommit = True
+                cur.execute('LISTEN chat_events')
+                version = read_chat_version(cur)
+                
+                deadline = time.monotonic() + max(timeout, 0)
+                while version == since:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    if select.select([conn], [], [], remaining) == ([], [], []):
+                        break
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        version = read_chat_version(cur)
+                
+                if version != since:
+                    # Клиент сразу запросит chat_messages — с этим LSN реплика не отдаст устаревший список
+                    db_routing.remember_primary_lsn(conn)
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'changed': version != since, 'version': version}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'metrics':
+                cur.close()
+                conn.close()
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'sendEmail': get_email_metrics(), 'db': db_metrics.top_queries()}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'search_users':
+                # Нечёткий поиск по ФИО, телефону и участку (GIN-индексы pg_trgm из V0012)
+                search = (query_params.get('q') or '').strip().lower()
+                try:
+                    limit = min(max(int(query_params.get('limit') or 20), 1), SEARCH_USERS_MAX_LIMIT)
+                except ValueError:
+                    limit = 20
+                
+                if not search or (len(search) < 2 and not search.isdigit()):
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'Query must be at least 2 characters or a plot number'}),
+                        'isBase64Encoded': False
+                    }
+                
+                escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                digits = ''.join(ch for ch in search if ch.isdigit())
+                
+                cur.execute(SEARCH_USERS_SQL, {
+                    'q': search,
+                    'like': f'%{escaped}%',
+                    'digits': digits,
+                    'digits_like': f'%{digits}%',
+                    'limit': limit
+                })
+                rows = cur.fetchall()
+                
+                cur.close()
+                conn.close()
+                
+                found = []
+                for row in rows:
+                    user_dict = dict(row)
+                    user_dict['score'] = round(float(user_dict['score'] or 0), 3)
+                    found.append(user_dict)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                    'body': json.dumps({'users': found}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'plots':
+                # Сводка по участкам из plot_registry (ведётся триггером, см. V0013)
+                plot_number = query_params.get('plot')
+                if plot_number:
+                    cur.execute(PLOT_REGISTRY_ENTRY_SQL, (plot_number,))
+                else:
+                    cur.execute('''
+                        SELECT * FROM plot_registry
+                        ORDER BY NULLIF(regexp_replace(plot_number, '[^0-9]', '', 'g'), '')::bigint NULLS LAST, plot_number
+                    ''')
+                rows = cur.fetchall()
+                
+                cur.close()
+                conn.close()
+                
+                plots = []
+                for row in rows:
+                    plots.append({
+                        'plotNumber': row['plot_number'],
+                        'ownerUserId': row['owner_user_id'],
+                        'ownerName': row['owner_name'],
+                        'ownerEmail': row['owner_email'],
+                        'ownerPhone': row['owner_phone'],
+                        'ownerRegistered': row['owner_registered'],
+                        'membersCount': row['members_count'],
+                        'members': row['members'],
+                        'paymentStatus': row['payment_status'],
+                        'updatedAt': row['updated_at'].isoformat() if row['updated_at'] else ''
+                    })
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                    'body': json.dumps({'plots': plots}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'stats':
+                # Сводка для правления из dashboard_counters (ведётся триггерами, см. V0014).
+                # ETag = версии счётчиков и сообщений чата (V0017, V0019) + число пользователей онлайн + московская дата
                 cur.execute('''
-                    SELECT id, user_email, user_name, user_role, avatar, 
-                           message_text, created_at, is_removed, removed_by, removed_at,
-                           is_edited, edited_at, edited_by
-                    FROM chat_messages
-                    ORDER BY created_at ASC
+                    SELECT
+                        COALESCE(MAX(version) FILTER (WHERE name = 'dashboard'), 0) AS version,
+                        COALESCE(MAX(version) FILTER (WHERE name = 'chat_messages'), 0) AS chat_version
+                    FROM data_versions WHERE name IN ('dashboard', 'chat_messages')
                 ''')
+                version_row = cur.fetchone()
+                version = version_row['version']
+                chat_version = version_row['chat_version']
+                
+                cur.execute(ONLINE_NOW_SQL)
+                online_now = cur.fetchone()['online']
+                
+                # Окно сводки считается от текущих московских суток: после полуночи ETag должен смениться
+                now = datetime.now(MOSCOW_TZ)
+                today = now.strftime('%Y-%m-%d')
+                etag = f'"stats-{version}-{chat_version}-{online_now}-{today}"'
+                stats_headers = {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Expose-Headers': 'ETag',
+                    'Content-Type': 'application/json',
+                    'Cache-Control': 'no-cache',
+                    'ETag': etag
+                }
+                
+                if get_header(event, 'If-None-Match') == etag:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 304,
+                        'headers': stats_headers,
+                        'body': '',
+                        'isBase64Encoded': False
+                    }
+                
+                # Корзины счётчиков в московском времени (V0019), окно — STATS_MONTHS календарных месяцев
+                month_index = now.year * 12 + now.month - 1 - (STATS_MONTHS - 1)
+                month_from = f'{month_index // 12:04d}-{month_index % 12 + 1:02d}'
+                day_from = (now - timedelta(days=STATS_DAYS - 1)).strftime('%Y-%m-%d')
+                
+                cur.execute(STATS_COUNTERS_SQL, (month_from, day_from))
                 rows = cur.fetchall()
                 
-                moscow_tz = pytz.timezone('Europe/Moscow')
-                messages = []
+                cur.close()
+                conn.close()
+                
+                stats = {
+                    'users_by_role': {},
+                    'users_by_payment_status': {},
+                    'registrations_by_month': {},
+                    'messages_by_day': {}
+                }
                 for row in rows:
-                    timestamp_utc = row['created_at']
-                    if timestamp_utc:
-                        if timestamp_utc.tzinfo is None:
-                            timestamp_utc = pytz.utc.localize(timestamp_utc)
-                        timestamp_moscow = timestamp_utc.astimezone(moscow_tz)
-                        timestamp_str = timestamp_moscow.isoformat()
-                    else:
-                        timestamp_str = ''
-                    
-                    removed_at_str = ''
-                    if row['removed_at']:
-                        removed_at_utc = row['removed_at']
-                        if removed_at_utc.tzinfo is None:
-                            removed_at_utc = pytz.utc.localize(removed_at_utc)
-                        removed_at_moscow = removed_at_utc.astimezone(moscow_tz)
-                        removed_at_str = removed_at_moscow.isoformat()
-                    
-                    edited_at_str = ''
-                    if row.get('edited_at'):
-                        edited_at_utc = row['edited_at']
-                        if edited_at_utc.tzinfo is None:
-                            edited_at_utc = pytz.utc.localize(edited_at_utc)
-                        edited_at_moscow = edited_at_utc.astimezone(moscow_tz)
-                        edited_at_str = edited_at_moscow.isoformat()
-                    
-                    messages.append({
-                        'id': row['id'],
-                        'userEmail': row['user_email'],
-                        'userName': row['user_name'],
-                        'userRole': row['user_role'],
-                        'avatar': row['avatar'],
-                        'text': row['message_text'],
-                        'timestamp': timestamp_str,
-                        'deleted': row['is_removed'],
-                        'deletedBy': row['removed_by'],
-                        'deletedAt': removed_at_str,
-                        'edited': row.get('is_edited', False),
-                        'editedAt': edited_at_str,
-                        'editedBy': row.get('edited_by')
-                    })
+                    stats[row['metric']][row['bucket']] = row['value']
                 
-                # Получить список заблокированных
-                cur.execute('SELECT email, blocked_by, blocked_at, block_reason FROM blocked_chat_users')
-                blocked_rows = cur.fetchall()
+                return {
+                    'statusCode': 200,
+                    'headers': stats_headers,
+                    'body': json.dumps({
+                        'totalUsers': sum(stats['users_by_role'].values()),
+                        'byRole': stats['users_by_role'],
+                        'byPaymentStatus': stats['users_by_payment_status'],
+                        'registrationsByMonth': stats['registrations_by_month'],
+                        'messagesByDay': stats['messages_by_day'],
+                        'onlineNow': online_now,
+                        'version': version
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'chat_history':
+                # Постраничная история: горячие секции + архив, курсор по id
+                try:
+                    before_id = int(query_params.get('before') or 2147483647)
+                    limit = min(max(int(query_params.get('limit') or 50), 1), CHAT_HISTORY_MAX_LIMIT)
+                except ValueError:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'Invalid before or limit'}),
+                        'isBase64Encoded': False
+                    }
                 
-                blocked = []
-                for row in blocked_rows:
-                    blocked.append({
-                        'email': row['email'],
-                        'blockedBy': row['blocked_by'],
-                        'blockedAt': row['blocked_at'].isoformat() if row['blocked_at'] else '',
-                        'reason': row['block_reason']
-                    })
+                cur.execute(CHAT_HISTORY_SQL, (before_id, limit + 1, before_id, limit + 1, limit + 1))
+                rows = cur.fetchall()
                 
                 cur.close()
                 conn.close()
                 
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                messages = [serialize_chat_message(row) for row in reversed(rows)]
+                
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'messages': messages, 'blocked': blocked}),
+                    'body': json.dumps({
+                        'messages': messages,
+                        'hasMore': has_more,
+                        'nextBefore': rows[-1]['id'] if has_more else None
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'voting_results':
+                voting_id = query_params.get('votingId')
+                cur.execute(VOTING_RESULTS_SQL, (voting_id,))
+                options = cur.fetchall()
+                
+                cur.close()
+                conn.close()
+                
+                total_votes = sum(option['votes_count'] for option in options)
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'votingId': voting_id,
+                        'totalVotes': total_votes,
+                        'votes': {str(option['option_index']): option['votes_count'] for option in options}
+                    }),
                     'isBase64Encoded': False
                 }
             
+            if action == 'export_users':
+                # Выгрузка реестра для правления: CSV (по умолчанию) или XLSX
+                try:
+                    body, content_type, filename, is_base64 = export_users(conn, db_metrics.InstrumentedCursor, query_params)
+                except ValueError as e:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Expose-Headers': 'Content-Disposition',
+                        'Content-Type': content_type,
+                        'Content-Disposition': f'attachment; filename="{filename}"'
+                    },
+                    'body': body,
+                    'isBase64Encoded': is_base64
+                }
+            
             if action == 'login':
                 email = query_params.get('email')
                 password = query_params.get('password')
@@ -188,11 +589,7 @@ def handler(event: dict, context) -> dict:
                         'isBase64Encoded': False
                     }
                 
-                cur.execute("""
-                    SELECT id, email, first_name, last_name, role, password, owner_is_same, plot_number
-                    FROM users 
-                    WHERE email = %s AND status = 'active'
-                """, (email,))
+                cur.execute(LOGIN_SQL, (email,))
                 user = cur.fetchone()
                 
                 cur.close()
@@ -224,16 +621,30 @@ def handler(event: dict, context) -> dict:
                         'isBase64Encoded': False
                     }
             
-            cur.execute("""
-                SELECT id, email, first_name, last_name, middle_name, phone, 
-                       plot_number, birth_date, role, status, owner_is_same, is_plot_owner,
-                       owner_first_name, owner_last_name, owner_middle_name,
-                       land_doc_number, house_doc_number, email_verified, 
-                       phone_verified, payment_status, registered_at
-                FROM users 
-                WHERE status = 'active'
-                ORDER BY last_name, first_name
-            """)
+            # Реестр меняется редко: версия из data_versions (V0018) служит ETag
+            cur.execute("SELECT version FROM data_versions WHERE name = 'users_registry'")
+            version_row = cur.fetchone()
+            registry_version = version_row['version'] if version_row else 0
+            etag = f'"users-{registry_version}"'
+            registry_headers = {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'ETag',
+                'Content-Type': 'application/json',
+                'Cache-Control': 'no-cache',
+                'ETag': etag
+            }
+            
+            if get_header(event, 'If-None-Match') == etag:
+                cur.close()
+                conn.close()
+                return {
+                    'statusCode': 304,
+                    'headers': registry_headers,
+                    'body': '',
+                    'isBase64Encoded': False
+                }
+            
+            cur.execute(USERS_LIST_SQL)
             users = cur.fetchall()
             
             users_list = []
@@ -250,12 +661,38 @@ def handler(event: dict, context) -> dict:
             
             return {
                 'statusCode': 200,
-                'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                'headers': registry_headers,
                 'body': json.dumps({'users': users_list}),
                 'isBase64Encoded': False
             }
         
         elif method == 'POST':
+            query_params = event.get('queryStringParameters') or {}
+            if query_params.get('action') == 'bulk_import' and query_params.get('format') == 'csv':
+                # Загрузка CSV как есть: тело запроса — файл, а не JSON-массив
+                try:
+                    report = import_users_csv(conn, cur, event)
+                except ValueError as e:
+                    conn.rollback()
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'success': True, **report}),
+                    'isBase64Encoded': False
+                }
+            
             body = json.loads(event.get('body', '{}'))
             action = body.get('action')
             
@@ -273,11 +710,7 @@ def handler(event: dict, context) -> dict:
                         'isBase64Encoded': False
                     }
                 
-                cur.execute("""
-                    SELECT id, email, first_name, last_name, role, password, owner_is_same, plot_number
-                    FROM users 
-                    WHERE email = %s AND status = 'active'
-                """, (email,))
+                cur.execute(LOGIN_SQL, (email,))
                 user = cur.fetchone()
                 
                 cur.close()
@@ -374,19 +807,12 @@ def handler(event: dict, context) -> dict:
                 </html>
                 """
                 
-                try:
-                    requests.post(
-                        'https://functions.poehali.dev/2672fb97-4151-4228-bb1c-4d0b3a502216',
-                        json={
-                            'to_email': email,
-                            'subject': 'Восстановление пароля - СНТ Факел',
-                            'html_content': html_content,
-                            'text_content': f'Восстановление пароля. Перейдите по ссылке: {reset_link}. Ссылка действительна в течение 1 часа.'
-                        },
-                        timeout=10
-                    )
-                except Exception as e:
-                    print(f'Error sending password reset email: {e}')
+                send_email(
+                    email,
+                    'Восстановление пароля - СНТ Факел',
+                    html_content,
+                    f'Восстановление пароля. Перейдите по ссылке: {reset_link}. Ссылка действительна в течение 1 часа.'
+                )
                 
                 cur.close()
                 conn.close()
@@ -413,10 +839,7 @@ def handler(event: dict, context) -> dict:
                     }
                 
                 # Проверяем токен
-                cur.execute('''
-                    SELECT email, expires_at, used FROM password_reset_tokens
-                    WHERE token = %s
-                ''', (token,))
+                cur.execute(RESET_TOKEN_SQL, (token,))
                 token_data = cur.fetchone()
                 
                 if not token_data:
@@ -492,8 +915,8 @@ def handler(event: dict, context) -> dict:
                 
                 for user_data in users_data:
                     try:
-                        # Проверяем, не существует ли уже пользователь с таким email
-                        cur.execute("SELECT id FROM users WHERE email = %s", (user_data['email'],))
+                        # Проверяем, не существует ли уже пользователь с таким email (без учёта регистра, как CSV-импорт)
+                        cur.execute("SELECT id FROM users WHERE LOWER(email) = LOWER(%s)", (user_data['email'],))
                         existing = cur.fetchone()
                         
                         if existing:
@@ -555,6 +978,138 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
             
+            if action == 'create_voting':
+                # Регистрация голосования на сервере (повторный вызов ничего не меняет)
+                voting_id = body.get('votingId')
+                title = body.get('title')
+                options = body.get('options') or []
+                
+                if not voting_id or not title or len(options) < 2:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'votingId, title and at least two options required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.execute('''
+                    INSERT INTO votings (id, title, created_by, ends_at)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (id) DO NOTHING
+                    RETURNING id
+                ''', (str(voting_id), title, body.get('createdBy'), body.get('endDate')))
+                created = cur.fetchone() is not None
+                
+                if created:
+                    cur.execute('''
+                        INSERT INTO voting_options (voting_id, option_index, option_text)
+                        SELECT %s, option_index - 1, option_text
+                        FROM unnest(%s::text[]) WITH ORDINALITY AS o(option_text, option_index)
+                    ''', (str(voting_id), [str(option) for option in options]))
+                
+                conn.commit()
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 201 if created else 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'success': True, 'created': created}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'cast_vote':
+                # Голос участника; счётчики вариантов обновляет триггер trg_voting_votes_counter
+                voting_id = body.get('votingId')
+                voter_email = body.get('email')
+                option_indexes = body.get('options')
+                
+                if not voting_id or not voter_email or not option_indexes:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'votingId, email and options required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                try:
+                    selected_options = sorted({int(idx) for idx in option_indexes})
+                except (TypeError, ValueError):
+                    selected_options = None
+                if not selected_options:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'options must be a list of option indexes'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.execute("SELECT status FROM votings WHERE id = %s FOR UPDATE", (str(voting_id),))
+                voting = cur.fetchone()
+                
+                if not voting or voting['status'] != 'active':
+                    conn.rollback()
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 404 if not voting else 409,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'Voting not found' if not voting else 'Voting is closed'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.execute(VOTE_EXISTS_SQL, (str(voting_id), voter_email))
+                if cur.fetchone():
+                    conn.rollback()
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 409,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'Already voted'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Несуществующий вариант иначе дошёл бы до нарушения внешнего ключа (500)
+                cur.execute('''
+                    SELECT COUNT(*) AS known FROM voting_options
+                    WHERE voting_id = %s AND option_index = ANY(%s)
+                ''', (str(voting_id), selected_options))
+                if cur.fetchone()['known'] != len(selected_options):
+                    conn.rollback()
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'},
+                        'body': json.dumps({'error': 'Unknown option index'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cur.execute('''
+                    INSERT INTO voting_votes (voting_id, voter_email, option_index)
+                    SELECT %s, %s, option_index
+                    FROM unnest(%s::int[]) AS option_index
+                    ON CONFLICT DO NOTHING
+                ''', (str(voting_id), voter_email, selected_options))
+                
+                conn.commit()
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 201,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'success': True}),
+                    'isBase64Encoded': False
+                }
+            
             if action == 'send_message':
                 # Отправить новое сообщение в чат
                 cur.execute('''
@@ -638,7 +1193,7 @@ def handler(event: dict, context) -> dict:
                 conn.close()
                 
                 error_msg = str(e)
-                if 'idx_users_email' in error_msg:
+                if 'idx_users_email' in error_msg or 'users_email_key' in error_msg:
                     error_detail = 'Пользователь с таким email уже зарегистрирован'
                 elif 'idx_users_phone' in error_msg:
                     error_detail = 'Пользователь с таким номером телефона уже зарегистрирован'
@@ -700,15 +1255,11 @@ def handler(event: dict, context) -> dict:
                 blocker_email = body['blockedBy']
                 
                 # Получаем роли обоих пользователей
-                cur.execute('SELECT role FROM users WHERE email = %s', (target_email,))
-                target_user = cur.fetchone()
-                
-                cur.execute('SELECT role FROM users WHERE email = %s', (blocker_email,))
-                blocker_user = cur.fetchone()
+                roles = get_user_roles(cur, [target_email, blocker_email])
                 
-                if target_user and blocker_user:
-                    target_role = target_user['role']
-                    blocker_role = blocker_user['role']
+                if target_email in roles and blocker_email in roles:
+                    target_role = roles[target_email]
+                    blocker_role = roles[blocker_email]
                     
                     # Защита: админ не может блокировать председателя и наоборот
                     if target_role == 'admin' and blocker_role == 'chairman':
@@ -730,7 +1281,7 @@ def handler(event: dict, context) -> dict:
                             'body': json.dumps({'error': 'Администратор не может заблокировать председателя'}),
                             'isBase64Encoded': False
                         }
-                
+            
                 cur.execute('''
                     INSERT INTO blocked_chat_users (email, blocked_by, block_reason)
                     VALUES (%s, %s, %s)
@@ -747,6 +1298,83 @@ def handler(event: dict, context) -> dict:
                     'isBase64Encoded': False
                 }
             
+            if action in ('delete_messages', 'block_users', 'unblock_users'):
+                # Массовая модерация: одна проверка прав и одно изменение на весь список
+                items = body.get('messageIds') if action == 'delete_messages' else body.get('emails')
+                if not isinstance(items, list) or not items or len(items) > MODERATION_BULK_MAX_ITEMS:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Нужен непустой список до {MODERATION_BULK_MAX_ITEMS} элементов'}),
+                        'isBase64Encoded': False
+                    }
+                
+                invalid = invalid_message_ids(items) if action == 'delete_messages' else []
+                if invalid:
+                    cur.close()
+                    conn.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Некорректные id сообщений', 'invalidIds': invalid}),
+                        'isBase64Encoded': False
+                    }
+                
+                if action == 'delete_messages':
+                    cur.execute('''
+                        UPDATE chat_messages
+                        SET is_removed = TRUE, removed_by = %s, removed_at = CURRENT_TIMESTAMP
+                        WHERE id = ANY(%s::int[]) AND is_removed IS NOT TRUE
+                        RETURNING id
+                    ''', (body['deletedBy'], [int(message_id) for message_id in items]))
+                    result = {'success': True, 'removedIds': [row['id'] for row in cur.fetchall()]}
+                
+                elif action == 'block_users':
+                    blocker_email = body['blockedBy']
+                    reason = body.get('reason', '')
+                    target_emails = list(dict.fromkeys(items))
+                    
+                    roles = get_user_roles(cur, target_emails + [blocker_email])
+                    blocker_role = roles.get(blocker_email)
+                    
+                    # Те же ограничения, что и в block_user
+                    skipped = []
+                    allowed = []
+                    for email in target_emails:
+                        target_role = roles.get(email)
+                        if (target_role == 'admin' and blocker_role == 'chairman') or \
+                           (target_role == 'chairman' and blocker_role == 'admin'):
+                            skipped.append(email)
+                        else:
+                            allowed.append(email)
+                    
+                    if allowed:
+                        cur.execute('''
+                            INSERT INTO blocked_chat_users (email, blocked_by, block_reason)
+                            SELECT email, %s, %s FROM unnest(%s::varchar[]) AS t(email)
+                            ON CONFLICT (email) DO UPDATE SET blocked_by = EXCLUDED.blocked_by, block_reason = EXCLUDED.block_reason
+                        ''', (blocker_email, reason, allowed))
+                    result = {'success': True, 'blocked': allowed, 'skipped': skipped}
+                
+                else:
+                    cur.execute('''
+                        DELETE FROM blocked_chat_users WHERE email = ANY(%s) RETURNING email
+                    ''', (items,))
+                    result = {'success': True, 'unblocked': [row['email'] for row in cur.fetchall()]}
+                
+                conn.commit()
+                cur.close()
+                conn.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(result),
+                    'isBase64Encoded': False
+                }
+            
             if action == 'update_online_status':
                 email = body.get('email')
                 if not email:
@@ -0,0 +1,113 @@
+'''SQL горячих запросов users-api.
+
+Обработчики выполняют именно эти строки; локальный набор tests/query_plans
+берёт их отсюда же и сравнивает планы с базовой линией.
+'''
+
+# Выражения совпадают с индексами idx_users_full_name_trgm и idx_users_phone_digits_trgm (V0012)
+USER_FULL_NAME_SQL = "lower(last_name || ' ' || first_name || ' ' || COALESCE(middle_name, ''))"
+USER_PHONE_DIGITS_SQL = "regexp_replace(phone, '[^0-9]', '', 'g')"
+
+LOGIN_SQL = '''
+    SELECT id, email, first_name, last_name, role, password, owner_is_same, plot_number
+    FROM users
+    WHERE email = %s AND status = 'active'
+'''
+
+USERS_LIST_SQL = '''
+    SELECT id, email, first_name, last_name, middle_name, phone,
+           plot_number, birth_date, role, status, owner_is_same, is_plot_owner,
+           owner_first_name, owner_last_name, owner_middle_name,
+           land_doc_number, house_doc_number, email_verified,
+           phone_verified, payment_status, registered_at
+    FROM users
+    WHERE status = 'active'
+    ORDER BY last_name, first_name
+'''
+
+# Горячее окно: только последние секции chat_messages, старое — через CHAT_HISTORY_SQL
+CHAT_MESSAGES_SQL = '''
+    SELECT id, user_email, user_name, user_role, avatar,
+           message_text, created_at, is_removed, removed_by, removed_at,
+           is_edited, edited_at, edited_by
+    FROM chat_messages
+    WHERE created_at >= %s
+    ORDER BY created_at ASC
+'''
+
+# Параметры: before_id, limit, before_id, limit, limit
+CHAT_HISTORY_SQL = '''
+    SELECT id, user_email, user_name, user_role, avatar,
+           message_text, created_at, is_removed, removed_by, removed_at,
+           is_edited, edited_at, edited_by
+    FROM (
+        (SELECT * FROM chat_messages WHERE id < %s ORDER BY id DESC LIMIT %s)
+        UNION ALL
+        (SELECT * FROM chat_messages_archive WHERE id < %s ORDER BY id DESC LIMIT %s)
+    ) history
+    ORDER BY id DESC
+    LIMIT %s
+'''
+
+# Параметры: q, like, digits, digits_like, limit
+SEARCH_USERS_SQL = f'''
+    SELECT id, email, first_name, last_name, middle_name, phone,
+           plot_number, role, payment_status,
+           GREATEST(
+               word_similarity(%(q)s, {USER_FULL_NAME_SQL}),
+               CASE WHEN %(digits)s <> '' THEN similarity(%(digits)s, {USER_PHONE_DIGITS_SQL}) ELSE 0 END,
+               CASE WHEN plot_number = %(q)s THEN 1 ELSE similarity(%(q)s, COALESCE(plot_number, '')) END
+           ) AS score
+    FROM users
+    WHERE status = 'active'
+      AND (
+          %(q)s <%% {USER_FULL_NAME_SQL}
+          OR {USER_FULL_NAME_SQL} LIKE %(like)s
+          OR (length(%(digits)s) >= 3 AND {USER_PHONE_DIGITS_SQL} LIKE %(digits_like)s)
+          OR plot_number = %(q)s
+          OR plot_number LIKE %(like)s
+      )
+    ORDER BY score DESC, last_name, first_name
+    LIMIT %(limit)s
+'''
+
+PLOT_REGISTRY_ENTRY_SQL = '''
+    SELECT * FROM plot_registry WHERE plot_number = %s
+'''
+
+ONLINE_NOW_SQL = '''
+    SELECT COUNT(*) AS online FROM online_users
+    WHERE last_seen >= CURRENT_TIMESTAMP - INTERVAL '2 minutes'
+'''
+
+# Параметры: первый месяц (YYYY-MM) и первый день (YYYY-MM-DD) окна сводки
+STATS_COUNTERS_SQL = '''
+    SELECT metric, bucket, value FROM dashboard_counters
+    WHERE value <> 0 AND (
+        metric IN ('users_by_role', 'users_by_payment_status')
+        OR (metric = 'registrations_by_month' AND bucket >= %s)
+        OR (metric = 'messages_by_day' AND bucket >= %s)
+    )
+    ORDER BY metric, bucket
+'''
+
+VOTING_RESULTS_SQL = '''
+    SELECT option_index, option_text, votes_count
+    FROM voting_options
+    WHERE voting_id = %s
+    ORDER BY option_index
+'''
+
+VOTE_EXISTS_SQL = '''
+    SELECT 1 FROM voting_votes WHERE voting_id = %s AND voter_email = %s LIMIT 1
+'''
+
+# Параметры: email в нижнем регистре, телефоны. LOWER(email) — индекс idx_users_lower_email (V0020)
+IMPORT_EXISTING_USERS_SQL = '''
+    SELECT LOWER(email) AS email, phone FROM users WHERE LOWER(email) = ANY(%s) OR phone = ANY(%s)
+'''
+
+RESET_TOKEN_SQL = '''
+    SELECT email, expires_at, used FROM password_reset_tokens
+    WHERE token = %s
+'''
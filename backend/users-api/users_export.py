@@ -0,0 +1,149 @@
+'''Выгрузка реестра пользователей в CSV/XLSX из именованного (серверного) курсора пачками'''
+import base64
+import csv
+import io
+from datetime import date, datetime
+
+EXPORT_BATCH_SIZE = 1000
+
+# Ключ колонки -> (SQL-выражение, заголовок). Порядок — порядок по умолчанию
+EXPORT_COLUMNS = {
+    'lastName': ('last_name', 'Фамилия'),
+    'firstName': ('first_name', 'Имя'),
+    'middleName': ('middle_name', 'Отчество'),
+    'plotNumber': ('plot_number', 'Участок'),
+    'isPlotOwner': ('is_plot_owner', 'Владелец участка'),
+    'email': ('email', 'Email'),
+    'phone': ('phone', 'Телефон'),
+    'role': ('role', 'Роль'),
+    'paymentStatus': ('payment_status', 'Оплата'),
+    'birthDate': ('birth_date', 'Дата рождения'),
+    'registeredAt': ('registered_at', 'Дата регистрации'),
+    'landDocNumber': ('land_doc_number', 'Документ на землю'),
+    'houseDocNumber': ('house_doc_number', 'Документ на дом'),
+    'status': ('status', 'Статус'),
+}
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+# Статусы, которые предлагает интерфейс; удалённые (deleted) не выгружаются
+EXPORT_STATUSES = ('active', 'pending', 'rejected')
+# Ячейки с такого символа Excel считает формулой — экранируем апострофом
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def parse_columns(value: str) -> list:
+    '''Список колонок из параметра columns=a,b,c; неизвестные — ошибка'''
+    if not value:
+        return list(EXPORT_COLUMNS.keys())
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    if not columns:
+        raise ValueError('Не указаны колонки для выгрузки')
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Неизвестные колонки: {', '.join(unknown)}")
+    return columns
+
+
+def parse_date_param(params: dict, name: str) -> datetime:
+    '''Дата фильтра в формате YYYY-MM-DD или ISO 8601; иначе ошибка'''
+    try:
+        return datetime.fromisoformat(params[name])
+    except ValueError:
+        raise ValueError(f'{name}: ожидается дата в формате YYYY-MM-DD')
+
+
+def build_export_query(columns: list, params: dict) -> tuple:
+    '''SELECT выбранных колонок с фильтрами role, paymentStatus, plot, status, registeredFrom/To'''
+    status = params.get('status') or 'active'
+    if status not in EXPORT_STATUSES:
+        raise ValueError(f"status должен быть одним из: {', '.join(EXPORT_STATUSES)}")
+    conditions = ['status = %s']
+    values = [status]
+
+    if params.get('role'):
+        conditions.append('role = ANY(%s)')
+        values.append(params['role'].split(','))
+    if params.get('paymentStatus'):
+        conditions.append('payment_status = %s')
+        values.append(params['paymentStatus'])
+    if params.get('plot'):
+        conditions.append('plot_number = %s')
+        values.append(params['plot'])
+    if params.get('registeredFrom'):
+        conditions.append('registered_at >= %s')
+        values.append(parse_date_param(params, 'registeredFrom'))
+    if params.get('registeredTo'):
+        conditions.append('registered_at < %s')
+        values.append(parse_date_param(params, 'registeredTo'))
+
+    select_list = ', '.join(EXPORT_COLUMNS[column][0] for column in columns)
+    sql = f'''
+        SELECT {select_list}
+        FROM users
+        WHERE {' AND '.join(conditions)}
+        ORDER BY last_name, first_name, id
+    '''
+    return sql, values
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'да' if value else 'нет'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode_csv(rows, columns: list) -> str:
+    '''CSV для Excel: BOM, разделитель «;». Строки пишутся по мере чтения курсора'''
+    buffer = io.StringIO()
+    buffer.write('\ufeff')
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    writer.writerow([EXPORT_COLUMNS[column][1] for column in columns])
+    for row in rows:
+        writer.writerow([format_value(value) for value in row])
+    return buffer.getvalue()
+
+
+def encode_xlsx(rows, columns: list) -> str:
+    '''XLSX в режиме write_only (строки не держатся в памяти), результат в base64'''
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Реестр')
+    sheet.append([EXPORT_COLUMNS[column][1] for column in columns])
+    for row in rows:
+        sheet.append([format_value(value) for value in row])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def export_users(conn, cursor_factory, params: dict) -> tuple:
+    '''Выгрузка: (тело, content_type, имя файла, base64?)'''
+    export_format = (params.get('format') or 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError('format должен быть csv или xlsx')
+    columns = parse_columns(params.get('columns'))
+    sql, values = build_export_query(columns, params)
+
+    # Именованный курсор: строки приходят с сервера по EXPORT_BATCH_SIZE, а не все сразу
+    cur = conn.cursor(name='users_export', cursor_factory=cursor_factory)
+    cur.itersize = EXPORT_BATCH_SIZE
+    try:
+        cur.execute(sql, values)
+        filename = f"users-{datetime.utcnow().strftime('%Y-%m-%d')}.{export_format}"
+        if export_format == 'xlsx':
+            body = encode_xlsx(cur, columns)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            return body, content_type, filename, True
+        return encode_csv(cur, columns), 'text/csv; charset=utf-8', filename, False
+    finally:
+        cur.close()
@@ -0,0 +1,192 @@
+'''Импорт реестра из CSV: построчный разбор генератором, проверка и дедупликация пачками, вставка пачками в одной транзакции'''
+import base64
+import csv
+import io
+import re
+from datetime import datetime
+from psycopg2.extras import execute_values
+
+from queries import IMPORT_EXISTING_USERS_SQL
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+# Заголовок колонки (как в export_users или camelCase как в JSON-импорте) -> поле
+IMPORT_HEADERS = {
+    'email': 'email',
+    'password': 'password',
+    'пароль': 'password',
+    'firstname': 'firstName',
+    'имя': 'firstName',
+    'lastname': 'lastName',
+    'фамилия': 'lastName',
+    'middlename': 'middleName',
+    'отчество': 'middleName',
+    'phone': 'phone',
+    'телефон': 'phone',
+    'plotnumber': 'plotNumber',
+    'участок': 'plotNumber',
+    'birthdate': 'birthDate',
+    'дата рождения': 'birthDate',
+    'landdocnumber': 'landDocNumber',
+    'документ на землю': 'landDocNumber',
+    'housedocnumber': 'houseDocNumber',
+    'документ на дом': 'houseDocNumber',
+}
+
+REQUIRED_FIELDS = ('email', 'password', 'firstName', 'lastName', 'phone', 'plotNumber')
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def open_csv_body(event: dict):
+    '''Текстовый поток тела запроса (base64 от шлюза или обычная строка), BOM отбрасывается'''
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        raw = base64.b64decode(body)
+    else:
+        raw = body.encode('utf-8')
+    return io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8-sig', newline='')
+
+
+def iter_csv_rows(stream):
+    '''(номер строки, поля) по одной строке за раз; разделитель «;» или «,» определяется по заголовку'''
+    header_line = stream.readline()
+    delimiter = ';' if header_line.count(';') >= header_line.count(',') else ','
+    header = next(csv.reader([header_line], delimiter=delimiter), [])
+    fields = [IMPORT_HEADERS.get(name.strip().lower()) for name in header]
+
+    missing = [field for field in REQUIRED_FIELDS if field not in fields]
+    if missing:
+        raise ValueError(f"В CSV нет колонок: {', '.join(missing)}")
+
+    reader = csv.reader(stream, delimiter=delimiter)
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            raise ValueError(f'Строка {reader.line_num + 1}: {e}')
+        if not any(value.strip() for value in values):
+            continue
+        row = {}
+        for field, value in zip(fields, values):
+            if field:
+                row[field] = value.strip()
+        yield reader.line_num + 1, row
+
+
+def validate_row(row: dict):
+    '''Кортеж для INSERT или текст ошибки'''
+    for field in REQUIRED_FIELDS:
+        if not row.get(field):
+            return None, f'не заполнено поле {field}'
+    # Email хранится в том виде, в каком введён (как при регистрации); регистр учитывается только при поиске дублей
+    email = row['email']
+    if not EMAIL_RE.match(email):
+        return None, f'некорректный email {email}'
+
+    birth_date = row.get('birthDate') or None
+    if birth_date:
+        for date_format in ('%Y-%m-%d', '%d.%m.%Y'):
+            try:
+                birth_date = datetime.strptime(birth_date, date_format).date()
+                break
+            except ValueError:
+                continue
+        else:
+            return None, f'некорректная дата рождения {birth_date}'
+
+    return (
+        email,
+        row['password'],
+        row['firstName'],
+        row['lastName'],
+        row.get('middleName', ''),
+        row['phone'],
+        row['plotNumber'],
+        birth_date,
+        row.get('landDocNumber') or None,
+        row.get('houseDocNumber') or None,
+    ), None
+
+
+def iter_batches(rows, size: int):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_users_csv(conn, cur, event: dict) -> dict:
+    '''Импорт CSV пачками по IMPORT_BATCH_SIZE в одной транзакции: ошибка посреди файла не оставляет частичного импорта'''
+    report = {'rows': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+
+    def add_error(message: str):
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append(message)
+
+    seen_emails = set()
+    seen_phones = set()
+
+    for batch in iter_batches(iter_csv_rows(open_csv_body(event)), IMPORT_BATCH_SIZE):
+        candidates = []
+        for line_number, row in batch:
+            report['rows'] += 1
+            values, problem = validate_row(row)
+            if problem:
+                report['invalid'] += 1
+                add_error(f'Строка {line_number}: {problem}')
+                continue
+            email, phone = values[0], values[5]
+            if email.lower() in seen_emails or phone in seen_phones:
+                report['duplicates'] += 1
+                add_error(f'Строка {line_number}: {email} повторяется в файле')
+                continue
+            seen_emails.add(email.lower())
+            seen_phones.add(phone)
+            candidates.append((line_number, values))
+
+        if not candidates:
+            continue
+
+        # Уже зарегистрированные — одним запросом на пачку; email сравнивается без учёта регистра (idx_users_lower_email, V0020)
+        cur.execute(IMPORT_EXISTING_USERS_SQL, ([values[0].lower() for _, values in candidates], [values[5] for _, values in candidates]))
+        existing_emails = set()
+        existing_phones = set()
+        for existing in cur.fetchall():
+            existing_emails.add(existing['email'])
+            existing_phones.add(existing['phone'])
+
+        rows_to_insert = []
+        for line_number, values in candidates:
+            if values[0].lower() in existing_emails or values[5] in existing_phones:
+                report['duplicates'] += 1
+                add_error(f'Строка {line_number}: {values[0]} уже существует')
+                continue
+            rows_to_insert.append(values)
+
+        if rows_to_insert:
+            inserted = execute_values(cur, '''
+                INSERT INTO users (
+                    email, password, first_name, last_name, middle_name, phone,
+                    plot_number, birth_date, land_doc_number, house_doc_number,
+                    role, status, owner_is_same, email_verified, phone_verified,
+                    payment_status, registered_at
+                ) VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING email
+            ''', rows_to_insert,
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'member', 'active', TRUE, TRUE, FALSE, 'unpaid', CURRENT_TIMESTAMP)",
+                page_size=IMPORT_BATCH_SIZE,
+                fetch=True)
+            report['imported'] += len(inserted)
+            # Конфликт с параллельной регистрацией
+            report['duplicates'] += len(rows_to_insert) - len(inserted)
+
+    conn.commit()
+    return report
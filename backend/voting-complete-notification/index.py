@@ -1,8 +1,77 @@
+import hmac
 import json
 import os
-import smtplib
+import psycopg2
+from psycopg2.extras import RealDictCursor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import smtp_client
+
+RECIPIENTS_BATCH_SIZE = 500
+# Завершить голосование и разослать итоги могут только правление СНТ или плановый вызов с токеном
+COMPLETION_ROLES = ('admin', 'chairman')
+
+def load_voting_results(cur, voting_id: str):
+    '''Итоги голосования из счётчиков voting_options. None, если голосования нет в БД'''
+    cur.execute('SELECT title FROM votings WHERE id = %s', (voting_id,))
+    voting = cur.fetchone()
+    if not voting:
+        return None
+    
+    cur.execute('''
+        SELECT option_text, votes_count
+        FROM voting_options
+        WHERE voting_id = %s
+        ORDER BY option_index
+    ''', (voting_id,))
+    options = cur.fetchall()
+    
+    total_votes = sum(option['votes_count'] for option in options)
+    results = []
+    for option in options:
+        percentage = option['votes_count'] / total_votes * 100 if total_votes else 0
+        results.append({
+            'option': option['option_text'],
+            'votes': option['votes_count'],
+            'percentage': f'{percentage:.1f}'
+        })
+    return voting['title'], results
+
+def is_authorized(event: dict, body: dict, cur) -> bool:
+    '''Вызов с MAINTENANCE_TOKEN или от активного администратора/председателя (completedBy)'''
+    expected_token = os.environ.get('MAINTENANCE_TOKEN', '')
+    headers = event.get('headers') or {}
+    provided_token = headers.get('X-Maintenance-Token') or headers.get('x-maintenance-token') or ''
+    if expected_token and hmac.compare_digest(provided_token, expected_token):
+        return True
+    
+    completed_by = body.get('completedBy')
+    if not isinstance(completed_by, str) or not completed_by:
+        return False
+    cur.execute(
+        "SELECT 1 FROM users WHERE email = %s AND status = 'active' AND role IN %s",
+        (completed_by, COMPLETION_ROLES)
+    )
+    return cur.fetchone() is not None
+
+def iter_recipients(conn):
+    '''Активные участники СНТ порциями по id; транзакция закрывается до отправки писем порции'''
+    last_id = 0
+    while True:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute('''
+                SELECT id, email, first_name AS "firstName", last_name AS "lastName"
+                FROM users
+                WHERE status = 'active' AND id > %s
+                ORDER BY id
+                LIMIT %s
+            ''', (last_id, RECIPIENTS_BATCH_SIZE))
+            rows = cur.fetchall()
+        conn.commit()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]['id']
 
 def handler(event: dict, context) -> dict:
     '''Отправка email-уведомлений всем пользователям о завершении голосования'''
@@ -13,7 +82,7 @@ def handler(event: dict, context) -> dict:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type, X-Maintenance-Token'
             },
             'body': ''
         }
@@ -25,13 +94,13 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': 'Method not allowed'})
         }
     
-    body = json.loads(event.get('body', '{}'))
-    voting_title = body.get('votingTitle', 'Голосование')
-    voting_id = body.get('votingId')
-    results = body.get('results', [])
-    users = body.get('users', [])
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except json.JSONDecodeError:
+        body = None
+    voting_id = body.get('votingId') if isinstance(body, dict) else None
     
-    if not voting_id or not users:
+    if not voting_id:
         return {
             'statusCode': 400,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -52,6 +121,69 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': 'Email configuration missing'})
         }
     
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Database configuration missing'})
+        }
+    
+    conn = psycopg2.connect(dsn, connect_timeout=5)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    
+    if not is_authorized(event, body, cur):
+        cur.close()
+        conn.close()
+        return {
+            'statusCode': 403,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Forbidden'})
+        }
+    
+    # Итоги и получатели берутся только из БД: рассылка по данным клиента не поддерживается
+    stored = load_voting_results(cur, str(voting_id))
+    if not stored:
+        cur.close()
+        conn.close()
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Voting not found'})
+        }
+    
+    voting_title, results = stored
+    # Помечаем рассылку отправленной заранее, чтобы повторные вызовы не дублировали письма
+    cur.execute('''
+        UPDATE votings
+        SET status = 'completed',
+            completed_at = COALESCE(completed_at, CURRENT_TIMESTAMP),
+            notification_sent_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND notification_sent_at IS NULL
+        RETURNING id
+    ''', (str(voting_id),))
+    first_completion = cur.fetchone() is not None
+    conn.commit()
+    
+    if not first_completion:
+        cur.close()
+        conn.close()
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({
+                'success': True,
+                'sent': 0,
+                'failed': 0,
+                'message': 'Уведомления уже были отправлены'
+            })
+        }
+    
+    cur.execute("SELECT COUNT(*) AS total FROM users WHERE status = 'active'")
+    participants_count = cur.fetchone()['total']
+    conn.commit()
+    users = iter_recipients(conn)
+    
     # Формируем результаты для письма
     results_html = '<ul style="list-style: none; padding: 0;">'
     for result in results:
@@ -92,7 +224,7 @@ def handler(event: dict, context) -> dict:
                     <p>Голосование "<strong>{voting_title}</strong>" завершено.</p>
                     <h3>Результаты голосования:</h3>
                     {results_html}
-                    <p>Всего участников: <strong>{len(users)}</strong></p>
+                    <p>Всего участников: <strong>{participants_count}</strong></p>
                     <p style="margin-top: 30px;">
                         <a href="https://{event.get('requestContext', {}).get('domainName', 'sntfakel.ru')}" 
                            style="display: inline-block; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px;">
@@ -117,15 +249,16 @@ def handler(event: dict, context) -> dict:
             html_part = MIMEText(html_content, 'html', 'utf-8')
             msg.attach(html_part)
             
-            with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
-                server.login(smtp_user, smtp_pass)
-                server.send_message(msg)
+            smtp_client.send_message(msg, smtp_host, smtp_port, smtp_user, smtp_pass)
             
             sent_count += 1
         except Exception as e:
             print(f'Failed to send email to {email}: {str(e)}')
             failed_count += 1
     
+    cur.close()
+    conn.close()
+    
     return {
         'statusCode': 200,
         'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -0,0 +1,198 @@
+'''SMTP-клиент с авторизованным соединением, которое переживает тёплые вызовы функции.
+
+Отправка идёт через token bucket с подстраиваемой скоростью: на ответы провайдера
+об ограничении (421/454) — в том числе при подключении, EHLO и AUTH — скорость снижается
+вдвое, письмо повторяется после паузы с джиттером, а каждое успешное письмо понемногу
+поднимает скорость обратно. Прочие временные отказы (450/451/452) относятся к ящику
+получателя: письмо повторяется после паузы, скорость не меняется.
+
+Копия модуля лежит в каждой функции, которая отправляет почту (функции деплоятся
+из своих папок по отдельности), правки нужно вносить во все копии.
+'''
+import os
+import random
+import smtplib
+import time
+
+SMTP_TIMEOUT_SECONDS = 10
+SMTP_MAX_CONNECTION_AGE_SECONDS = int(os.environ.get('SMTP_MAX_CONNECTION_AGE_SECONDS', '240'))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+
+# Писем в секунду: начальная скорость, границы и прибавка за каждое успешное письмо
+SMTP_RATE_PER_SECOND = float(os.environ.get('SMTP_RATE_PER_SECOND', '5'))
+SMTP_MIN_RATE_PER_SECOND = float(os.environ.get('SMTP_MIN_RATE_PER_SECOND', '0.2'))
+SMTP_MAX_RATE_PER_SECOND = float(os.environ.get('SMTP_MAX_RATE_PER_SECOND', '20'))
+SMTP_RATE_INCREASE = float(os.environ.get('SMTP_RATE_INCREASE', '0.05'))
+SMTP_THROTTLE_RETRIES = int(os.environ.get('SMTP_THROTTLE_RETRIES', '4'))
+SMTP_BACKOFF_BASE_SECONDS = float(os.environ.get('SMTP_BACKOFF_BASE_SECONDS', '2'))
+SMTP_BACKOFF_MAX_SECONDS = float(os.environ.get('SMTP_BACKOFF_MAX_SECONDS', '30'))
+
+# Ответы, которыми провайдер (в том числе Яндекс) сообщает о превышении лимита: снижают скорость
+RATE_LIMIT_CODES = (421, 454)
+# Все временные отказы, после которых письмо повторяется
+TRANSIENT_CODES = RATE_LIMIT_CODES + (450, 451, 452)
+
+_state = {
+    'server': None,
+    'key': None,
+    'opened_at': 0.0,
+    'messages': 0,
+}
+
+# Скорость, найденная на прошлых вызовах, сохраняется в тёплом экземпляре функции
+_bucket = {
+    'rate': SMTP_RATE_PER_SECOND,
+    'max_rate': SMTP_MAX_RATE_PER_SECOND,
+    'tokens': 1.0,
+    'updated_at': time.monotonic(),
+    'throttled': 0,
+}
+
+
+def _open(smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str):
+    '''Подключение, EHLO и AUTH; при отказе сокет закрывается, ошибка уходит в send_message'''
+    if smtp_port == 465:
+        server = smtplib.SMTP_SSL(smtp_host, smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+    else:
+        server = smtplib.SMTP(smtp_host, smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+    try:
+        if smtp_port != 465:
+            server.starttls()
+        server.login(smtp_user, smtp_password)
+    except (smtplib.SMTPException, OSError):
+        server.close()
+        raise
+    return server
+
+
+def close():
+    '''Закрыть закэшированное соединение (например, перед завершением работы)'''
+    server = _state['server']
+    _state['server'] = None
+    _state['key'] = None
+    _state['messages'] = 0
+    if server is not None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+def _is_alive(server) -> bool:
+    try:
+        return server.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def get_connection(smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str):
+    '''Авторизованное соединение: закэшированное, если оно живо и не выработало ресурс, иначе новое'''
+    key = (smtp_host, smtp_port, smtp_user)
+    server = _state['server']
+    
+    if server is not None:
+        expired = (
+            _state['key'] != key
+            or time.monotonic() - _state['opened_at'] > SMTP_MAX_CONNECTION_AGE_SECONDS
+            or _state['messages'] >= SMTP_MAX_MESSAGES_PER_CONNECTION
+        )
+        if not expired and _is_alive(server):
+            return server
+        close()
+    
+    _state['server'] = _open(smtp_host, smtp_port, smtp_user, smtp_password)
+    _state['key'] = key
+    _state['opened_at'] = time.monotonic()
+    _state['messages'] = 0
+    return _state['server']
+
+
+def set_rate_limit(max_rate=None):
+    '''Потолок скорости для этого вызова: доля SMTP_MAX_RATE_PER_SECOND у воркера шарда, None — весь'''
+    limit = SMTP_MAX_RATE_PER_SECOND if max_rate is None else float(max_rate)
+    if not limit > 0:
+        raise ValueError('max_rate must be positive')
+    _bucket['max_rate'] = min(limit, SMTP_MAX_RATE_PER_SECOND)
+    _bucket['rate'] = max(SMTP_MIN_RATE_PER_SECOND, min(_bucket['rate'], _bucket['max_rate']))
+
+
+def _acquire():
+    '''Дождаться токена: не больше rate писем в секунду, запас — не больше секунды отправки'''
+    now = time.monotonic()
+    rate = _bucket['rate']
+    _bucket['tokens'] = min(max(rate, 1.0), _bucket['tokens'] + (now - _bucket['updated_at']) * rate)
+    _bucket['updated_at'] = now
+    if _bucket['tokens'] < 1.0:
+        time.sleep((1.0 - _bucket['tokens']) / rate)
+        _bucket['tokens'] = 1.0
+        _bucket['updated_at'] = time.monotonic()
+    _bucket['tokens'] -= 1.0
+
+
+def _error_codes(error: Exception) -> list:
+    '''Коды ответа сервера из ошибки smtplib (по каждому получателю для SMTPRecipientsRefused)'''
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return [code for code, _ in error.recipients.values()]
+    if isinstance(error, smtplib.SMTPResponseException):
+        return [error.smtp_code]
+    return []
+
+
+def is_transient(error: Exception) -> bool:
+    '''Отказ временный: письмо стоит повторить после паузы'''
+    codes = _error_codes(error)
+    return bool(codes) and all(code in TRANSIENT_CODES for code in codes)
+
+
+def is_throttled(error: Exception) -> bool:
+    '''Ответ сервера означает ограничение скорости, а не проблему с письмом или ящиком'''
+    return is_transient(error) and any(code in RATE_LIMIT_CODES for code in _error_codes(error))
+
+
+def _on_transient(attempt: int, throttled: bool):
+    '''Выждать экспоненциальную паузу с джиттером; при ограничении скорости — ещё и снизить её вдвое'''
+    if throttled:
+        _bucket['rate'] = max(SMTP_MIN_RATE_PER_SECOND, _bucket['rate'] / 2)
+        _bucket['throttled'] += 1
+    _bucket['tokens'] = 0.0
+    delay = min(SMTP_BACKOFF_MAX_SECONDS, SMTP_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    time.sleep(delay * random.uniform(0.5, 1.5))
+    _bucket['updated_at'] = time.monotonic()
+
+
+def stats() -> dict:
+    '''Текущая скорость отправки и число ответов об ограничении с момента старта экземпляра'''
+    return {'ratePerSecond': round(_bucket['rate'], 2), 'throttled': _bucket['throttled']}
+
+
+def send_message(msg, smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str) -> None:
+    '''Отправка письма через закэшированное соединение с ограничением скорости.
+
+    Подключение и авторизация — часть попытки: 421 в приветствии или 454 на AUTH
+    обрабатываются так же, как при отправке. При разрыве соединения переподключается
+    и повторяет один раз, при временном отказе — до SMTP_THROTTLE_RETRIES раз с паузой.
+    '''
+    reconnected = False
+    throttle_attempt = 0
+    while True:
+        _acquire()
+        try:
+            server = get_connection(smtp_host, smtp_port, smtp_user, smtp_password)
+            server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            close()
+            if reconnected:
+                raise
+            reconnected = True
+            continue
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+            if not is_transient(e) or throttle_attempt >= SMTP_THROTTLE_RETRIES:
+                raise
+            # После 421 сервер закрывает сессию, после остальных — начинаем с новой
+            close()
+            _on_transient(throttle_attempt, is_throttled(e))
+            throttle_attempt += 1
+            continue
+        _state['messages'] += 1
+        _bucket['rate'] = min(_bucket['max_rate'], _bucket['rate'] + SMTP_RATE_INCREASE)
+        return
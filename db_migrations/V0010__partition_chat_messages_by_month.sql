@@ -0,0 +1,118 @@
+-- Переводим chat_messages на помесячное секционирование по created_at.
+-- Горячие секции остаются в chat_messages, старые переносятся в chat_messages_archive
+-- функцией archive_chat_messages_partitions() и остаются доступны через историю чата.
+
+ALTER TABLE chat_messages RENAME TO chat_messages_legacy;
+
+CREATE TABLE chat_messages (
+    id INTEGER NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+    user_email VARCHAR(255) NOT NULL,
+    user_name VARCHAR(255) NOT NULL,
+    user_role VARCHAR(50) NOT NULL,
+    avatar VARCHAR(10) NOT NULL,
+    message_text TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    is_removed BOOLEAN DEFAULT FALSE,
+    removed_by VARCHAR(255),
+    removed_at TIMESTAMP,
+    is_edited BOOLEAN DEFAULT FALSE,
+    edited_at TIMESTAMP WITH TIME ZONE,
+    edited_by VARCHAR(255),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE chat_messages_id_seq OWNED BY chat_messages.id;
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at);
+
+-- Архив: та же структура, сюда переподключаются отсоединённые секции
+CREATE TABLE chat_messages_archive (
+    LIKE chat_messages INCLUDING DEFAULTS,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_archive_created_at ON chat_messages_archive(created_at);
+
+COMMENT ON TABLE chat_messages IS 'Сообщения чата, помесячные секции горячего окна';
+COMMENT ON TABLE chat_messages_archive IS 'Архивные помесячные секции сообщений чата';
+
+-- Создание секции за месяц, в который попадает p_month
+CREATE OR REPLACE FUNCTION create_chat_messages_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::DATE;
+    v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    v_name TEXT := 'chat_messages_y' || to_char(v_start, 'YYYY') || 'm' || to_char(v_start, 'MM');
+BEGIN
+    IF to_regclass(v_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+    END IF;
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Перенос секций старше p_keep_months месяцев в архив.
+-- Возвращает имена перенесённых секций.
+CREATE OR REPLACE FUNCTION archive_chat_messages_partitions(p_keep_months INTEGER)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_boundary TIMESTAMP := date_trunc('month', CURRENT_TIMESTAMP) - make_interval(months => p_keep_months);
+    v_part RECORD;
+BEGIN
+    FOR v_part IN
+        SELECT c.relname AS name,
+               pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'chat_messages'::regclass
+          AND c.relname ~ '^chat_messages_y[0-9]{4}m[0-9]{2}$'
+        ORDER BY c.relname
+    LOOP
+        IF to_date(substring(v_part.name FROM '([0-9]{4}m[0-9]{2})$'), 'YYYY"m"MM') + INTERVAL '1 month' <= v_boundary THEN
+            EXECUTE format('ALTER TABLE chat_messages DETACH PARTITION %I', v_part.name);
+            EXECUTE format('ALTER TABLE chat_messages_archive ATTACH PARTITION %I %s', v_part.name, v_part.bound);
+            RETURN NEXT v_part.name;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Обслуживание: секции на p_ahead_months вперёд + архивирование старых
+CREATE OR REPLACE FUNCTION maintain_chat_messages_partitions(p_keep_months INTEGER, p_ahead_months INTEGER)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    i INTEGER;
+BEGIN
+    FOR i IN 0..p_ahead_months LOOP
+        PERFORM create_chat_messages_partition((CURRENT_DATE + make_interval(months => i))::DATE);
+    END LOOP;
+    RETURN QUERY SELECT archive_chat_messages_partitions(p_keep_months);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Секции под существующие сообщения и на несколько месяцев вперёд
+DO $$
+DECLARE
+    v_month DATE := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM chat_messages_legacy), CURRENT_TIMESTAMP))::DATE;
+BEGIN
+    WHILE v_month <= (CURRENT_DATE + INTERVAL '3 months') LOOP
+        PERFORM create_chat_messages_partition(v_month);
+        v_month := (v_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS chat_messages_default PARTITION OF chat_messages DEFAULT;
+
+INSERT INTO chat_messages (
+    id, user_email, user_name, user_role, avatar, message_text, created_at,
+    is_removed, removed_by, removed_at, is_edited, edited_at, edited_by
+)
+SELECT id, user_email, user_name, user_role, avatar, message_text, COALESCE(created_at, CURRENT_TIMESTAMP),
+       is_removed, removed_by, removed_at, is_edited, edited_at, edited_by
+FROM chat_messages_legacy;
+
+DROP TABLE chat_messages_legacy;
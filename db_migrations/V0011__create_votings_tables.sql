@@ -0,0 +1,49 @@
+-- Голосования хранятся на сервере; счётчики по вариантам ведутся триггером,
+-- поэтому итоги считываются за O(число вариантов), без пересчёта голосов.
+CREATE TABLE IF NOT EXISTS votings (
+    id VARCHAR(64) PRIMARY KEY,
+    title VARCHAR(500) NOT NULL,
+    created_by VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    ends_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    notification_sent_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS voting_options (
+    voting_id VARCHAR(64) NOT NULL REFERENCES votings(id) ON DELETE CASCADE,
+    option_index INTEGER NOT NULL,
+    option_text VARCHAR(500) NOT NULL,
+    votes_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (voting_id, option_index)
+);
+
+CREATE TABLE IF NOT EXISTS voting_votes (
+    voting_id VARCHAR(64) NOT NULL,
+    voter_email VARCHAR(255) NOT NULL,
+    option_index INTEGER NOT NULL,
+    voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (voting_id, voter_email, option_index),
+    FOREIGN KEY (voting_id, option_index) REFERENCES voting_options(voting_id, option_index) ON DELETE CASCADE
+);
+
+COMMENT ON COLUMN voting_options.votes_count IS 'Число голосов за вариант, поддерживается триггером на voting_votes';
+
+CREATE OR REPLACE FUNCTION update_voting_option_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE voting_options SET votes_count = votes_count + 1
+        WHERE voting_id = NEW.voting_id AND option_index = NEW.option_index;
+        RETURN NEW;
+    END IF;
+    UPDATE voting_options SET votes_count = votes_count - 1
+    WHERE voting_id = OLD.voting_id AND option_index = OLD.option_index;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_voting_votes_counter
+AFTER INSERT OR DELETE ON voting_votes
+FOR EACH ROW EXECUTE FUNCTION update_voting_option_counter();
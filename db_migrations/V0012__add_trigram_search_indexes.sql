@@ -0,0 +1,15 @@
+-- Нечёткий поиск участников по ФИО, фрагменту телефона и номеру участка (action=search_users)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm ON users
+USING gin (lower(last_name || ' ' || first_name || ' ' || COALESCE(middle_name, '')) gin_trgm_ops)
+WHERE status = 'active';
+
+-- Телефоны хранятся в разных форматах, ищем по одним цифрам
+CREATE INDEX IF NOT EXISTS idx_users_phone_digits_trgm ON users
+USING gin (regexp_replace(phone, '[^0-9]', '', 'g') gin_trgm_ops)
+WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_users_plot_number_trgm ON users
+USING gin (plot_number gin_trgm_ops)
+WHERE status = 'active';
@@ -0,0 +1,137 @@
+-- Сводка по участкам: собственник, члены, статус оплаты и контакты.
+-- Поддерживается триггером на users: при изменении пересчитывается только затронутый участок.
+CREATE TABLE IF NOT EXISTS plot_registry (
+    plot_number VARCHAR(50) PRIMARY KEY,
+    owner_user_id INTEGER,
+    owner_name VARCHAR(310),
+    owner_email VARCHAR(255),
+    owner_phone VARCHAR(20),
+    owner_registered BOOLEAN NOT NULL DEFAULT FALSE,
+    members_count INTEGER NOT NULL DEFAULT 0,
+    members JSONB NOT NULL DEFAULT '[]'::jsonb,
+    payment_status VARCHAR(50) NOT NULL DEFAULT 'unpaid',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE plot_registry IS 'Сводка по участкам, ведётся триггером trg_users_plot_registry';
+COMMENT ON COLUMN plot_registry.owner_registered IS 'Собственник сам зарегистрирован на сайте (иначе ФИО из owner_* полей члена)';
+
+CREATE OR REPLACE FUNCTION refresh_plot_registry(p_plot_number VARCHAR)
+RETURNS VOID AS $$
+DECLARE
+    v_owner users%ROWTYPE;
+    v_proxy users%ROWTYPE;
+    v_members JSONB;
+    v_members_count INTEGER;
+    v_payment_status VARCHAR(50);
+BEGIN
+    IF p_plot_number IS NULL OR p_plot_number = '' THEN
+        RETURN;
+    END IF;
+
+    SELECT COUNT(*),
+           COALESCE(jsonb_agg(jsonb_build_object(
+               'id', id,
+               'name', trim(last_name || ' ' || first_name || ' ' || COALESCE(middle_name, '')),
+               'email', email,
+               'role', role,
+               'isOwner', COALESCE(is_plot_owner, false) OR COALESCE(owner_is_same, false)
+           ) ORDER BY id), '[]'::jsonb),
+           CASE
+               WHEN bool_or(payment_status = 'paid') THEN 'paid'
+               WHEN bool_or(payment_status = 'partial') THEN 'partial'
+               ELSE 'unpaid'
+           END
+    INTO v_members_count, v_members, v_payment_status
+    FROM users
+    WHERE plot_number = p_plot_number AND status = 'active';
+
+    IF v_members_count = 0 THEN
+        DELETE FROM plot_registry WHERE plot_number = p_plot_number;
+        RETURN;
+    END IF;
+
+    -- Зарегистрированный собственник: отмеченный is_plot_owner, иначе самый ранний с owner_is_same
+    SELECT * INTO v_owner
+    FROM users
+    WHERE plot_number = p_plot_number AND status = 'active'
+      AND (is_plot_owner = true OR owner_is_same = true)
+    ORDER BY is_plot_owner DESC, id
+    LIMIT 1;
+
+    IF v_owner.id IS NOT NULL THEN
+        v_payment_status := COALESCE(v_owner.payment_status, v_payment_status);
+        INSERT INTO plot_registry (plot_number, owner_user_id, owner_name, owner_email, owner_phone,
+                                   owner_registered, members_count, members, payment_status, updated_at)
+        VALUES (p_plot_number, v_owner.id,
+                trim(v_owner.last_name || ' ' || v_owner.first_name || ' ' || COALESCE(v_owner.middle_name, '')),
+                v_owner.email, v_owner.phone, TRUE, v_members_count, v_members, v_payment_status, CURRENT_TIMESTAMP)
+        ON CONFLICT (plot_number) DO UPDATE SET
+            owner_user_id = EXCLUDED.owner_user_id,
+            owner_name = EXCLUDED.owner_name,
+            owner_email = EXCLUDED.owner_email,
+            owner_phone = EXCLUDED.owner_phone,
+            owner_registered = EXCLUDED.owner_registered,
+            members_count = EXCLUDED.members_count,
+            members = EXCLUDED.members,
+            payment_status = EXCLUDED.payment_status,
+            updated_at = EXCLUDED.updated_at;
+        RETURN;
+    END IF;
+
+    -- Собственник не зарегистрирован: ФИО из owner_* полей, контакт — самый ранний член участка
+    SELECT * INTO v_proxy
+    FROM users
+    WHERE plot_number = p_plot_number AND status = 'active'
+    ORDER BY (owner_last_name IS NOT NULL) DESC, id
+    LIMIT 1;
+
+    INSERT INTO plot_registry (plot_number, owner_user_id, owner_name, owner_email, owner_phone,
+                               owner_registered, members_count, members, payment_status, updated_at)
+    VALUES (p_plot_number, NULL,
+            NULLIF(trim(COALESCE(v_proxy.owner_last_name, '') || ' ' || COALESCE(v_proxy.owner_first_name, '') || ' ' || COALESCE(v_proxy.owner_middle_name, '')), ''),
+            v_proxy.email, v_proxy.phone, FALSE, v_members_count, v_members, v_payment_status, CURRENT_TIMESTAMP)
+    ON CONFLICT (plot_number) DO UPDATE SET
+        owner_user_id = EXCLUDED.owner_user_id,
+        owner_name = EXCLUDED.owner_name,
+        owner_email = EXCLUDED.owner_email,
+        owner_phone = EXCLUDED.owner_phone,
+        owner_registered = EXCLUDED.owner_registered,
+        members_count = EXCLUDED.members_count,
+        members = EXCLUDED.members,
+        payment_status = EXCLUDED.payment_status,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION users_plot_registry_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND
+       (OLD.plot_number, OLD.status, OLD.first_name, OLD.last_name, OLD.middle_name, OLD.email, OLD.phone,
+        OLD.role, OLD.payment_status, OLD.owner_is_same, OLD.is_plot_owner,
+        OLD.owner_first_name, OLD.owner_last_name, OLD.owner_middle_name)
+       IS NOT DISTINCT FROM
+       (NEW.plot_number, NEW.status, NEW.first_name, NEW.last_name, NEW.middle_name, NEW.email, NEW.phone,
+        NEW.role, NEW.payment_status, NEW.owner_is_same, NEW.is_plot_owner,
+        NEW.owner_first_name, NEW.owner_last_name, NEW.owner_middle_name) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_plot_registry(OLD.plot_number);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.plot_number IS DISTINCT FROM OLD.plot_number) THEN
+        PERFORM refresh_plot_registry(NEW.plot_number);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_plot_registry
+AFTER INSERT OR UPDATE OR DELETE ON users
+FOR EACH ROW EXECUTE FUNCTION users_plot_registry_trigger();
+
+-- Начальное заполнение
+SELECT refresh_plot_registry(plot_number)
+FROM (SELECT DISTINCT plot_number FROM users WHERE status = 'active') plots;
@@ -0,0 +1,98 @@
+-- Счётчики для сводной панели правления (action=stats) и версии данных для ETag.
+
+-- Версии наборов данных: увеличиваются триггерами при каждом изменении
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version(p_name VARCHAR)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO data_versions (name, version, updated_at)
+    VALUES (p_name, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (name) DO UPDATE SET version = data_versions.version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    metric VARCHAR(50) NOT NULL,
+    bucket VARCHAR(50) NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, bucket)
+);
+
+COMMENT ON TABLE dashboard_counters IS 'Агрегаты по активным пользователям и сообщениям чата, ведутся триггерами';
+
+CREATE OR REPLACE FUNCTION adjust_dashboard_counter(p_metric VARCHAR, p_bucket VARCHAR, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO dashboard_counters (metric, bucket, value)
+    VALUES (p_metric, COALESCE(p_bucket, 'unknown'), p_delta)
+    ON CONFLICT (metric, bucket) DO UPDATE SET value = dashboard_counters.value + p_delta;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION users_dashboard_counters_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'active' THEN
+        PERFORM adjust_dashboard_counter('users_by_role', OLD.role, -1);
+        PERFORM adjust_dashboard_counter('users_by_payment_status', COALESCE(OLD.payment_status, 'unpaid'), -1);
+        PERFORM adjust_dashboard_counter('registrations_by_month', to_char(OLD.registered_at, 'YYYY-MM'), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'active' THEN
+        PERFORM adjust_dashboard_counter('users_by_role', NEW.role, 1);
+        PERFORM adjust_dashboard_counter('users_by_payment_status', COALESCE(NEW.payment_status, 'unpaid'), 1);
+        PERFORM adjust_dashboard_counter('registrations_by_month', to_char(NEW.registered_at, 'YYYY-MM'), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_dashboard_counters
+AFTER INSERT OR DELETE OR UPDATE OF status, role, payment_status, registered_at ON users
+FOR EACH ROW EXECUTE FUNCTION users_dashboard_counters_trigger();
+
+CREATE OR REPLACE FUNCTION chat_messages_dashboard_counters_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM adjust_dashboard_counter('messages_by_day', to_char(NEW.created_at, 'YYYY-MM-DD'), 1);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_chat_messages_dashboard_counters
+AFTER INSERT ON chat_messages
+FOR EACH ROW EXECUTE FUNCTION chat_messages_dashboard_counters_trigger();
+
+-- Версия панели увеличивается один раз на оператор, а не на каждую строку
+CREATE OR REPLACE FUNCTION bump_dashboard_version_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_data_version('dashboard');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_dashboard_version
+AFTER INSERT OR DELETE OR UPDATE OF status, role, payment_status, registered_at ON users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_dashboard_version_trigger();
+
+CREATE TRIGGER trg_chat_messages_dashboard_version
+AFTER INSERT ON chat_messages
+FOR EACH STATEMENT EXECUTE FUNCTION bump_dashboard_version_trigger();
+
+-- Начальное заполнение
+INSERT INTO dashboard_counters (metric, bucket, value)
+SELECT 'users_by_role', COALESCE(role, 'unknown'), COUNT(*) FROM users WHERE status = 'active' GROUP BY 2
+UNION ALL
+SELECT 'users_by_payment_status', COALESCE(payment_status, 'unpaid'), COUNT(*) FROM users WHERE status = 'active' GROUP BY 2
+UNION ALL
+SELECT 'registrations_by_month', COALESCE(to_char(registered_at, 'YYYY-MM'), 'unknown'), COUNT(*) FROM users WHERE status = 'active' GROUP BY 2
+UNION ALL
+SELECT 'messages_by_day', to_char(created_at, 'YYYY-MM-DD'), COUNT(*) FROM chat_messages GROUP BY 2
+ON CONFLICT (metric, bucket) DO UPDATE SET value = EXCLUDED.value;
+
+SELECT bump_data_version('dashboard');
@@ -0,0 +1,48 @@
+-- Почти все чтения users идут с фильтром status = 'active'.
+-- Заменяем малоселективный idx_users_status частичными индексами по горячим выборкам,
+-- а давно удалённых пользователей переносим в users_archive (см. функцию maintenance).
+
+CREATE INDEX IF NOT EXISTS idx_users_active_email ON users(email) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_users_active_name ON users(last_name, first_name) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_users_active_plot ON users(plot_number) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_users_deleted_updated_at ON users(updated_at) WHERE status = 'deleted';
+
+DROP INDEX IF EXISTS idx_users_status;
+
+CREATE TABLE IF NOT EXISTS users_archive (
+    LIKE users INCLUDING DEFAULTS,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_archive_email ON users_archive(email);
+
+COMMENT ON TABLE users_archive IS 'Пользователи, удалённые более USERS_PURGE_RETENTION_DAYS дней назад';
+
+-- Перенос пачки удалённых пользователей старше p_retention_days дней в архив.
+-- Возвращает число перенесённых строк.
+CREATE OR REPLACE FUNCTION purge_deleted_users(p_retention_days INTEGER, p_batch_size INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_moved INTEGER;
+BEGIN
+    WITH moved AS (
+        DELETE FROM users
+        WHERE id IN (
+            SELECT id FROM users
+            WHERE status = 'deleted'
+              AND updated_at < CURRENT_TIMESTAMP - make_interval(days => p_retention_days)
+            ORDER BY updated_at
+            LIMIT p_batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    )
+    INSERT INTO users_archive
+    SELECT moved.*, CURRENT_TIMESTAMP FROM moved
+    ON CONFLICT (id) DO NOTHING;
+
+    GET DIAGNOSTICS v_moved = ROW_COUNT;
+    RETURN v_moved;
+END;
+$$ LANGUAGE plpgsql;
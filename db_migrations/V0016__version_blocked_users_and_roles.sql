@@ -0,0 +1,21 @@
+-- Версии для кэша users-api: список заблокированных в чате и роли пользователей.
+-- Тёплые инстансы сверяют версию и перечитывают данные только после изменений.
+
+CREATE OR REPLACE FUNCTION bump_data_version_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_data_version(TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_blocked_chat_users_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON blocked_chat_users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_trigger('chat_blocked');
+
+CREATE TRIGGER trg_users_roles_version
+AFTER INSERT OR DELETE OR UPDATE OF email, role ON users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_trigger('user_roles');
+
+SELECT bump_data_version('chat_blocked');
+SELECT bump_data_version('user_roles');
@@ -0,0 +1,26 @@
+-- Уведомления о событиях чата для long-poll (action=chat_wait в users-api).
+-- Любое изменение сообщений или блокировок увеличивает версию в data_versions,
+-- а каждое увеличение версии чата рассылается в канал chat_events.
+-- Цена: каждый оператор над chat_messages обновляет одну строку data_versions ('chat_messages'),
+-- поэтому параллельные вставки сообщений ждут друг друга на её блокировке до коммита.
+-- Вставки чата короткие и идут в autocommit, для объёма чата СНТ это допустимо.
+
+CREATE TRIGGER trg_chat_messages_version
+AFTER INSERT OR UPDATE OR DELETE ON chat_messages
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_trigger('chat_messages');
+
+CREATE OR REPLACE FUNCTION notify_chat_event_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('chat_events', NEW.name || ':' || NEW.version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_data_versions_chat_notify
+AFTER INSERT OR UPDATE ON data_versions
+FOR EACH ROW
+WHEN (NEW.name IN ('chat_messages', 'chat_blocked'))
+EXECUTE FUNCTION notify_chat_event_trigger();
+
+SELECT bump_data_version('chat_messages');
@@ -0,0 +1,8 @@
+-- Версия реестра пользователей для ETag списка в users-api:
+-- любое добавление, изменение или мягкое удаление пользователя увеличивает её один раз на оператор.
+
+CREATE TRIGGER trg_users_registry_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version_trigger('users_registry');
+
+SELECT bump_data_version('users_registry');
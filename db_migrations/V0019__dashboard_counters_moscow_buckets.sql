@@ -0,0 +1,58 @@
+-- Корзины dashboard_counters по московскому времени (как фильтр в action=stats)
+-- и без лишней горячей строки на каждую вставку сообщения.
+-- Отметки времени хранятся в UTC, поэтому переводим их в Europe/Moscow перед to_char.
+
+-- STABLE, а не IMMUTABLE: to_char зависит от настроек сессии, поэтому функцию нельзя использовать в индексах
+CREATE OR REPLACE FUNCTION moscow_bucket(p_value TIMESTAMP, p_format VARCHAR)
+RETURNS VARCHAR AS $$
+    SELECT to_char(timezone('Europe/Moscow', timezone('UTC', p_value)), p_format);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION users_dashboard_counters_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'active' THEN
+        PERFORM adjust_dashboard_counter('users_by_role', OLD.role, -1);
+        PERFORM adjust_dashboard_counter('users_by_payment_status', COALESCE(OLD.payment_status, 'unpaid'), -1);
+        PERFORM adjust_dashboard_counter('registrations_by_month', moscow_bucket(OLD.registered_at, 'YYYY-MM'), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'active' THEN
+        PERFORM adjust_dashboard_counter('users_by_role', NEW.role, 1);
+        PERFORM adjust_dashboard_counter('users_by_payment_status', COALESCE(NEW.payment_status, 'unpaid'), 1);
+        PERFORM adjust_dashboard_counter('registrations_by_month', moscow_bucket(NEW.registered_at, 'YYYY-MM'), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Горячая строка: все сообщения одного дня увеличивают одну строку messages_by_day.
+-- Блокировка держится только до коммита вставки, для объёма чата СНТ этого достаточно;
+-- при росте нагрузки строку дня можно разбить на несколько корзин и суммировать при чтении.
+CREATE OR REPLACE FUNCTION chat_messages_dashboard_counters_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM adjust_dashboard_counter('messages_by_day', moscow_bucket(NEW.created_at, 'YYYY-MM-DD'), 1);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Вставка сообщения уже увеличивает версию chat_messages (V0017), она входит в ETag сводки;
+-- отдельное обновление строки 'dashboard' на каждое сообщение не нужно
+DROP TRIGGER IF EXISTS trg_chat_messages_dashboard_version ON chat_messages;
+
+-- Пересчёт корзин по времени и сообщениям в московском времени
+DELETE FROM dashboard_counters WHERE metric IN ('registrations_by_month', 'messages_by_day');
+
+INSERT INTO dashboard_counters (metric, bucket, value)
+SELECT 'registrations_by_month', COALESCE(moscow_bucket(registered_at, 'YYYY-MM'), 'unknown'), COUNT(*) FROM users WHERE status = 'active' GROUP BY 2
+UNION ALL
+SELECT 'messages_by_day', moscow_bucket(created_at, 'YYYY-MM-DD'), COUNT(*)
+FROM (
+    SELECT created_at FROM chat_messages
+    UNION ALL
+    SELECT created_at FROM chat_messages_archive
+) messages
+GROUP BY 2
+ON CONFLICT (metric, bucket) DO UPDATE SET value = EXCLUDED.value;
+
+SELECT bump_data_version('dashboard');
@@ -0,0 +1,3 @@
+-- Импорт реестра ищет уже зарегистрированных по LOWER(email) = ANY(...).
+-- Индекс на LOWER(email) из V0006 не был создан: имя idx_users_email уже занято индексом V0001 на email
+CREATE INDEX IF NOT EXISTS idx_users_lower_email ON users (LOWER(email));
@@ -6,10 +6,13 @@ import PrivateChat from './PrivateChat';
 import ChatMessage from './chat/ChatMessage';
 import ChatInput from './chat/ChatInput';
 import OnlineUsersPanel from './chat/OnlineUsersPanel';
-import { useChatState, UserRole, Message } from './chat/useChatState';
+import { useChatState, rememberWriteLsn, UserRole, Message } from './chat/useChatState';
 import { useChatOnlineUsers } from './chat/useChatOnlineUsers';
 import { containsProfanity, getRoleAvatar, playNotificationSound } from './chat/chatHelpers';
 
+// Совпадает с MODERATION_BULK_MAX_ITEMS в users-api
+const MODERATION_BULK_MAX_ITEMS = 500;
+
 interface ChatProps {
   isLoggedIn: boolean;
   userRole: UserRole;
@@ -89,6 +92,7 @@ const Chat = ({ isLoggedIn, userRole, currentUserEmail }: ChatProps) => {
       });
       
       if (response.ok) {
+        rememberWriteLsn(response);
         toast.success('Сообщение удалено');
         refreshMessages();
       } else {
@@ -136,6 +140,7 @@ const Chat = ({ isLoggedIn, userRole, currentUserEmail }: ChatProps) => {
       });
       
       if (response.ok) {
+        rememberWriteLsn(response);
         toast.success('Сообщение изменено');
         refreshMessages();
       } else {
@@ -318,6 +323,7 @@ const Chat = ({ isLoggedIn, userRole, currentUserEmail }: ChatProps) => {
       });
       
       if (response.ok) {
+        rememberWriteLsn(response);
         setNewMessage('');
         toast.success('Сообщение отправлено');
         refreshMessages();
@@ -347,18 +353,20 @@ const Chat = ({ isLoggedIn, userRole, currentUserEmail }: ChatProps) => {
                     onClick={async () => {
                       if (confirm('Вы уверены? Это удалит ВСЕ сообщения из чата безвозвратно!')) {
                         try {
-                          // Удалить все сообщения через API
-                          const allMessages = messages.filter(m => !m.deleted);
-                          for (const msg of allMessages) {
-                            await fetch('https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35', {
+                          // Удаляем все сообщения массовым действием, пачками по лимиту сервера
+                          const messageIds = messages.filter(m => !m.deleted).map(m => m.id);
+                          for (let start = 0; start < messageIds.length; start += MODERATION_BULK_MAX_ITEMS) {
+                            const response = await fetch('https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35', {
                               method: 'PUT',
                               headers: { 'Content-Type': 'application/json' },
                               body: JSON.stringify({
-                                action: 'delete_message',
-                                messageId: msg.id,
+                                action: 'delete_messages',
+                                messageIds: messageIds.slice(start, start + MODERATION_BULK_MAX_ITEMS),
                                 deletedBy: currentUserEmail
                               })
                             });
+                            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                            rememberWriteLsn(response);
                           }
                           toast.success('Чат очищен');
                           refreshMessages();
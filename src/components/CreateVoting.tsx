@@ -3,6 +3,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/com
 import { Button } from '@/components/ui/button';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { registerVoting } from './voting/votingApi';
 
 interface CreateVotingProps {
   onBack?: () => void;
@@ -78,6 +79,7 @@ const CreateVoting = ({ onBack }: CreateVotingProps) => {
     votings.push(votingData);
     localStorage.setItem('snt_votings', JSON.stringify(votings));
 
+    registerVoting(votingData);
     window.dispatchEvent(new Event('votings-updated'));
 
     const sendNotifications = async () => {
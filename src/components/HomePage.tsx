@@ -8,6 +8,7 @@ import HomePageHero from './home/HomePageHero';
 import HomePageBenefits from './home/HomePageBenefits';
 import HomePageAbout from './home/HomePageAbout';
 import HomePageNewsSection from './home/HomePageNewsSection';
+import { notifyVotingCompleted } from './voting/votingApi';
 
 type UserRole = 'guest' | 'member' | 'board_member' | 'chairman' | 'admin';
 
@@ -152,27 +153,7 @@ const HomePage = ({ polls, news: initialNews, isLoggedIn, userRole, votes, handl
           return;
         }
 
-        const usersResponse = await fetch('https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35');
-        const usersData = await usersResponse.json();
-        const users = usersData.users || [];
-
-        const totalVotes = Object.values(voting.votes || {}).reduce((sum: number, count: any) => sum + count, 0);
-        const results = voting.options.map((option: string, idx: number) => {
-          const votes = voting.votes?.[idx] || 0;
-          const percentage = totalVotes > 0 ? ((votes / totalVotes) * 100).toFixed(1) : '0';
-          return { option, votes, percentage };
-        });
-
-        const response = await fetch('https://functions.poehali.dev/ba6cda1e-5207-4b2e-b0b9-30cce2155cd1', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            votingTitle: voting.title,
-            votingId: voting.id,
-            results,
-            users
-          })
-        });
+        const response = await notifyVotingCompleted(voting);
 
         if (response.ok) {
           localStorage.setItem(notificationSentKey, 'true');
@@ -8,6 +8,10 @@ import { Badge } from '@/components/ui/badge';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
 
+// Рассылка делится на шарды, которые функция отправляет параллельно (не больше MAX_SHARDS на сервере)
+const RECIPIENTS_PER_SHARD = 100;
+const MAX_SHARDS = 16;
+
 interface MassNotificationProps {
   onBack?: () => void;
 }
@@ -64,12 +68,9 @@ const MassNotification = ({ onBack }: MassNotificationProps) => {
     setIsSending(true);
 
     try {
-      const emailList = recipients.map((u: any) => ({
-        email: u.email,
-        firstName: u.firstName,
-        lastName: u.lastName,
-        plotNumber: u.plotNumber
-      }));
+      const audience = selectedRecipients === 'all'
+        ? { all: true, excludeRoles: ['admin'] }
+        : { paymentStatus: selectedRecipients, excludeRoles: ['admin'] };
 
       const response = await fetch('https://functions.poehali.dev/92ff7699-756a-4d4c-b3ab-dceb5c33e4f8', {
         method: 'POST',
@@ -78,9 +79,10 @@ const MassNotification = ({ onBack }: MassNotificationProps) => {
         },
         body: JSON.stringify({
           type: 'mass',
-          recipients: emailList,
+          audience,
           subject,
-          message
+          message,
+          shards: Math.min(Math.ceil(recipients.length / RECIPIENTS_PER_SHARD), MAX_SHARDS)
         })
       });
 
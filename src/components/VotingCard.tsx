@@ -4,6 +4,7 @@ import { Badge } from '@/components/ui/badge';
 import { Button } from '@/components/ui/button';
 import Icon from '@/components/ui/icon';
 import { toast } from 'sonner';
+import { castVote } from './voting/votingApi';
 
 interface VotingCardProps {
   voting: any;
@@ -34,7 +35,22 @@ const VotingCard = ({ voting, isLoggedIn, userRole, setActiveSection }: VotingCa
     }
   };
 
-  const handleSingleVote = (idx: number) => {
+  // Голос сохраняется на сервере; локально — только кэш для карточки
+  const submitVote = async (optionIndexes: number[]) => {
+    try {
+      const result = await castVote(voting.id, currentEmail, optionIndexes);
+      if (result.status === 'error') {
+        toast.error(result.error);
+        return false;
+      }
+      return true;
+    } catch (error) {
+      toast.error('Ошибка соединения');
+      return false;
+    }
+  };
+
+  const handleSingleVote = async (idx: number) => {
     const now = new Date();
     const endDate = new Date(voting.endDate);
     if (endDate < now) {
@@ -43,6 +59,8 @@ const VotingCard = ({ voting, isLoggedIn, userRole, setActiveSection }: VotingCa
       return;
     }
     
+    if (!(await submitVote([idx]))) return;
+    
     const votingsJSON = localStorage.getItem('snt_votings');
     if (votingsJSON) {
       const votings = JSON.parse(votingsJSON);
@@ -92,7 +110,7 @@ const VotingCard = ({ voting, isLoggedIn, userRole, setActiveSection }: VotingCa
     setShowDeleteConfirm(false);
   };
 
-  const handleMultipleVote = () => {
+  const handleMultipleVote = async () => {
     if (selectedOptions.length === 0) {
       toast.error('Выберите хотя бы один вариант');
       return;
@@ -106,6 +124,8 @@ const VotingCard = ({ voting, isLoggedIn, userRole, setActiveSection }: VotingCa
       return;
     }
     
+    if (!(await submitVote(selectedOptions))) return;
+    
     const votingsJSON = localStorage.getItem('snt_votings');
     if (votingsJSON) {
       const votings = JSON.parse(votingsJSON);
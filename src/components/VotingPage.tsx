@@ -4,6 +4,7 @@ import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import Icon from '@/components/ui/icon';
 import VotingCard from './VotingCard';
+import { notifyVotingCompleted, withServerVotes } from './voting/votingApi';
 
 interface VotingPageProps {
   isLoggedIn: boolean;
@@ -69,12 +70,12 @@ const VotingPage = ({ isLoggedIn, userRole, setActiveSection }: VotingPageProps)
           }
         }
         
-        const active = updatedVotings.filter((v: any) => {
+        const active = await withServerVotes(updatedVotings.filter((v: any) => {
           const endDate = new Date(v.endDate);
           return v.status === 'active' && endDate >= now;
-        });
+        }));
         
-        const completed = updatedVotings.filter((v: any) => v.status === 'completed' && !v.archived);
+        const completed = await withServerVotes(updatedVotings.filter((v: any) => v.status === 'completed' && !v.archived));
         
         // Сортировка
         completed.sort((a: any, b: any) => {
@@ -103,27 +104,7 @@ const VotingPage = ({ isLoggedIn, userRole, setActiveSection }: VotingPageProps)
         return;
       }
 
-      const usersResponse = await fetch('https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35');
-      const usersData = await usersResponse.json();
-      const users = usersData.users || [];
-
-      const totalVotes = Object.values(voting.votes || {}).reduce((sum: number, count: any) => sum + count, 0);
-      const results = voting.options.map((option: string, idx: number) => {
-        const votes = voting.votes?.[idx] || 0;
-        const percentage = totalVotes > 0 ? ((votes / totalVotes) * 100).toFixed(1) : '0';
-        return { option, votes, percentage };
-      });
-
-      const response = await fetch('https://functions.poehali.dev/ba6cda1e-5207-4b2e-b0b9-30cce2155cd1', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          votingTitle: voting.title,
-          votingId: voting.id,
-          results,
-          users
-        })
-      });
+      const response = await notifyVotingCompleted(voting);
 
       if (response.ok) {
         localStorage.setItem(notificationSentKey, 'true');
@@ -7,6 +7,7 @@ import { Badge } from '@/components/ui/badge';
 import { toast } from 'sonner';
 import jsPDF from 'jspdf';
 import autoTable from 'jspdf-autotable';
+import { fetchVotingResults, notifyVotingCompleted } from './voting/votingApi';
 
 interface VotingResultsProps {
   votingId: number;
@@ -42,6 +43,12 @@ const VotingResults = ({ votingId, onBack }: VotingResultsProps) => {
     
     if (!currentVoting) return;
     
+    // Счётчики голосов всех участников — с сервера
+    const serverVotes = await fetchVotingResults(currentVoting.id);
+    if (serverVotes) {
+      currentVoting = { ...currentVoting, votes: serverVotes };
+    }
+    
     // Проверяем, не истек ли срок голосования
     const now = new Date();
     const endDate = new Date(currentVoting.endDate);
@@ -273,29 +280,8 @@ const VotingResults = ({ votingId, onBack }: VotingResultsProps) => {
           <Button
             onClick={async () => {
               try {
-                // Получаем список всех пользователей
-                const usersResponse = await fetch('https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35');
-                const usersData = await usersResponse.json();
-                const users = usersData.users || [];
-
-                // Подсчитываем результаты
-                const results = voting.options.map((option: string, idx: number) => {
-                  const votes = voting.votes?.[idx] || 0;
-                  const percentage = totalVotes > 0 ? ((votes / totalVotes) * 100).toFixed(1) : '0';
-                  return { option, votes, percentage };
-                });
-
-                // Отправляем уведомления
-                const response = await fetch('https://functions.poehali.dev/ba6cda1e-5207-4b2e-b0b9-30cce2155cd1', {
-                  method: 'POST',
-                  headers: { 'Content-Type': 'application/json' },
-                  body: JSON.stringify({
-                    votingTitle: voting.title,
-                    votingId: voting.id,
-                    results,
-                    users
-                  })
-                });
+                // Итоги считает сервер; рассылку запускает администратор или председатель
+                const response = await notifyVotingCompleted(voting);
 
                 if (response.ok) {
                   const data = await response.json();
@@ -24,6 +24,29 @@ export interface BlockedUser {
 }
 
 const API_URL = 'https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35';
+const WAIT_RETRY_MIN_MS = 3000;
+const WAIT_RETRY_MAX_MS = 60000;
+
+// Позиция WAL последней записи (заголовок X-Db-Lsn): чтение с реплики не отстанет от своих изменений
+// и от чужих, о которых сообщил chat_wait
+let lastWriteLsn = '';
+
+// LSN вида 16/B374D848: сравниваем старшую и младшую части как числа
+const lsnParts = (lsn: string) => lsn.split('/').map((part) => parseInt(part, 16));
+
+const isNewerLsn = (lsn: string, than: string) => {
+  if (!than) return true;
+  const [hi, lo] = lsnParts(lsn);
+  const [thanHi, thanLo] = lsnParts(than);
+  return hi > thanHi || (hi === thanHi && lo > thanLo);
+};
+
+export const rememberWriteLsn = (response: Response) => {
+  const lsn = response.headers.get('X-Db-Lsn');
+  if (lsn && isNewerLsn(lsn, lastWriteLsn)) {
+    lastWriteLsn = lsn;
+  }
+};
 
 export const useChatState = () => {
   const [messages, setMessages] = useState<Message[]>([]);
@@ -34,7 +57,8 @@ export const useChatState = () => {
   // Загрузка сообщений из базы данных
   const loadMessages = async () => {
     try {
-      const response = await fetch(`${API_URL}?action=chat_messages`);
+      const minLsn = lastWriteLsn ? `&minLsn=${encodeURIComponent(lastWriteLsn)}` : '';
+      const response = await fetch(`${API_URL}?action=chat_messages${minLsn}`);
       const data = await response.json();
       
       if (data.messages) {
@@ -72,12 +96,41 @@ export const useChatState = () => {
 
   // Загрузка при монтировании
   useEffect(() => {
-    loadMessages();
-    
-    // Автообновление каждые 3 секунды
-    const interval = setInterval(loadMessages, 3000);
-    
-    return () => clearInterval(interval);
+    let active = true;
+    let version = '';
+
+    // Long-poll: сервер отвечает сразу после нового события в чате или по таймауту
+    // При ошибках пауза растёт от WAIT_RETRY_MIN_MS до WAIT_RETRY_MAX_MS, чтобы не занимать соединения БД впустую
+    const waitForChanges = async () => {
+      let retryDelay = WAIT_RETRY_MIN_MS;
+      while (active) {
+        try {
+          const response = await fetch(`${API_URL}?action=chat_wait&since=${encodeURIComponent(version)}`);
+          const data = response.ok ? await response.json() : null;
+
+          if (!active) break;
+          if (!data || typeof data.changed !== 'boolean') {
+            throw new Error(`Unexpected chat_wait response: HTTP ${response.status}`);
+          }
+          retryDelay = WAIT_RETRY_MIN_MS;
+          if (data.changed) {
+            version = data.version;
+            rememberWriteLsn(response);
+            await loadMessages();
+          }
+        } catch (error) {
+          console.error('Error waiting for chat events:', error);
+          await new Promise((resolve) => setTimeout(resolve, retryDelay));
+          retryDelay = Math.min(retryDelay * 2, WAIT_RETRY_MAX_MS);
+        }
+      }
+    };
+
+    waitForChanges();
+
+    return () => {
+      active = false;
+    };
   }, []);
 
   return {
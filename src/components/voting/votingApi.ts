@@ -0,0 +1,69 @@
+const USERS_API_URL = 'https://functions.poehali.dev/32ad22ff-5797-4a0d-9192-2ca5dee74c35';
+const VOTING_NOTIFICATION_URL = 'https://functions.poehali.dev/ba6cda1e-5207-4b2e-b0b9-30cce2155cd1';
+
+// Голосования и голоса хранятся на сервере (create_voting / cast_vote / voting_results);
+// localStorage остаётся кэшем для карточек и для голосований, созданных до переноса на сервер
+
+export const registerVoting = async (voting: any) => {
+  try {
+    await fetch(USERS_API_URL, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        action: 'create_voting',
+        votingId: String(voting.id),
+        title: voting.title,
+        options: voting.options,
+        endDate: voting.endDate,
+        createdBy: localStorage.getItem('current_user_email') || null
+      })
+    });
+  } catch (error) {
+    console.error('Error registering voting:', error);
+  }
+};
+
+// 'ok' — голос сохранён на сервере, 'legacy' — голосования нет на сервере (учитываем локально)
+export const castVote = async (votingId: number | string, email: string, options: number[]) => {
+  const response = await fetch(USERS_API_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ action: 'cast_vote', votingId: String(votingId), email, options })
+  });
+  if (response.ok) return { status: 'ok' as const };
+  if (response.status === 404) return { status: 'legacy' as const };
+  const data = await response.json().catch(() => ({}));
+  return { status: 'error' as const, error: data.error || 'Не удалось сохранить голос' };
+};
+
+export const fetchVotingResults = async (votingId: number | string) => {
+  try {
+    const response = await fetch(`${USERS_API_URL}?action=voting_results&votingId=${encodeURIComponent(String(votingId))}`);
+    if (!response.ok) return null;
+    const data = await response.json();
+    // Пустой список вариантов — голосования нет на сервере
+    if (!data.votes || Object.keys(data.votes).length === 0) return null;
+    return data.votes as { [key: string]: number };
+  } catch (error) {
+    console.error('Error loading voting results:', error);
+    return null;
+  }
+};
+
+// Подставляет серверные счётчики в голосования из localStorage
+export const withServerVotes = async (votings: any[]) =>
+  Promise.all(votings.map(async (voting) => {
+    const votes = await fetchVotingResults(voting.id);
+    return votes ? { ...voting, votes } : voting;
+  }));
+
+// Итоги и получателей берёт сервер по votingId; завершить голосование может только администратор или председатель
+export const notifyVotingCompleted = async (voting: any) =>
+  fetch(VOTING_NOTIFICATION_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      votingId: String(voting.id),
+      completedBy: localStorage.getItem('current_user_email') || null
+    })
+  });
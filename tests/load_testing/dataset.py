@@ -0,0 +1,284 @@
+'''Синтетический набор данных СНТ: генерация на стороне БД через generate_series с фиксированным seed'''
+import random
+
+# Все синтетические записи помечены доменом и префиксом участка — по ним же идёт очистка
+SYNTHETIC_DOMAIN = 'load.test'
+SYNTHETIC_PLOT_PREFIX = 'LT-'
+SYNTHETIC_PASSWORD = 'load-test'
+SYNTHETIC_VOTING_PREFIX = 'lt-voting-'
+
+DEFAULT_SCALE = {
+    'users': 10000,
+    'membersPerPlot': 1.3,
+    'chatMessages': 1000000,
+    'chatDays': 60,
+    'editedShare': 0.05,
+    'removedShare': 0.02,
+    'blockedShare': 0.01,
+    'onlineUsers': 300,
+    'resetTokens': 2000,
+    'votings': 20,
+    'votingOptions': 4,
+    'votersShare': 0.6,
+}
+
+CHAT_SEED_CHUNK = 50000
+
+ROLES_SQL = "(ARRAY['member','member','member','member','member','member','member','board_member','board_member','chairman'])"
+FIRST_NAMES_SQL = "(ARRAY['Иван','Пётр','Анна','Мария','Сергей','Ольга','Алексей','Елена','Дмитрий','Наталья'])"
+LAST_NAMES_SQL = "(ARRAY['Иванов','Петров','Смирнов','Кузнецов','Попов','Васильев','Соколов','Михайлов','Новиков','Фёдоров'])"
+
+
+def synthetic_email(index: int) -> str:
+    '''Email синтетического пользователя с номером index (с 1)'''
+    return f'user{index}@{SYNTHETIC_DOMAIN}'
+
+
+def resolve_scale(overrides: dict) -> dict:
+    '''Масштаб по умолчанию с переопределениями из командной строки'''
+    scale = dict(DEFAULT_SCALE)
+    for key, value in (overrides or {}).items():
+        if key in scale:
+            scale[key] = type(DEFAULT_SCALE[key])(value)
+    return scale
+
+
+def seed_users(cur, scale: dict):
+    '''Пользователи: владельцы участков и члены семьи, роли, оплата, даты регистрации'''
+    plots = max(int(scale['users'] / scale['membersPerPlot']), 1)
+    cur.execute(f'''
+        INSERT INTO users (
+            email, password, first_name, last_name, middle_name, phone,
+            plot_number, role, status, owner_is_same, is_plot_owner,
+            email_verified, payment_status, registered_at
+        )
+        SELECT
+            'user' || n || '@{SYNTHETIC_DOMAIN}',
+            %(password)s,
+            {FIRST_NAMES_SQL}[1 + floor(random() * 10)::int],
+            {LAST_NAMES_SQL}[1 + floor(random() * 10)::int],
+            NULL,
+            '+7990' || lpad(n::text, 7, '0'),
+            '{SYNTHETIC_PLOT_PREFIX}' || (1 + (n - 1) %% %(plots)s),
+            {ROLES_SQL}[1 + floor(random() * 10)::int],
+            CASE WHEN random() < 0.03 THEN 'deleted' ELSE 'active' END,
+            TRUE,
+            n <= %(plots)s,
+            TRUE,
+            CASE WHEN random() < 0.6 THEN 'paid' ELSE 'unpaid' END,
+            CURRENT_TIMESTAMP - random() * INTERVAL '3 years'
+        FROM generate_series(1, %(users)s) AS n
+        ON CONFLICT DO NOTHING
+    ''', {'password': SYNTHETIC_PASSWORD, 'plots': plots, 'users': scale['users']})
+    return cur.rowcount
+
+
+def seed_chat(cur, scale: dict):
+    '''Сообщения чата за chatDays дней, часть отредактирована или удалена модератором.
+
+    Пачки по CHAT_SEED_CHUNK коммитятся отдельно: триггер V0014 обновляет одни и те же
+    строки dashboard_counters, и в одной транзакции цепочки их версий растут без очистки.
+    '''
+    cur.execute('''
+        SELECT create_chat_messages_partition((CURRENT_DATE - make_interval(months => m))::DATE)
+        FROM generate_series(0, %s) AS m
+    ''', (scale['chatDays'] // 28 + 1,))
+
+    inserted = 0
+    for first in range(1, scale['chatMessages'] + 1, CHAT_SEED_CHUNK):
+        cur.execute(f'''
+            INSERT INTO chat_messages (
+                user_email, user_name, user_role, avatar, message_text, created_at,
+                is_removed, removed_by, removed_at, is_edited, edited_at, edited_by
+            )
+            SELECT
+                'user' || u || '@{SYNTHETIC_DOMAIN}',
+                'Участник ' || u,
+                'member',
+                'У',
+                'Сообщение ' || n || ' про участок {SYNTHETIC_PLOT_PREFIX}' || (1 + u %% 500),
+                created_at,
+                removed,
+                CASE WHEN removed THEN 'user1@{SYNTHETIC_DOMAIN}' END,
+                CASE WHEN removed THEN created_at + INTERVAL '10 minutes' END,
+                edited,
+                CASE WHEN edited THEN created_at + INTERVAL '2 minutes' END,
+                CASE WHEN edited THEN 'user' || u || '@{SYNTHETIC_DOMAIN}' END
+            FROM (
+                SELECT n,
+                       1 + floor(random() * %(users)s)::int AS u,
+                       CURRENT_TIMESTAMP - random() * make_interval(days => %(days)s) AS created_at,
+                       random() < %(removed)s AS removed,
+                       random() < %(edited)s AS edited
+                FROM generate_series(%(first)s, %(last)s) AS n
+            ) generated
+        ''', {
+            'users': scale['users'],
+            'days': scale['chatDays'],
+            'removed': scale['removedShare'],
+            'edited': scale['editedShare'],
+            'first': first,
+            'last': min(first + CHAT_SEED_CHUNK - 1, scale['chatMessages']),
+        })
+        inserted += cur.rowcount
+        cur.connection.commit()
+    return inserted
+
+
+def seed_blocked(cur, scale: dict):
+    '''Заблокированные в чате'''
+    cur.execute(f'''
+        INSERT INTO blocked_chat_users (email, blocked_by, block_reason)
+        SELECT 'user' || n || '@{SYNTHETIC_DOMAIN}', 'user1@{SYNTHETIC_DOMAIN}', 'Нагрузочный тест'
+        FROM generate_series(2, %(users)s) AS n
+        WHERE random() < %(share)s
+        ON CONFLICT (email) DO NOTHING
+    ''', {'users': scale['users'], 'share': scale['blockedShare']})
+    return cur.rowcount
+
+
+def seed_online(cur, scale: dict):
+    '''Пользователи онлайн с недавним heartbeat'''
+    cur.execute(f'''
+        INSERT INTO online_users (email, last_seen)
+        SELECT 'user' || n || '@{SYNTHETIC_DOMAIN}', CURRENT_TIMESTAMP - random() * INTERVAL '5 minutes'
+        FROM generate_series(1, LEAST(%(online)s, %(users)s)) AS n
+        ON CONFLICT (email) DO UPDATE SET last_seen = EXCLUDED.last_seen
+    ''', {'online': scale['onlineUsers'], 'users': scale['users']})
+    return cur.rowcount
+
+
+def seed_tokens(cur, scale: dict):
+    '''Токены сброса пароля: действующие, истёкшие и использованные'''
+    cur.execute(f'''
+        INSERT INTO password_reset_tokens (email, token, created_at, expires_at, used)
+        SELECT 'user' || (1 + floor(random() * %(users)s)::int) || '@{SYNTHETIC_DOMAIN}',
+               'lt-' || md5(random()::text || n),
+               created_at,
+               created_at + INTERVAL '1 hour',
+               random() < 0.3
+        FROM (
+            SELECT n, CURRENT_TIMESTAMP - random() * INTERVAL '3 days' AS created_at
+            FROM generate_series(1, %(tokens)s) AS n
+        ) generated
+    ''', {'users': scale['users'], 'tokens': scale['resetTokens']})
+    return cur.rowcount
+
+
+def seed_votings(cur, scale: dict):
+    '''Голосования с вариантами и голосами части участников.
+
+    Голоса каждого голосования коммитятся отдельно: счётчики voting_options ведёт триггер V0011,
+    и, как с dashboard_counters в seed_chat, одна большая транзакция раздувает цепочки версий.
+    '''
+    cur.execute(f'''
+        INSERT INTO votings (id, title, created_by, ends_at)
+        SELECT '{SYNTHETIC_VOTING_PREFIX}' || v, 'Голосование ' || v, 'user1@{SYNTHETIC_DOMAIN}',
+               CURRENT_TIMESTAMP + INTERVAL '7 days'
+        FROM generate_series(1, %(votings)s) AS v
+        ON CONFLICT (id) DO NOTHING
+    ''', {'votings': scale['votings']})
+    cur.execute(f'''
+        INSERT INTO voting_options (voting_id, option_index, option_text)
+        SELECT '{SYNTHETIC_VOTING_PREFIX}' || v, o, 'Вариант ' || (o + 1)
+        FROM generate_series(1, %(votings)s) AS v, generate_series(0, %(options)s - 1) AS o
+        ON CONFLICT DO NOTHING
+    ''', {'votings': scale['votings'], 'options': scale['votingOptions']})
+    cur.connection.commit()
+
+    inserted = 0
+    for voting in range(1, scale['votings'] + 1):
+        cur.execute(f'''
+            INSERT INTO voting_votes (voting_id, voter_email, option_index)
+            SELECT %(voting_id)s, 'user' || n || '@{SYNTHETIC_DOMAIN}', floor(random() * %(options)s)::int
+            FROM generate_series(1, %(users)s) AS n
+            WHERE random() < %(share)s
+            ON CONFLICT DO NOTHING
+        ''', {
+            'voting_id': f'{SYNTHETIC_VOTING_PREFIX}{voting}',
+            'options': scale['votingOptions'],
+            'users': scale['users'],
+            'share': scale['votersShare'],
+        })
+        inserted += cur.rowcount
+        cur.connection.commit()
+    return inserted
+
+
+def seed(conn, seed_value: int, overrides: dict = None) -> dict:
+    '''Заполнение БД синтетическими данными. Один seed даёт один и тот же набор.
+
+    Чат и голоса коммитятся пачками, поэтому при ошибке набор удаляется целиком через cleanup,
+    а не остаётся частично вставленным.
+    '''
+    scale = resolve_scale(overrides)
+    cur = conn.cursor()
+    try:
+        # setseed действует на random() до конца сессии
+        cur.execute('SELECT setseed(%s)', (random.Random(seed_value).uniform(-1, 1),))
+        counts = {
+            'users': seed_users(cur, scale),
+            'chatMessages': seed_chat(cur, scale),
+            'blocked': seed_blocked(cur, scale),
+            'online': seed_online(cur, scale),
+            'resetTokens': seed_tokens(cur, scale),
+            'votes': seed_votings(cur, scale),
+        }
+        conn.commit()
+        cur.execute('ANALYZE users, chat_messages, blocked_chat_users, online_users, password_reset_tokens, votings, voting_options, voting_votes')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        try:
+            cleanup(conn)
+        except Exception as cleanup_error:
+            print(f'Synthetic data cleanup failed: {cleanup_error}')
+        raise
+    finally:
+        cur.close()
+    return {'scale': scale, 'inserted': counts}
+
+
+def cleanup(conn) -> dict:
+    '''Удаление всех синтетических записей'''
+    like = f'%@{SYNTHETIC_DOMAIN}'
+    statements = {
+        'chatMessages': 'DELETE FROM chat_messages WHERE user_email LIKE %s',
+        'chatMessagesArchive': 'DELETE FROM chat_messages_archive WHERE user_email LIKE %s',
+        'blocked': 'DELETE FROM blocked_chat_users WHERE email LIKE %s',
+        'online': 'DELETE FROM online_users WHERE email LIKE %s',
+        'resetTokens': 'DELETE FROM password_reset_tokens WHERE email LIKE %s',
+        'users': 'DELETE FROM users WHERE email LIKE %s',
+        'usersArchive': 'DELETE FROM users_archive WHERE email LIKE %s',
+    }
+    cur = conn.cursor()
+    deleted = {}
+    try:
+        # Счётчики сообщений по дням ведёт триггер на INSERT, удаление вычитаем вручную (см. V0014, V0019)
+        cur.execute('''
+            UPDATE dashboard_counters d
+            SET value = d.value - c.removed
+            FROM (
+                SELECT moscow_bucket(created_at, 'YYYY-MM-DD') AS bucket, COUNT(*) AS removed
+                FROM (
+                    SELECT created_at FROM chat_messages WHERE user_email LIKE %s
+                    UNION ALL
+                    SELECT created_at FROM chat_messages_archive WHERE user_email LIKE %s
+                ) synthetic
+                GROUP BY 1
+            ) c
+            WHERE d.metric = 'messages_by_day' AND d.bucket = c.bucket
+        ''', (like, like))
+        # Варианты и голоса удаляются каскадом (V0011)
+        cur.execute('DELETE FROM votings WHERE id LIKE %s', (f'{SYNTHETIC_VOTING_PREFIX}%',))
+        deleted['votings'] = cur.rowcount
+        for name, statement in statements.items():
+            cur.execute(statement, (like,))
+            deleted[name] = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return {'deleted': deleted}
@@ -0,0 +1,160 @@
+'''Нагрузочный драйвер: воспроизводит типичную смесь запросов к users-api и считает пропускную способность'''
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from dataset import SYNTHETIC_PASSWORD, synthetic_email
+
+# Доли запросов примерно как у живого сайта: чат и heartbeat онлайна доминируют
+DEFAULT_MIX = {
+    'chat_messages': 35,
+    'online_heartbeat': 30,
+    'chat_history': 5,
+    'users_list': 5,
+    'stats': 5,
+    'search_users': 5,
+    'login': 10,
+    'send_message': 5,
+}
+
+
+def build_request(name: str, rng: random.Random, users: int) -> dict:
+    '''Событие API Gateway для одного запроса из смеси'''
+    index = rng.randint(1, users)
+    email = synthetic_email(index)
+
+    if name == 'chat_messages':
+        return {'httpMethod': 'GET', 'queryStringParameters': {'action': 'chat_messages'}}
+    if name == 'chat_history':
+        return {'httpMethod': 'GET', 'queryStringParameters': {'action': 'chat_history', 'limit': '50'}}
+    if name == 'users_list':
+        return {'httpMethod': 'GET', 'queryStringParameters': {}}
+    if name == 'stats':
+        return {'httpMethod': 'GET', 'queryStringParameters': {'action': 'stats'}}
+    if name == 'search_users':
+        query = rng.choice(['Иван', 'Петр', 'Смирн', 'LT-1', str(rng.randint(1, 999))])
+        return {'httpMethod': 'GET', 'queryStringParameters': {'action': 'search_users', 'q': query}}
+    if name == 'login':
+        return {
+            'httpMethod': 'POST',
+            'queryStringParameters': {},
+            'body': json.dumps({'action': 'login', 'email': email, 'password': SYNTHETIC_PASSWORD})
+        }
+    if name == 'online_heartbeat':
+        return {
+            'httpMethod': 'PUT',
+            'queryStringParameters': {},
+            'body': json.dumps({'action': 'update_online_status', 'email': email})
+        }
+    if name == 'send_message':
+        return {
+            'httpMethod': 'POST',
+            'queryStringParameters': {},
+            'body': json.dumps({
+                'action': 'send_message',
+                'userEmail': email,
+                'userName': f'Участник {index}',
+                'userRole': 'member',
+                'avatar': 'У',
+                'text': f'Нагрузочный тест {rng.random():.6f}'
+            })
+        }
+    raise ValueError(f'Unknown request type: {name}')
+
+
+def http_invoker(url: str, timeout: float = 30):
+    '''Отправка события на задеплоенную функцию по HTTP (keep-alive сессия на поток)'''
+    local = threading.local()
+
+    def invoke(event: dict) -> int:
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.request(
+            event['httpMethod'],
+            url,
+            params=event.get('queryStringParameters') or None,
+            data=event.get('body'),
+            headers={'Content-Type': 'application/json'},
+            timeout=timeout
+        )
+        return response.status_code
+
+    return invoke
+
+
+def handler_invoker(handler):
+    '''Вызов обработчика в этом же процессе (локальный прогон против тестовой БД)'''
+    def invoke(event: dict) -> int:
+        return handler(event, None)['statusCode']
+
+    return invoke
+
+
+def percentile(sorted_values: list, share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    position = min(int(len(sorted_values) * share), len(sorted_values) - 1)
+    return round(sorted_values[position], 2)
+
+
+def run(invoke, duration_seconds: float, concurrency: int, users: int, seed: int = 1, mix: dict = None) -> dict:
+    '''Прогон смеси запросов в concurrency потоков в течение duration_seconds'''
+    mix = mix or DEFAULT_MIX
+    names = list(mix.keys())
+    weights = [mix[name] for name in names]
+    deadline = time.monotonic() + duration_seconds
+    lock = threading.Lock()
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+
+    def worker(worker_index: int):
+        rng = random.Random(seed * 1000 + worker_index)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            event = build_request(name, rng, users)
+            started = time.perf_counter()
+            try:
+                status = invoke(event)
+                failed = status >= 400
+            except Exception:
+                failed = True
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies[name].append(elapsed_ms)
+                if failed:
+                    errors[name] += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, index) for index in range(concurrency)]:
+            future.result()
+    elapsed = time.monotonic() - started
+
+    by_request = {}
+    total = 0
+    for name in names:
+        values = sorted(latencies[name])
+        total += len(values)
+        if not values:
+            continue
+        by_request[name] = {
+            'count': len(values),
+            'errors': errors[name],
+            'p50Ms': percentile(values, 0.50),
+            'p95Ms': percentile(values, 0.95),
+            'p99Ms': percentile(values, 0.99),
+            'maxMs': round(values[-1], 2),
+        }
+
+    return {
+        'requests': total,
+        'errors': sum(errors.values()),
+        'seconds': round(elapsed, 2),
+        'throughputRps': round(total / elapsed, 1) if elapsed else 0.0,
+        'concurrency': concurrency,
+        'byRequest': by_request,
+    }
@@ -0,0 +1,87 @@
+'''Нагрузочное тестирование: синтетический набор данных СНТ и прогон смеси запросов к users-api.
+
+Только локально и только против отдельной БД: набор вставляет тысячи активных пользователей
+и сообщений, которые попали бы в реестр, сводку и рассылки. Адрес БД берётся из
+LOAD_TEST_DATABASE_URL; если он совпадает с DATABASE_URL, скрипт не запускается.
+
+  LOAD_TEST_DATABASE_URL=postgresql://localhost/snt_load python tests/load_testing/load_test.py seed --seed 42
+  LOAD_TEST_DATABASE_URL=... python tests/load_testing/load_test.py run --local backend/users-api --duration 30
+  LOAD_TEST_DATABASE_URL=... python tests/load_testing/load_test.py cleanup
+
+run --local выполняет обработчик users-api в этом процессе с DATABASE_URL=LOAD_TEST_DATABASE_URL;
+run --url шлёт запросы на развёрнутую копию users-api, подключённую к тестовой БД.
+Зависимости: psycopg2-binary, requests.
+'''
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import psycopg2
+
+import dataset
+import driver
+
+
+def load_test_dsn() -> str:
+    '''Адрес тестовой БД; отказ, если он не задан или указывает на рабочую БД функций'''
+    dsn = os.environ.get('LOAD_TEST_DATABASE_URL')
+    if not dsn:
+        sys.exit('LOAD_TEST_DATABASE_URL не задан: нужна отдельная БД для нагрузочного теста')
+    if dsn == os.environ.get('DATABASE_URL'):
+        sys.exit('LOAD_TEST_DATABASE_URL совпадает с DATABASE_URL: нагрузочный тест не запускается на рабочей БД')
+    return dsn
+
+
+def load_local_handler(path: str, dsn: str):
+    '''handler функции из каталога backend/<name>, подключённый к тестовой БД'''
+    os.environ['DATABASE_URL'] = dsn
+    sys.path.insert(0, os.path.abspath(path))
+    spec = importlib.util.spec_from_file_location('target_index', os.path.join(path, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Синтетические данные и нагрузочный прогон users-api')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed')
+    seed_parser.add_argument('--seed', type=int, default=1)
+    for key, value in dataset.DEFAULT_SCALE.items():
+        option = '--' + ''.join('-' + c.lower() if c.isupper() else c for c in key)
+        seed_parser.add_argument(option, dest=key, type=type(value), default=value)
+
+    subparsers.add_parser('cleanup')
+
+    run_parser = subparsers.add_parser('run')
+    target = run_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='users-api, подключённая к тестовой БД')
+    target.add_argument('--local', help='каталог функции, например backend/users-api')
+    run_parser.add_argument('--duration', type=float, default=30)
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--users', type=int, default=dataset.DEFAULT_SCALE['users'])
+    run_parser.add_argument('--seed', type=int, default=1)
+
+    args = parser.parse_args()
+    load_dsn = load_test_dsn()
+
+    if args.command == 'run':
+        if args.local:
+            invoke = driver.handler_invoker(load_local_handler(args.local, load_dsn))
+        else:
+            invoke = driver.http_invoker(args.url)
+        output = driver.run(invoke, args.duration, args.concurrency, args.users, args.seed)
+    else:
+        connection = psycopg2.connect(load_dsn, connect_timeout=5)
+        try:
+            if args.command == 'seed':
+                scale = {key: getattr(args, key) for key in dataset.DEFAULT_SCALE}
+                output = dataset.seed(connection, args.seed, scale)
+            else:
+                output = dataset.cleanup(connection)
+        finally:
+            connection.close()
+
+    print(json.dumps(output, ensure_ascii=False, indent=2))
@@ -0,0 +1,138 @@
+'''Фикстуры проверки планов: локальная БД с синтетическим набором load_testing и базовая линия планов.
+
+Нужна отдельная локальная БД с применёнными db_migrations и расширением pg_trgm:
+
+    QUERY_PLANS_DATABASE_URL=postgresql://localhost/snt_plans python -m pytest tests/query_plans
+
+При пустой БД набор заполняется через tests/load_testing/dataset.py (seed 1, масштаб по умолчанию).
+Таблицы расширения auth-email создаются в схеме QUERY_PLANS_AUTH_SCHEMA по SQL из его README
+и заполняются здесь же. Базовая линия записывается ключом --update-plan-baseline после намеренного
+изменения запроса, индекса или масштаба набора; обновлённый baseline.json коммитится вместе с изменением.
+'''
+import json
+import os
+import re
+import sys
+
+import psycopg2
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'users-api'))
+sys.path.insert(0, os.path.join(ROOT, 'tests', 'load_testing'))
+sys.path.insert(0, os.path.join(ROOT, 'backend', 'extensions', 'auth-email', 'auth'))
+
+import dataset  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+AUTH_README_PATH = os.path.join(ROOT, '.tmp', 'extension-auth-email-readme.md')
+AUTH_SCHEMA = os.environ.get('QUERY_PLANS_AUTH_SCHEMA', 'auth_plans')
+PLAN_SEED = 1
+AUTH_SCALE = {
+    'users': 10000,
+    'refreshTokensPerUser': 3,
+    'resetTokens': 2000,
+    'verificationTokens': 2000,
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-plan-baseline', action='store_true', default=False,
+        help='перезаписать tests/query_plans/baseline.json текущими планами'
+    )
+
+
+def auth_schema_sql() -> str:
+    '''CREATE TABLE/INDEX расширения auth-email — первый блок sql из его README'''
+    with open(AUTH_README_PATH, encoding='utf-8') as f:
+        match = re.search(r'```sql\n(.*?)```', f.read(), re.S)
+    return match.group(1)
+
+
+def seed_auth(cur):
+    '''Схема auth-email с пользователями, сессиями и кодами в масштабе AUTH_SCALE'''
+    cur.execute(f'CREATE SCHEMA {AUTH_SCHEMA}')
+    cur.execute(f'SET LOCAL search_path TO {AUTH_SCHEMA}')
+    cur.execute(auth_schema_sql())
+    cur.execute(f'''
+        INSERT INTO users (email, password_hash, name, email_verified, created_at, updated_at)
+        SELECT 'user' || n || '@{dataset.SYNTHETIC_DOMAIN}', 'x', 'Участник ' || n, random() < 0.9,
+               now() - random() * INTERVAL '1 year', now()
+        FROM generate_series(1, %(users)s) AS n
+    ''', AUTH_SCALE)
+    cur.execute('''
+        INSERT INTO refresh_tokens (user_id, token_hash, expires_at, created_at)
+        SELECT id, md5(id || '-' || t), issued_at + INTERVAL '30 days', issued_at
+        FROM (
+            SELECT u.id, t, now() - random() * INTERVAL '40 days' AS issued_at
+            FROM users u, generate_series(1, %(refreshTokensPerUser)s) AS t
+        ) g
+    ''', AUTH_SCALE)
+    for table, count_key in (('password_reset_tokens', 'resetTokens'), ('email_verification_tokens', 'verificationTokens')):
+        cur.execute(f'''
+            INSERT INTO {table} (user_id, token_hash, expires_at, created_at)
+            SELECT 1 + floor(random() * %(users)s)::int, lpad(floor(random() * 1000000)::text, 6, '0'),
+                   issued_at + INTERVAL '1 hour', issued_at
+            FROM (SELECT now() - random() * INTERVAL '2 hours' AS issued_at FROM generate_series(1, %(count)s)) g
+        ''', {'users': AUTH_SCALE['users'], 'count': AUTH_SCALE[count_key]})
+
+
+@pytest.fixture(scope='session')
+def plan_conn():
+    '''Соединение с локальной БД, заполненной синтетическим набором'''
+    dsn = os.environ.get('QUERY_PLANS_DATABASE_URL')
+    if not dsn:
+        pytest.skip('QUERY_PLANS_DATABASE_URL не задан: нужна локальная БД с применёнными миграциями')
+
+    conn = psycopg2.connect(dsn, connect_timeout=5)
+    cur = conn.cursor()
+    cur.execute('SELECT COUNT(*) FROM users WHERE email LIKE %s', (f'%@{dataset.SYNTHETIC_DOMAIN}',))
+    if cur.fetchone()[0] == 0:
+        dataset.seed(conn, PLAN_SEED)
+    cur.execute('SELECT to_regclass(%s)', (f'{AUTH_SCHEMA}.users',))
+    if cur.fetchone()[0] is None:
+        cur.execute('SELECT setseed(0.5)')
+        seed_auth(cur)
+    conn.commit()
+    # Статистика по всем таблицам запросов, а не только по заполняемым набором
+    conn.autocommit = True
+    cur.execute('ANALYZE')
+    conn.autocommit = False
+    cur.close()
+
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='session')
+def has_pg_trgm(plan_conn) -> bool:
+    '''Установлен ли pg_trgm: без него у search_users нет триграммных индексов V0012'''
+    with plan_conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        installed = cur.fetchone() is not None
+    plan_conn.rollback()
+    return installed
+
+
+@pytest.fixture(scope='session')
+def plan_baseline(request):
+    '''Базовая линия планов; в режиме --update-plan-baseline собирается заново и дописывается в конце сессии'''
+    plans = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            plans = json.load(f)
+
+    update = request.config.getoption('--update-plan-baseline')
+    if not update:
+        yield {'update': False, 'plans': plans}
+        return
+
+    recorded = {}
+    yield {'update': True, 'plans': recorded}
+    if recorded:
+        # Проверки, пропущенные в этом окружении (например, без pg_trgm), сохраняют прежнюю запись
+        plans.update(recorded)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(plans, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
@@ -0,0 +1,168 @@
+'''Планы горячих запросов users-api и auth-email.
+
+SQL берётся из backend/users-api/queries.py и auth/utils/queries.py расширения auth-email —
+тех же строк, что выполняют обработчики. Проверка не меняет настройки планировщика: план
+строится на реальном объёме синтетического набора.
+
+Без базовой линии проверяются абсолютные правила: нет последовательного сканирования
+горячих таблиц HOT_TABLES и используются индексы, на которые рассчитан запрос. С записью
+в baseline.json регрессией считается ещё новое последовательное сканирование любой таблицы,
+пропавший индекс или рост стоимости больше PLAN_COST_TOLERANCE раз.
+'''
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+import dataset
+import queries
+from conftest import AUTH_SCHEMA
+from utils import queries as auth_queries
+from utils.db import escape
+
+PLAN_COST_TOLERANCE = float(os.environ.get('PLAN_COST_TOLERANCE', '1.5'))
+# Секции chat_messages называются по месяцу — в базовой линии имя секции без даты
+PARTITION_SUFFIX_RE = re.compile(r'_y\d{4}m\d{2}')
+# Таблицы, растущие с числом участников и сообщений: полный проход по ним недопустим
+HOT_TABLES = {'users', 'chat_messages', 'voting_votes', 'refresh_tokens'}
+# Проверки поиска рассчитаны на триграммные индексы V0012
+TRGM_CHECKS = {'search_users_name', 'search_users_phone'}
+
+AUTH_S = f'{AUTH_SCHEMA}.'
+AUTH_EMAIL = escape(dataset.synthetic_email(1))
+
+
+def utc_now_literal() -> str:
+    return escape(datetime.utcnow().isoformat())
+
+
+# Имя -> (SQL, параметры, индексы, без которых план считается ошибочным)
+CHECKS = {
+    'login': (queries.LOGIN_SQL, lambda: (dataset.synthetic_email(1),), {'idx_users_active_email'}),
+    'users_list': (queries.USERS_LIST_SQL, lambda: (), set()),
+    'chat_messages': (queries.CHAT_MESSAGES_SQL, lambda: (datetime.utcnow() - timedelta(days=90),), set()),
+    'chat_history': (queries.CHAT_HISTORY_SQL, lambda: (2147483647, 51, 2147483647, 51, 51), set()),
+    'search_users_name': (queries.SEARCH_USERS_SQL, lambda: {
+        'q': 'иванов', 'like': '%иванов%', 'digits': '', 'digits_like': '%%', 'limit': 20,
+    }, {'idx_users_full_name_trgm'}),
+    'search_users_phone': (queries.SEARCH_USERS_SQL, lambda: {
+        'q': '79900001', 'like': '%79900001%', 'digits': '79900001', 'digits_like': '%79900001%', 'limit': 20,
+    }, {'idx_users_phone_digits_trgm'}),
+    'plot_registry_entry': (queries.PLOT_REGISTRY_ENTRY_SQL, lambda: (f'{dataset.SYNTHETIC_PLOT_PREFIX}1',), set()),
+    'online_now': (queries.ONLINE_NOW_SQL, lambda: (), set()),
+    'stats_counters': (queries.STATS_COUNTERS_SQL, lambda: (
+        (datetime.utcnow() - timedelta(days=365)).strftime('%Y-%m'),
+        (datetime.utcnow() - timedelta(days=29)).strftime('%Y-%m-%d'),
+    ), set()),
+    'voting_results': (queries.VOTING_RESULTS_SQL, lambda: (f'{dataset.SYNTHETIC_VOTING_PREFIX}1',), set()),
+    'vote_exists': (queries.VOTE_EXISTS_SQL, lambda: (
+        f'{dataset.SYNTHETIC_VOTING_PREFIX}1', dataset.synthetic_email(1),
+    ), {'voting_votes_pkey'}),
+    'import_existing_users': (queries.IMPORT_EXISTING_USERS_SQL, lambda: (
+        [dataset.synthetic_email(n) for n in range(1, 501)], [f'+7990{n:07d}' for n in range(1, 501)],
+    ), {'idx_users_lower_email', 'idx_users_phone'}),
+    'reset_token': (queries.RESET_TOKEN_SQL, lambda: ('lt-token',), set()),
+    # Шаблоны auth-email подставляют значения сами (простой протокол), параметров нет
+    'auth_login_rate_check': (
+        auth_queries.LOGIN_RATE_CHECK_SQL.format(S=AUTH_S, email=AUTH_EMAIL), lambda: None, set(),
+    ),
+    'auth_login_user': (
+        auth_queries.LOGIN_USER_SQL.format(S=AUTH_S, email=AUTH_EMAIL), lambda: None, set(),
+    ),
+    'auth_login_prune_sessions': (
+        lambda: auth_queries.PRUNE_REFRESH_TOKENS_SQL.format(S=AUTH_S, user_id=1, now=utc_now_literal(), limit=10),
+        lambda: None, {'idx_refresh_tokens_user_id'},
+    ),
+    'auth_refresh': (
+        lambda: auth_queries.REFRESH_TOKEN_SQL.format(
+            S=AUTH_S, token_hash=escape('0' * 64), user_id=1, now=utc_now_literal()
+        ),
+        lambda: None, {'idx_refresh_tokens_hash'},
+    ),
+    'auth_register_existing_user': (
+        auth_queries.REGISTER_EXISTING_USER_SQL.format(S=AUTH_S, email=AUTH_EMAIL), lambda: None, set(),
+    ),
+    'auth_register_cooldown': (
+        lambda: auth_queries.VERIFICATION_COOLDOWN_SQL.format(
+            S=AUTH_S, user_id=1, cooldown_start=escape((datetime.utcnow() - timedelta(seconds=60)).isoformat())
+        ),
+        lambda: None, set(),
+    ),
+    'auth_reset_user': (
+        auth_queries.RESET_USER_SQL.format(S=AUTH_S, email=AUTH_EMAIL), lambda: None, set(),
+    ),
+    'auth_reset_token': (
+        lambda: auth_queries.RESET_TOKEN_SQL.format(S=AUTH_S, user_id=1, code=escape('123456'), now=utc_now_literal()),
+        lambda: None, set(),
+    ),
+}
+
+
+def collect_plan_nodes(node: dict, nodes: list) -> list:
+    '''Все узлы плана в порядке обхода'''
+    nodes.append(node)
+    for child in node.get('Plans', []):
+        collect_plan_nodes(child, nodes)
+    return nodes
+
+
+def summarize_plan(cur, sql: str, params) -> dict:
+    '''Стоимость, последовательные сканирования и индексы плана'''
+    cur.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    plan = cur.fetchone()[0][0]['Plan']
+    nodes = collect_plan_nodes(plan, [])
+    return {
+        'cost': plan['Total Cost'],
+        'seqScans': sorted({
+            PARTITION_SUFFIX_RE.sub('', node['Relation Name'])
+            for node in nodes if node['Node Type'] == 'Seq Scan'
+        }),
+        'indexes': sorted({
+            PARTITION_SUFFIX_RE.sub('', node['Index Name'])
+            for node in nodes if node.get('Index Name')
+        }),
+    }
+
+
+def plan_problems(current: dict, required_indexes: set, baseline) -> list:
+    '''Нарушения абсолютных правил и, если есть запись, расхождения с базовой линией'''
+    problems = []
+    hot_seq_scans = HOT_TABLES & set(current['seqScans'])
+    if hot_seq_scans:
+        problems.append(f"seq scan on hot table {', '.join(sorted(hot_seq_scans))}")
+    missing_indexes = required_indexes - set(current['indexes'])
+    if missing_indexes:
+        problems.append(f"required index not used: {', '.join(sorted(missing_indexes))}")
+    if baseline is None:
+        return problems
+
+    new_seq_scans = set(current['seqScans']) - set(baseline['seqScans']) - hot_seq_scans
+    if new_seq_scans:
+        problems.append(f"new seq scan on {', '.join(sorted(new_seq_scans))}")
+    lost_indexes = set(baseline['indexes']) - set(current['indexes'])
+    if lost_indexes:
+        problems.append(f"index no longer used: {', '.join(sorted(lost_indexes))}")
+    if current['cost'] > baseline['cost'] * PLAN_COST_TOLERANCE:
+        problems.append(f"cost {current['cost']} > {baseline['cost']} x {PLAN_COST_TOLERANCE}")
+    return problems
+
+
+@pytest.mark.parametrize('name', sorted(CHECKS))
+def test_plan(plan_conn, plan_baseline, has_pg_trgm, name):
+    if name in TRGM_CHECKS and not has_pg_trgm:
+        pytest.skip('pg_trgm не установлен: поиск без индексов V0012 не отражает прод')
+
+    sql, params, required_indexes = CHECKS[name]
+    cur = plan_conn.cursor()
+    try:
+        current = summarize_plan(cur, sql() if callable(sql) else sql, params())
+    finally:
+        plan_conn.rollback()
+        cur.close()
+
+    problems = plan_problems(current, required_indexes, None if plan_baseline['update'] else plan_baseline['plans'].get(name))
+    assert not problems, f'{name}: ' + '; '.join(problems)
+
+    if plan_baseline['update']:
+        plan_baseline['plans'][name] = current
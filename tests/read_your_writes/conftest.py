@@ -0,0 +1,94 @@
+'''Фикстуры read-your-writes: два экземпляра users-api, основная БД и её потоковая реплика.
+
+Нужна локальная основная БД с применёнными db_migrations и горячая реплика, подключённая
+к ней потоковой репликацией, под суперпользователем: тест останавливает проигрывание WAL
+на реплике (pg_wal_replay_pause), чтобы отставание было гарантированным, а не случайным.
+
+    READ_YOUR_WRITES_DATABASE_URL=postgresql://localhost:5432/snt \\
+    READ_YOUR_WRITES_REPLICA_URL=postgresql://localhost:5433/snt \\
+    python -m pytest tests/read_your_writes
+
+Реплику для проверки можно поднять так: pg_basebackup -R -X stream -D replica, затем
+pg_ctl -D replica -o '-p 5433' start.
+'''
+import json
+import os
+import subprocess
+import sys
+
+import psycopg2
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INSTANCE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance.py')
+USERS_API_PATH = os.path.join(ROOT, 'backend', 'users-api')
+# Сообщения теста узнаются по автору и удаляются после прогона
+TEST_USER_EMAIL = 'read-your-writes@load-test.invalid'
+
+
+class Instance:
+    '''Экземпляр users-api в своём процессе'''
+
+    def __init__(self, env: dict):
+        self.process = subprocess.Popen(
+            [sys.executable, INSTANCE_SCRIPT, USERS_API_PATH],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True, encoding='utf-8',
+        )
+
+    def call(self, method: str, params: dict = None, body: dict = None) -> dict:
+        '''Один вызов handler; ответ — statusCode, headers, разобранное тело'''
+        event = {'httpMethod': method, 'queryStringParameters': params or {}}
+        if body is not None:
+            event['body'] = json.dumps(body)
+        self.process.stdin.write(json.dumps(event) + '\n')
+        self.process.stdin.flush()
+        response = json.loads(self.process.stdout.readline())
+        response['body'] = json.loads(response['body']) if response.get('body') else None
+        return response
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait(timeout=10)
+
+
+@pytest.fixture(scope='session')
+def dsns():
+    '''Адреса основной БД и реплики'''
+    primary = os.environ.get('READ_YOUR_WRITES_DATABASE_URL')
+    replica = os.environ.get('READ_YOUR_WRITES_REPLICA_URL')
+    if not primary or not replica:
+        pytest.skip('READ_YOUR_WRITES_DATABASE_URL и READ_YOUR_WRITES_REPLICA_URL не заданы: нужна БД с потоковой репликой')
+    return primary, replica
+
+
+@pytest.fixture
+def paused_replica(dsns):
+    '''Реплика с остановленным проигрыванием WAL: всё записанное в тесте ей не видно'''
+    conn = psycopg2.connect(dsns[1], connect_timeout=5)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute('SELECT pg_is_in_recovery()')
+    if not cur.fetchone()[0]:
+        conn.close()
+        pytest.skip('READ_YOUR_WRITES_REPLICA_URL указывает не на реплику')
+    cur.execute('SELECT pg_wal_replay_pause()')
+    try:
+        yield
+    finally:
+        cur.execute('SELECT pg_wal_replay_resume()')
+        conn.close()
+
+
+@pytest.fixture
+def instances(dsns):
+    '''Два экземпляра users-api с одной основной БД и одной репликой'''
+    env = {**os.environ, 'DATABASE_URL': dsns[0], 'DATABASE_REPLICA_URL': dsns[1]}
+    started = [Instance(env), Instance(env)]
+    yield started
+    for instance in started:
+        instance.close()
+
+    conn = psycopg2.connect(dsns[0], connect_timeout=5)
+    with conn, conn.cursor() as cur:
+        cur.execute('DELETE FROM chat_messages WHERE user_email = %s', (TEST_USER_EMAIL,))
+    conn.close()
@@ -0,0 +1,30 @@
+'''Экземпляр функции в отдельном процессе: JSON-событие на строку stdin, JSON-ответ на строку stdout.
+
+У каждого процесса своё тёплое состояние модулей (кэши, db_routing), как у двух
+экземпляров функции в облаке. Вывод обработчика (логи db_metrics) уходит в stderr.
+
+  python tests/read_your_writes/instance.py backend/users-api
+'''
+import importlib.util
+import json
+import os
+import sys
+
+
+def load_handler(path: str):
+    '''handler функции из каталога backend/<name>'''
+    sys.path.insert(0, os.path.abspath(path))
+    spec = importlib.util.spec_from_file_location('target_index', os.path.join(path, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+if __name__ == '__main__':
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+    handler = load_handler(sys.argv[1])
+    for line in sys.stdin:
+        response = handler(json.loads(line), None)
+        protocol.write(json.dumps(response, ensure_ascii=False) + '\n')
+        protocol.flush()
@@ -0,0 +1,67 @@
+'''Read-your-writes между экземплярами users-api при чтении с реплики.
+
+Запись идёт через один экземпляр, чтение — через другой, реплика заведомо отстаёт.
+Список сообщений с minLsn из ответа (своей записи или chat_wait) обязан содержать
+новое сообщение; без minLsn тот же запрос уходит на реплику и его не видит — это
+подтверждает, что отставание в тесте настоящее.
+'''
+import threading
+import uuid
+
+from conftest import TEST_USER_EMAIL
+
+
+def send_message(instance, text: str) -> dict:
+    response = instance.call('POST', body={
+        'action': 'send_message', 'userEmail': TEST_USER_EMAIL, 'userName': 'Read Your Writes',
+        'userRole': 'member', 'avatar': '', 'text': text,
+    })
+    assert response['statusCode'] == 201, response
+    return response
+
+
+def chat_texts(instance, min_lsn: str = None) -> tuple:
+    '''Тексты сообщений из chat_messages и маршрут чтения'''
+    params = {'action': 'chat_messages'}
+    if min_lsn:
+        params['minLsn'] = min_lsn
+    response = instance.call('GET', params)
+    assert response['statusCode'] == 200, response
+    return [message['text'] for message in response['body']['messages']], response['headers']['X-Db-Route']
+
+
+def test_own_write_visible_on_other_instance(paused_replica, instances):
+    writer, reader = instances
+    text = f'own write {uuid.uuid4()}'
+    lsn = send_message(writer, text)['headers']['X-Db-Lsn']
+
+    texts, route = chat_texts(reader)
+    assert route == 'replica' and text not in texts
+
+    texts, route = chat_texts(reader, lsn)
+    assert route == 'primary-fallback'
+    assert text in texts
+
+
+def test_chat_wait_lsn_covers_foreign_write(paused_replica, instances):
+    writer, reader = instances
+    version = reader.call('GET', {'action': 'chat_wait', 'timeout': '0'})['body']['version']
+
+    waited = {}
+    waiter = threading.Thread(target=lambda: waited.update(
+        reader.call('GET', {'action': 'chat_wait', 'since': version, 'timeout': '10'})
+    ))
+    waiter.start()
+    text = f'foreign write {uuid.uuid4()}'
+    send_message(writer, text)
+    waiter.join(timeout=15)
+
+    assert waited['body']['changed'] is True
+    lsn = waited['headers']['X-Db-Lsn']
+
+    texts, route = chat_texts(reader)
+    assert route == 'replica' and text not in texts
+
+    texts, route = chat_texts(reader, lsn)
+    assert route == 'primary-fallback'
+    assert text in texts